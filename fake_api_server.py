@@ -0,0 +1,245 @@
+"""Local stand-in for the LLMail-Inject competition API (see 'how the api works.txt').
+
+Serves the team and job endpoints the app uses, with simulated processing
+delays, per-team submission rate limits (429), 404s, optional network
+latency and optional ETags on the job list, so the app can be exercised and
+load-tested offline:
+
+    python fake_api_server.py --port 8000 --seed-jobs 2000
+    API_SERVER=http://127.0.0.1:8000 COMPETITION_API_KEY=local-test python main.py
+
+Any bearer token is accepted; each distinct token is its own team.
+"""
+import argparse
+import collections
+import hashlib
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import Flask, jsonify, request
+
+# Scenario ids are parsed from jobs.html by the app's own parser, so submissions the app offers are the ones accepted here
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'website'))
+from app.utils.scenario_parser import get_scenarios_from_html
+
+app = Flask(__name__)
+
+# Behaviour knobs, overridable from the command line (see main())
+SETTINGS = {
+    'min_delay': float(os.getenv("FAKE_API_MIN_DELAY", "5")), # Seconds from submission to completion
+    'max_delay': float(os.getenv("FAKE_API_MAX_DELAY", "60")),
+    'rate_limit': int(os.getenv("FAKE_API_RATE_LIMIT", "10")), # Job submissions per team per window
+    'rate_window': float(os.getenv("FAKE_API_RATE_WINDOW", "60")),
+    'latency': float(os.getenv("FAKE_API_LATENCY", "0.05")), # Added to every response, +/- 50% jitter
+    'retry_after': False, # Send a Retry-After header with 429s (the real API does not document one)
+    'conditional': False, # Send an ETag with the job list and answer If-None-Match with 304
+}
+
+SCENARIOS_FILE = os.getenv("SCENARIOS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs.html"))
+SCENARIOS = [] # Filled by load_scenarios()
+OBJECTIVES = ('email.retrieved', 'defense.undetected', 'exfil.sent', 'exfil.destination', 'exfil.content')
+
+class Team:
+    def __init__(self, name: str, members: list[str]):
+        self.team_id = str(uuid.uuid4())
+        self.name = name
+        self.members = members
+        self.jobs = collections.OrderedDict() # job_id -> job dict, in submission order
+        self.submissions = collections.deque() # Submission timestamps inside the rate window
+
+    def to_dict(self):
+        now = time.time()
+        score = sum(100 for job in self.jobs.values() if job['_completed'] <= now and all(job['_objectives'].values()))
+        return {'team_id': self.team_id, 'name': self.name, 'members': self.members, 'score': score}
+
+_lock = threading.Lock()
+_teams = {} # bearer token -> Team
+
+def load_scenarios(path: str = SCENARIOS_FILE):
+    """Replaces SCENARIOS with the ids listed in a saved jobs.html page."""
+    with open(path, encoding='utf-8') as f:
+        SCENARIOS[:] = [scenario.id for scenario in get_scenarios_from_html(f.read())]
+    if not SCENARIOS:
+        raise ValueError(f"No scenarios found in {path}.")
+
+def _timestamp(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def _trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+def _error(status: int, message: str, advice: str, headers=None):
+    response = jsonify({'message': message, 'advice': advice, 'trace_id': _trace_id()})
+    response.status_code = status
+    response.headers.update(headers or {})
+    return response
+
+def _new_job(team: Team, scenario: str, subject: str, body: str, scheduled: float, delay: float) -> dict:
+    # Results are derived from the submission so repeated runs give the same outcomes
+    digest = hashlib.sha256(f'{scenario}\0{subject}\0{body}'.encode()).digest()
+    objectives = {name: bool(digest[i] & 1) for i, name in enumerate(OBJECTIVES)}
+    return {
+        'job_id': str(uuid.uuid4()),
+        'team_id': team.team_id,
+        'scenario': scenario,
+        'subject': subject,
+        'body': body,
+        'scheduled_time': _timestamp(scheduled),
+        '_scheduled': scheduled,
+        '_started': scheduled + delay * 0.1,
+        '_completed': scheduled + delay,
+        '_output': f'Processed email "{subject[:40]}" for {scenario}.',
+        '_objectives': objectives,
+    }
+
+def _job_state(job: dict) -> dict:
+    """Public view of a job as of now: result fields appear only once it has completed."""
+    now = time.time()
+    state = {key: value for key, value in job.items() if not key.startswith('_')}
+    if now >= job['_started']:
+        state['started_time'] = _timestamp(job['_started'])
+    if now >= job['_completed']:
+        state.update(completed_time=_timestamp(job['_completed']), output=job['_output'], objectives=job['_objectives'])
+    return state
+
+def _current_team():
+    """Returns the Team for the request's bearer token (created on first use), or None."""
+    auth = request.headers.get('Authorization', '')
+    if not auth.startswith('Bearer ') or not auth[7:].strip():
+        return None
+    token = auth[7:].strip()
+    with _lock:
+        if token not in _teams:
+            _teams[token] = Team(name=f'team-{len(_teams) + 1}', members=['local'])
+        return _teams[token]
+
+@app.before_request
+def simulate_latency():
+    if SETTINGS['latency'] > 0:
+        time.sleep(SETTINGS['latency'] * random.uniform(0.5, 1.5))
+
+@app.before_request
+def require_api_key():
+    if _current_team() is None:
+        return _error(401, 'Missing or invalid API key.', 'Send your API key in the Authorization header as a Bearer token.')
+
+@app.route('/api/teams', methods=['POST'])
+def register_team():
+    data = request.get_json(silent=True) or {}
+    if not data.get('name') or not data.get('members'):
+        return _error(400, 'A team name and at least one member are required.', 'Check the request body and try again.')
+    team = _current_team()
+    with _lock:
+        if any(other is not team and other.name == data['name'] for other in _teams.values()):
+            return _error(409, 'A team with this name already exists.', 'Choose a different team name.')
+        team.name, team.members = data['name'], list(data['members'])
+    response = jsonify(team.to_dict())
+    response.status_code = 201
+    response.headers['Location'] = f'/api/teams/{team.team_id}'
+    return response
+
+@app.route('/api/teams/mine', methods=['GET'])
+def get_team():
+    return jsonify(_current_team().to_dict())
+
+@app.route('/api/teams/mine', methods=['PATCH'])
+def update_team():
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data.get('members'), list) or not data['members']:
+        return _error(400, 'The members list must include at least one member.', 'Check the request body and try again.')
+    team = _current_team()
+    with _lock:
+        team.members = [str(member) for member in data['members']]
+    return jsonify(team.to_dict())
+
+@app.route('/api/teams/mine/jobs', methods=['GET'])
+def list_jobs():
+    team = _current_team()
+    with _lock:
+        jobs = list(team.jobs.values())
+    response = jsonify([_job_state(job) for job in jobs])
+    if SETTINGS['conditional']:
+        response.add_etag()
+        response = response.make_conditional(request)
+    return response
+
+@app.route('/api/teams/mine/jobs', methods=['POST'])
+def create_job():
+    data = request.get_json(silent=True) or {}
+    if not all(isinstance(data.get(field), str) and data[field] for field in ('scenario', 'subject', 'body')):
+        return _error(400, 'Scenario, subject and body are required.', 'Check the request body and try again.')
+    if data['scenario'] not in SCENARIOS:
+        return _error(400, f"Unknown scenario '{data['scenario']}'.", 'Use one of the scenarios listed on the competition site.')
+    team = _current_team()
+    now = time.time()
+    with _lock:
+        while team.submissions and now - team.submissions[0] >= SETTINGS['rate_window']:
+            team.submissions.popleft()
+        if len(team.submissions) >= SETTINGS['rate_limit']:
+            retry_after = int(SETTINGS['rate_window'] - (now - team.submissions[0])) + 1
+            return _error(429, 'You have exceeded your job submission rate limit and cannot submit more jobs at this time.',
+                          'Please wait a few minutes and try again. Keep in mind that rate limits are enforced at the team level.',
+                          headers={'Retry-After': str(retry_after)} if SETTINGS['retry_after'] else None)
+        team.submissions.append(now)
+        job = _new_job(team, data['scenario'], data['subject'], data['body'], now,
+                       random.uniform(SETTINGS['min_delay'], SETTINGS['max_delay']))
+        team.jobs[job['job_id']] = job
+    response = jsonify(_job_state(job))
+    response.status_code = 201
+    response.headers['Location'] = f"/api/teams/mine/jobs/{job['job_id']}"
+    return response
+
+@app.route('/api/teams/mine/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = _current_team().jobs.get(job_id)
+    if job is None:
+        return _error(404, 'We could not find the job you requested.', 'Please make sure that you are using the correct job ID and try again.')
+    return jsonify(_job_state(job))
+
+def seed_jobs(token: str, count: int):
+    """Pre-populates a team with `count` completed jobs spread over the last week."""
+    with app.test_request_context(headers={'Authorization': f'Bearer {token}'}):
+        team = _current_team()
+    now = time.time()
+    for i in range(count):
+        scheduled = now - 7 * 24 * 3600 + i * (7 * 24 * 3600 / max(count, 1))
+        job = _new_job(team, random.choice(SCENARIOS), f'Seeded subject {i}', f'Seeded body {i} ' + 'x' * random.randint(0, 400),
+                       scheduled, random.uniform(5, 120))
+        job['_started'] = job['_completed'] = min(job['_completed'], now)
+        team.jobs[job['job_id']] = job
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--min-delay', type=float, default=SETTINGS['min_delay'], help='Minimum job processing time (s).')
+    parser.add_argument('--max-delay', type=float, default=SETTINGS['max_delay'], help='Maximum job processing time (s).')
+    parser.add_argument('--rate-limit', type=int, default=SETTINGS['rate_limit'], help='Job submissions allowed per team per window.')
+    parser.add_argument('--rate-window', type=float, default=SETTINGS['rate_window'], help='Rate limit window (s).')
+    parser.add_argument('--latency', type=float, default=SETTINGS['latency'], help='Mean added response latency (s).')
+    parser.add_argument('--retry-after', action='store_true', help='Include a Retry-After header on 429 responses.')
+    parser.add_argument('--conditional', action='store_true', help='Send ETags on the job list and honour If-None-Match.')
+    parser.add_argument('--scenarios-file', default=SCENARIOS_FILE, help='Saved jobs.html page listing the accepted scenarios.')
+    parser.add_argument('--seed-jobs', type=int, default=0, help='Completed jobs to pre-create for --seed-token.')
+    parser.add_argument('--seed-token', default=os.getenv("COMPETITION_API_KEY", "local-test"), help='API key whose team gets the seeded jobs.')
+    args = parser.parse_args()
+
+    SETTINGS.update(min_delay=args.min_delay, max_delay=max(args.min_delay, args.max_delay), rate_limit=args.rate_limit,
+                    rate_window=args.rate_window, latency=args.latency, retry_after=args.retry_after,
+                    conditional=args.conditional)
+    try:
+        load_scenarios(args.scenarios_file)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if args.seed_jobs:
+        seed_jobs(args.seed_token, args.seed_jobs)
+        print(f"Seeded {args.seed_jobs} completed jobs for API key '{args.seed_token}'.")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""Load generator for the Flask app: drives its main routes and reports throughput and latency.
+
+Run the app against fake_api_server.py for an offline, repeatable baseline:
+
+    python fake_api_server.py --seed-jobs 2000 &
+    API_SERVER=http://127.0.0.1:8000 COMPETITION_API_KEY=local-test python main.py &
+    python load_test.py --url http://127.0.0.1:5000 --concurrency 16 --duration 60
+
+Each worker logs in with its own session and picks routes at random according
+to --mix. Results are printed per route (count, errors, req/s, p50/p95/p99)
+and can be saved as JSON with --json for comparison between runs.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import threading
+import time
+
+import requests
+
+# Relative weights of each route in the generated traffic
+DEFAULT_MIX = 'index=1,jobs=2,job=3,job_status=6,create_job=1'
+ROUTES = ('index', 'jobs', 'job', 'job_status', 'create_job')
+
+CSRF_PATTERN = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+JOB_LINK_PATTERN = re.compile(r'href="/job/([^"/?#]+)"')
+
+def parse_mix(text: str) -> dict[str, int]:
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ROUTES:
+            raise argparse.ArgumentTypeError(f"Unknown route '{name}'; choose from {', '.join(ROUTES)}.")
+        mix[name] = int(weight or 1)
+    return mix
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[rank - 1]
+
+class LoadTest:
+    def __init__(self, url: str, username: str, password: str, concurrency: int, mix: dict[str, int],
+                 duration: float | None = None, total_requests: int | None = None, timeout: float = 30):
+        self.url = url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.concurrency = concurrency
+        self.mix = mix
+        self.duration = duration
+        self.total_requests = total_requests
+        self.timeout = timeout
+        self.samples = {route: [] for route in ROUTES} # route -> [(latency seconds, ok)]
+        self.job_ids = []
+        self.scenarios = []
+        self._issued = 0
+        self._lock = threading.Lock()
+
+    def login(self) -> requests.Session:
+        session = requests.Session()
+        page = session.get(f'{self.url}/login', timeout=self.timeout)
+        match = CSRF_PATTERN.search(page.text)
+        data = {'username': self.username, 'password': self.password, 'csrf_token': match.group(1) if match else ''}
+        resp = session.post(f'{self.url}/login', data=data, timeout=self.timeout, allow_redirects=False)
+        if resp.status_code != 302:
+            raise SystemExit(f'Login as {self.username!r} failed (HTTP {resp.status_code}).')
+        return session
+
+    def discover_jobs(self, session: requests.Session):
+        """Collects job ids from the job list so /job and /job_status hit real jobs."""
+        page = session.get(f'{self.url}/jobs', timeout=self.timeout)
+        self.job_ids = list(dict.fromkeys(JOB_LINK_PATTERN.findall(page.text)))
+
+    def discover_scenarios(self, session: requests.Session):
+        """Takes the scenario ids /create_job accepts from the app, which parses them from its jobs.html."""
+        resp = session.get(f'{self.url}/api/scenarios', timeout=self.timeout)
+        resp.raise_for_status()
+        self.scenarios = [scenario['id'] for scenario in resp.json()['scenarios']]
+        if not self.scenarios and 'create_job' in self.mix:
+            raise SystemExit('The app lists no scenarios; check its SCENARIOS_FILE (jobs.html).')
+
+    def _next_route(self) -> str | None:
+        with self._lock:
+            if self.total_requests is not None and self._issued >= self.total_requests:
+                return None
+            self._issued += 1
+        routes = [route for route in self.mix if self.job_ids or route not in ('job', 'job_status')]
+        return random.choices(routes, weights=[self.mix[route] for route in routes])[0]
+
+    def _request(self, session: requests.Session, route: str) -> requests.Response:
+        if route == 'index':
+            return session.get(f'{self.url}/', timeout=self.timeout)
+        if route == 'jobs':
+            return session.get(f'{self.url}/jobs', timeout=self.timeout)
+        if route == 'job':
+            return session.get(f'{self.url}/job/{random.choice(self.job_ids)}', timeout=self.timeout)
+        if route == 'job_status':
+            return session.get(f'{self.url}/job_status/{random.choice(self.job_ids)}', timeout=self.timeout)
+        data = {'scenario': random.choice(self.scenarios), 'subject': f'Load test {time.time():.6f}', 'body': 'Load test body ' + 'x' * random.randint(0, 200)}
+        return session.post(f'{self.url}/create_job', data=data, timeout=self.timeout)
+
+    def _worker(self, deadline: float | None):
+        session = self.login()
+        while deadline is None or time.perf_counter() < deadline:
+            route = self._next_route()
+            if route is None:
+                break
+            start = time.perf_counter()
+            try:
+                ok = self._request(session, route).status_code < 400
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.samples[route].append((elapsed, ok))
+
+    def run(self) -> dict:
+        session = self.login()
+        self.discover_jobs(session)
+        self.discover_scenarios(session)
+        started = time.perf_counter()
+        deadline = started + self.duration if self.duration else None
+        workers = [threading.Thread(target=self._worker, args=(deadline,), daemon=True) for _ in range(self.concurrency)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed: float) -> dict:
+        def summarize(samples):
+            latencies = sorted(latency for latency, _ in samples)
+            return {
+                'requests': len(samples),
+                'errors': sum(1 for _, ok in samples if not ok),
+                'throughput': len(samples) / elapsed if elapsed else 0.0,
+                'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+                'p50_ms': percentile(latencies, 0.50) * 1000,
+                'p95_ms': percentile(latencies, 0.95) * 1000,
+                'p99_ms': percentile(latencies, 0.99) * 1000,
+                'max_ms': latencies[-1] * 1000 if latencies else 0.0,
+            }
+        routes = {route: summarize(samples) for route, samples in self.samples.items() if samples}
+        return {
+            'url': self.url,
+            'concurrency': self.concurrency,
+            'elapsed_s': elapsed,
+            'routes': routes,
+            'total': summarize([sample for samples in self.samples.values() for sample in samples]),
+        }
+
+def print_report(report: dict):
+    print(f"{report['url']}  concurrency={report['concurrency']}  elapsed={report['elapsed_s']:.1f}s")
+    print(f"{'route':<12}{'reqs':>8}{'errors':>8}{'req/s':>9}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for name, stats in [*report['routes'].items(), ('TOTAL', report['total'])]:
+        print(f"{name:<12}{stats['requests']:>8}{stats['errors']:>8}{stats['throughput']:>9.1f}{stats['mean_ms']:>9.1f}"
+              f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}{stats['max_ms']:>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='Base URL of the running app.')
+    parser.add_argument('--username', default=os.getenv("LOAD_TEST_USERNAME", "admin"))
+    parser.add_argument('--password', default=os.getenv("LOAD_TEST_PASSWORD", "changeme123"))
+    parser.add_argument('--concurrency', '-c', type=int, default=8, help='Concurrent workers (each with its own login).')
+    parser.add_argument('--duration', '-d', type=float, default=30, help='Seconds to run (ignored with --requests).')
+    parser.add_argument('--requests', '-n', type=int, help='Stop after this many requests in total instead.')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f'Route weights (default: {DEFAULT_MIX}).')
+    parser.add_argument('--json', help='Also write the report to this JSON file.')
+    args = parser.parse_args()
+
+    test = LoadTest(args.url, args.username, args.password, args.concurrency, args.mix,
+                    duration=None if args.requests else args.duration, total_requests=args.requests)
+    report = test.run()
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,45 @@
+import array
+import asyncio
+import base64
+import bisect
+import click
+import codecs
+import collections
+import concurrent.futures
+import csv
 import dataclasses
 import requests
 import time
 import os
+import queue
 import re
+import tempfile
 import hashlib
+import io
+import itertools
+import json
+import threading
 import uuid
+import functools
+import gc
+import random
+import timeit
+import tracemalloc
 from functools import wraps
+from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv # Import dotenv
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify, stream_with_context, g
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from markupsafe import Markup, escape
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash # More secure than plain SHA256
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SubmitField, IntegerField, HiddenField
-from wtforms.validators import DataRequired, Length, EqualTo, Email, ValidationError # Added ValidationError
+from wtforms import StringField, PasswordField, SubmitField, IntegerField, HiddenField, BooleanField, SelectField
+from wtforms.validators import DataRequired, Length, EqualTo, Email, ValidationError, NumberRange # Added ValidationError
 
 load_dotenv() # Load .env file BEFORE accessing variables
 
@@ -22,6 +48,82 @@ load_dotenv() # Load .env file BEFORE accessing variables
 API_KEY = os.getenv("COMPETITION_API_KEY") # Keep placeholder as fallback
 API_SERVER = os.getenv("API_SERVER", "https://llmailinject.azurewebsites.net") # Allow overriding server too
 DATABASE_FILE = os.getenv("DATABASE_FILE", "app.db") # Allow overriding DB file name
+# Local job store: full list re-sync interval and minimum age before a pending job is re-fetched (seconds)
+JOB_SYNC_INTERVAL = float(os.getenv("JOB_SYNC_INTERVAL", "300"))
+JOB_PENDING_REFRESH_INTERVAL = float(os.getenv("JOB_PENDING_REFRESH_INTERVAL", "30"))
+# Job list paging: default and maximum jobs per page
+JOBS_PAGE_SIZE = int(os.getenv("JOBS_PAGE_SIZE", "50"))
+JOBS_MAX_PAGE_SIZE = int(os.getenv("JOBS_MAX_PAGE_SIZE", "200"))
+# Admin user and token lists: rows per page, and most registration tokens generated by one request
+ADMIN_PAGE_SIZE = int(os.getenv("ADMIN_PAGE_SIZE", "50"))
+TOKEN_BULK_MAX = int(os.getenv("TOKEN_BULK_MAX", "1000"))
+# Prompt similarity index: MinHash bins (a power of two), LSH bands, and max candidates ranked per lookup
+SIMILARITY_NUM_BINS = int(os.getenv("SIMILARITY_NUM_BINS", "128"))
+SIMILARITY_BANDS = int(os.getenv("SIMILARITY_BANDS", "32"))
+SIMILARITY_MAX_CANDIDATES = int(os.getenv("SIMILARITY_MAX_CANDIDATES", "2000"))
+# Full-text job search: results per page and tokens of context in each snippet
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "20"))
+SEARCH_SNIPPET_TOKENS = int(os.getenv("SEARCH_SNIPPET_TOKENS", "16"))
+# Job statistics dashboard: days of per-day success rates shown
+STATS_DAYS = int(os.getenv("STATS_DAYS", "14"))
+# Background poller: seconds between cycles (the API asks for >= 30s) and max upstream calls per cycle
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "30"))
+JOB_POLL_MAX_PER_CYCLE = int(os.getenv("JOB_POLL_MAX_PER_CYCLE", "20"))
+# Upstream response cache TTLs (seconds); the team may be served this long past expiry while it refreshes
+TEAM_CACHE_TTL = float(os.getenv("TEAM_CACHE_TTL", "60"))
+TEAM_CACHE_STALE_TTL = float(os.getenv("TEAM_CACHE_STALE_TTL", "300"))
+JOBS_CACHE_TTL = float(os.getenv("JOBS_CACHE_TTL", "30"))
+# Memory cap (bytes) for completed jobs cached in-process by get_job; they never change upstream
+COMPLETED_JOB_CACHE_BYTES = int(os.getenv("COMPLETED_JOB_CACHE_BYTES", str(32 * 1024 * 1024)))
+# Outgoing job submissions are queued and drained under an adaptive rate limit
+SUBMIT_RATE_PER_MINUTE = float(os.getenv("SUBMIT_RATE_PER_MINUTE", "6")) # Starting rate; adjusted from 429 responses
+SUBMIT_BURST = int(os.getenv("SUBMIT_BURST", "3"))
+SUBMIT_MAX_ATTEMPTS = int(os.getenv("SUBMIT_MAX_ATTEMPTS", "5")) # Non-429 failures before a submission is marked failed
+SUBMIT_RETRY_BACKOFF = float(os.getenv("SUBMIT_RETRY_BACKOFF", "10")) # Wait before a failed row's first retry, doubled per attempt
+SUBMIT_RETRY_BACKOFF_MAX = float(os.getenv("SUBMIT_RETRY_BACKOFF_MAX", "600"))
+SUBMIT_RECONCILE_DELAY = float(os.getenv("SUBMIT_RECONCILE_DELAY", "60")) # Wait before looking for an ambiguous submission in the job list
+SUBMIT_RATE_LIMIT_COOLDOWN = float(os.getenv("SUBMIT_RATE_LIMIT_COOLDOWN", "60")) # Pause after a 429 without Retry-After
+# Batch submissions (/batch_jobs, flask submit-batch)
+BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", "10000"))
+BATCH_PROGRESS_INTERVAL = float(os.getenv("BATCH_PROGRESS_INTERVAL", "1")) # Seconds between checks of a batch's queued rows
+# Seconds between keep-alive comments on idle /events/jobs streams
+SSE_HEARTBEAT_INTERVAL = float(os.getenv("SSE_HEARTBEAT_INTERVAL", "15"))
+# Jobs one /events/jobs stream may watch, and seconds before it is closed (the browser's EventSource reconnects)
+SSE_MAX_IDS = int(os.getenv("SSE_MAX_IDS", "50"))
+SSE_MAX_LIFETIME = float(os.getenv("SSE_MAX_LIFETIME", "300"))
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "2000")) # Reconnection delay sent to the browser
+# Upstream HTTP transport tuning (connection pool, timeouts in seconds, retries)
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "10"))
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "5"))
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "30"))
+API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "3"))
+API_BACKOFF_FACTOR = float(os.getenv("API_BACKOFF_FACTOR", "0.5"))
+# Bytes read per chunk when streaming large responses (the job list), and job changes published per batch during a sync
+API_STREAM_CHUNK_SIZE = int(os.getenv("API_STREAM_CHUNK_SIZE", str(64 * 1024)))
+JOB_SYNC_BATCH_SIZE = int(os.getenv("JOB_SYNC_BATCH_SIZE", "500"))
+# Job list bodies larger than this (bytes) are spooled to a temporary file while being hashed
+JOB_SYNC_SPOOL_BYTES = int(os.getenv("JOB_SYNC_SPOOL_BYTES", str(8 * 1024 * 1024)))
+# Seconds a logged-in user is served from the per-process cache before being re-read from the database
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+# Password hashing: werkzeug method with KDF cost (stored hashes with another method are upgraded at login),
+# hashes computed in parallel, and further requests allowed to wait before being turned away
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "16"))
+# SQLite settings applied to every connection: lock wait (seconds), page cache (KiB) and memory-mapped I/O (bytes)
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(64 * 1024 * 1024)))
+# Metrics (/admin/metrics): latency histogram bucket bounds (seconds), window for per-minute rates (seconds),
+# and the most recent upstream error trace ids kept
+METRICS_LATENCY_BUCKETS = tuple(sorted(float(bound) for bound in os.getenv(
+    "METRICS_LATENCY_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30").split(',')))
+METRICS_RATE_WINDOW = float(os.getenv("METRICS_RATE_WINDOW", "300"))
+METRICS_TRACE_IDS = int(os.getenv("METRICS_TRACE_IDS", "100"))
+# Scenario list page saved from the competition site, its parsed cache (default <file>.cache.json), and seconds between change checks
+SCENARIOS_FILE = os.getenv("SCENARIOS_FILE", "jobs.html")
+SCENARIO_CACHE_FILE = os.getenv("SCENARIO_CACHE_FILE") or None
+SCENARIO_RELOAD_INTERVAL = float(os.getenv("SCENARIO_RELOAD_INTERVAL", "2"))
 
 # --- Flask App Setup ---
 app = Flask(__name__)
@@ -36,11 +138,125 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 # --- Database Setup ---
 db = SQLAlchemy(app)
 
+def configure_sqlite_connection(dbapi_connection, connection_record=None):
+    """Connect hook for SQLite: WAL so reads never wait for a writer, queued (not failing) writers, a larger cache.
+
+    synchronous=NORMAL is durable across application crashes in WAL mode; only
+    an OS crash or power loss can lose the last commits.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f'PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT * 1000)}')
+    cursor.execute(f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}')
+    cursor.execute(f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.close()
+
+with app.app_context():
+    db.event.listen(db.engine, 'connect', configure_sqlite_connection)
+
+def ensure_indexes():
+    """Creates declared indexes missing from existing tables (create_all() only indexes the tables it creates)."""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
 # --- Login Manager Setup ---
 login_manager = LoginManager(app)
 login_manager.login_view = 'login' # Route name for the login page
 login_manager.login_message_category = 'info' # Flash message category
 
+# --- Password Hashing ---
+class PasswordHasherBusyError(Exception):
+    """Raised when the password hashing queue is full; the caller should ask the user to retry."""
+
+class PasswordHasher:
+    """A concurrency limit for password KDF calls, which run on a small bounded pool.
+
+    The calling request thread still blocks until its own hash is done; what
+    the pool bounds is the CPU spent on hashing. At most `max_workers` hashes
+    run at once and at most `max_queued` more callers wait for a slot. Beyond
+    that hash()/verify() raise PasswordHasherBusyError at once and the route
+    answers with a busy error, so a login stampede gets quick refusals instead
+    of every request thread competing for the cores.
+
+    `method` is a werkzeug method string that sets the KDF and its cost (e.g.
+    'scrypt:32768:8:1' or 'pbkdf2:sha256:1000000'); hashes made with anything
+    else report needs_rehash() and are upgraded on the next login.
+    """
+    def __init__(self, method: str, max_workers: int, max_queued: int):
+        self.method = method
+        self.max_workers = max(1, max_workers)
+        self.max_queued = max(0, max_queued)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queued)
+        self._lock = threading.Lock()
+        self._method_prefix = None
+        self.active = 0
+        self.queued = 0
+        self.max_queued_seen = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0 # Total time calls spent queued
+
+    @property
+    def method_prefix(self) -> str:
+        """The method as werkzeug writes it into hashes, with every default cost parameter filled in."""
+        if self._method_prefix is None:
+            self._method_prefix = generate_password_hash('', method=self.method).split('$', 1)[0]
+        return self._method_prefix
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusyError("Too many password checks in progress; try again shortly.")
+        queued_at = time.monotonic()
+        with self._lock:
+            self.queued += 1
+            self.max_queued_seen = max(self.max_queued_seen, self.queued)
+
+        def task():
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+                self.wait_seconds += time.monotonic() - queued_at
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+                self._slots.release()
+
+        return self._executor.submit(task).result() # Blocks this thread; only the number of concurrent hashes is bounded
+
+    def hash(self, password: str) -> str:
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        return password_hash.split('$', 1)[0] != self.method_prefix
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'method': self.method,
+                'workers': self.max_workers,
+                'max_queued': self.max_queued,
+                'active': self.active,
+                'queued': self.queued,
+                'max_queued_seen': self.max_queued_seen,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'mean_wait_ms': self.wait_seconds / self.completed * 1000 if self.completed else 0.0,
+            }
+
+password_hasher = PasswordHasher(PASSWORD_HASH_METHOD, max_workers=PASSWORD_HASH_WORKERS, max_queued=PASSWORD_HASH_QUEUE_SIZE)
+
 # --- Database Models ---
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
@@ -49,10 +265,15 @@ class User(db.Model, UserMixin):
     is_admin = db.Column(db.Boolean, default=False, nullable=False)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    @classmethod
+    def any_exist(cls) -> bool:
+        """Whether there is at least one user; stops at the first row instead of counting them all."""
+        return db.session.query(cls.query.exists()).scalar()
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -63,14 +284,146 @@ class RegistrationToken(db.Model):
     is_used = db.Column(db.Boolean, default=False, nullable=False)
     uses_left = db.Column(db.Integer, default=1, nullable=False) # Allow multi-use tokens
 
+    @classmethod
+    def consume(cls, token: str) -> bool:
+        """Spends one use of a valid token in the current transaction. Returns False if it is unknown or used up.
+
+        A single conditional UPDATE, so concurrent registrations can neither
+        overspend a token nor lose a decrement.
+        """
+        result = db.session.execute(
+            db.update(cls).where(cls.token == token, cls.is_used.is_(False), cls.uses_left > 0)
+            .values(uses_left=cls.uses_left - 1, is_used=cls.uses_left <= 1)
+            .execution_options(synchronize_session=False))
+        return result.rowcount == 1
+
+    @classmethod
+    def generate(cls, count: int, uses: int) -> list[str]:
+        """Inserts `count` new tokens with `uses` uses each in the current transaction (caller commits) and returns them."""
+        tokens = [str(uuid.uuid4()) for _ in range(count)]
+        db.session.execute(db.insert(cls), [{'token': token, 'uses_left': uses, 'is_used': False} for token in tokens])
+        return tokens
+
+    @classmethod
+    def spent(cls):
+        """SQL condition matching tokens that can no longer be used to register."""
+        return db.or_(cls.is_used.is_(True), cls.uses_left <= 0)
+
+    @classmethod
+    def expire_many(cls, ids) -> int:
+        """Uses up the given tokens so they can no longer register anyone (caller commits). Returns how many changed."""
+        return db.session.execute(
+            db.update(cls).where(cls.id.in_(ids), db.not_(cls.spent())).values(uses_left=0, is_used=True)
+            .execution_options(synchronize_session=False)).rowcount
+
+    @classmethod
+    def delete_many(cls, ids=None) -> int:
+        """Deletes the given tokens, or every spent token if `ids` is None (caller commits). Returns how many went."""
+        condition = cls.spent() if ids is None else cls.id.in_(ids)
+        return db.session.execute(db.delete(cls).where(condition).execution_options(synchronize_session=False)).rowcount
+
     def __repr__(self):
         status = 'Used' if self.is_used else (f'{self.uses_left} uses left' if self.uses_left > 0 else 'Expired')
         return f'<Token {self.token[:8]}... ({status})>'
 
+class JobRecord(db.Model):
+    """Local mirror of a competition job, kept in sync by sync_jobs()."""
+    job_id = db.Column(db.String(64), primary_key=True)
+    team_id = db.Column(db.String(64), nullable=False)
+    scenario = db.Column(db.String(64), nullable=False, index=True)
+    subject = db.Column(db.Text, nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    scheduled_time = db.Column(db.String(40), nullable=False, index=True)
+    started_time = db.Column(db.String(40))
+    completed_time = db.Column(db.String(40), index=True)
+    output = db.Column(db.Text)
+    objectives = db.Column(db.JSON)
+    synced_at = db.Column(db.Float, nullable=False, default=time.time) # Last upstream fetch (epoch seconds)
+    # Derived from objectives so the job list can filter and sort in SQL
+    status = db.Column(db.String(16), nullable=False, default='processing') # processing | success | partial | failed
+    success_rate = db.Column(db.Float, nullable=False, default=0.0) # Share of objectives met
+
+    __table_args__ = (
+        db.Index('ix_job_record_status_scheduled', 'status', 'scheduled_time'),
+        db.Index('ix_job_record_scenario_scheduled', 'scenario', 'scheduled_time'),
+        db.Index('ix_job_record_success_scheduled', 'success_rate', 'scheduled_time'),
+    )
+
+    @property
+    def is_completed(self):
+        return self.completed_time is not None
+
+    @staticmethod
+    def outcome(job) -> tuple[str, float]:
+        """Returns (status, success_rate) for a job, matching the job list's status labels."""
+        if not job.is_completed:
+            return 'processing', 0.0
+        results = [bool(value) for value in (job.objectives or {}).values()]
+        if not results:
+            return 'failed', 0.0
+        status = 'success' if all(results) else ('partial' if any(results) else 'failed')
+        return status, sum(results) / len(results)
+
+    def update_from_job(self, job):
+        for field in dataclasses.fields(job):
+            setattr(self, field.name, getattr(job, field.name))
+        self.status, self.success_rate = self.outcome(job)
+        self.synced_at = time.time()
+
+    def to_job(self):
+        return Job(**{field.name: getattr(self, field.name) for field in dataclasses.fields(Job)})
+
+    def __repr__(self):
+        return f'<JobRecord {self.job_id} ({"completed" if self.is_completed else "pending"})>'
+
+class JobSignature(db.Model):
+    """MinHash signature of a job's subject and body, maintained by SimilarityIndex."""
+    job_id = db.Column(db.String(64), primary_key=True)
+    signature = db.Column(db.LargeBinary, nullable=False) # SIMILARITY_NUM_BINS unsigned 64-bit minima
+
+class JobLSHBucket(db.Model):
+    """One LSH band of a job's signature; jobs sharing a (band, bucket) pair are similarity candidates."""
+    band = db.Column(db.Integer, primary_key=True)
+    bucket = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    job_id = db.Column(db.String(64), primary_key=True)
+
+class JobStats(db.Model):
+    """Running success counts for completed jobs, maintained by record_job_outcome().
+
+    One row per (scenario, objective, day): objective '' counts whole jobs and
+    day '' is the all-time total, so the dashboard reads a few rows per scenario.
+    """
+    scenario = db.Column(db.String(64), primary_key=True)
+    objective = db.Column(db.String(64), primary_key=True, default='')
+    day = db.Column(db.String(10), primary_key=True, default='') # YYYY-MM-DD of the scheduled time (UTC)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    successes = db.Column(db.Integer, nullable=False, default=0) # All objectives met (per objective: that one met)
+    partials = db.Column(db.Integer, nullable=False, default=0) # Some but not all objectives met (whole-job rows only)
+
+class QueuedSubmission(db.Model):
+    """A job submission waiting for (or done with) dispatch to the API by SubmissionDispatcher."""
+    id = db.Column(db.Integer, primary_key=True)
+    ticket = db.Column(db.String(36), unique=True, nullable=False, default=lambda: str(uuid.uuid4()))
+    scenario = db.Column(db.String(64), nullable=False)
+    subject = db.Column(db.Text, nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='queued') # queued | sending | dispatched | unknown | failed
+    job_id = db.Column(db.String(64))
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.Float, nullable=False, default=time.time)
+    dispatched_at = db.Column(db.Float)
+    attempted_at = db.Column(db.Float) # Last time it was sent
+    next_attempt_at = db.Column(db.Float) # Earliest retry after a failure; None means due now
+
+    __table_args__ = (
+        # The dispatcher takes the oldest queued row and /submission counts the queued rows ahead of one
+        db.Index('ix_queued_submission_status_id', 'status', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<QueuedSubmission {self.ticket[:8]}... ({self.status})>'
 
-@login_manager.user_loader
-def load_user(user_id):
-    return db.session.get(User, int(user_id)) # Use db.session.get for primary key lookup
 
 
 # --- Forms ---
@@ -91,10 +444,7 @@ class RegistrationForm(FlaskForm):
         if user:
             raise ValidationError('Username already exists. Please choose a different one.')
 
-    def validate_registration_token(self, registration_token):
-        token_entry = RegistrationToken.query.filter_by(token=registration_token.data).first()
-        if not token_entry or token_entry.is_used or token_entry.uses_left <= 0:
-            raise ValidationError('Invalid or expired registration token.')
+    # The registration token is checked and spent by register() itself, in the transaction that creates the user
 
 class PasswordChangeForm(FlaskForm):
     current_password = PasswordField('Current Password', validators=[DataRequired()])
@@ -104,7 +454,272 @@ class PasswordChangeForm(FlaskForm):
 
 class TokenGenerationForm(FlaskForm):
     uses = IntegerField('Number of Uses', default=1, validators=[DataRequired()])
-    submit = SubmitField('Generate Token')
+    count = IntegerField('Number of Tokens', default=1, validators=[DataRequired(), NumberRange(min=1, max=TOKEN_BULK_MAX)])
+    download = BooleanField('Download as CSV')
+    submit = SubmitField('Generate Tokens')
+
+class TokenBulkActionForm(FlaskForm):
+    # The selected token ids arrive as 'token_ids' checkboxes in the token table
+    action = SelectField('With selected', choices=[('expire', 'Expire selected'), ('delete', 'Delete selected'),
+                                                   ('delete_spent', 'Delete all used/expired tokens')])
+    submit = SubmitField('Apply')
+
+# --- Metrics ---
+class Histogram:
+    """Fixed-bucket histogram of durations in seconds, with Prometheus 'le' semantics.
+
+    Not locked on its own; Metrics updates it under its lock.
+    """
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1) # Per bucket, not cumulative; the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile by interpolating inside its bucket, as Prometheus' histogram_quantile() does."""
+        rank, seen = q * self.count, 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.bounds[i - 1] if i else 0.0
+                if i == len(self.bounds):
+                    return lower # In the +Inf bucket: only the largest bound is known
+                return lower + (self.bounds[i] - lower) * (rank - seen) / count
+            seen += count
+        return 0.0
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """(le, count) pairs, ending with '+Inf'."""
+        return list(zip([*(f'{bound:g}' for bound in self.bounds), '+Inf'], itertools.accumulate(self.counts)))
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0,
+            **{f'p{round(q * 100)}': self.quantile(q) for q in (0.5, 0.95, 0.99)},
+            'buckets': dict(self.cumulative()),
+        }
+
+class EventRate:
+    """Counts events over a sliding window to report a recent per-minute rate."""
+    def __init__(self, window: float):
+        self.window = window
+        self._events = collections.deque() # (monotonic time, count)
+        self._total = 0
+
+    def add(self, count: int = 1):
+        now = time.monotonic()
+        self._events.append((now, count))
+        self._total += count
+        self._trim(now)
+
+    def _trim(self, now: float):
+        while self._events and now - self._events[0][0] > self.window:
+            self._total -= self._events.popleft()[1]
+
+    def per_minute(self) -> float:
+        self._trim(time.monotonic())
+        return self._total * 60 / self.window
+
+class Metrics:
+    """In-process registry of route, upstream and background-service metrics.
+
+    Routes are labelled by Flask endpoint and upstream calls by path template
+    (never by raw job id), so the number of series stays bounded. Latencies run
+    until the response headers, so streamed bodies (the job list download,
+    /events/jobs) are not included. Other components expose their own counters
+    (cache hits, poller cycles, limiter state) through add_gauge(). Everything
+    is per process and starts from zero when it restarts.
+    """
+    def __init__(self, buckets=METRICS_LATENCY_BUCKETS, rate_window: float = METRICS_RATE_WINDOW,
+                 max_trace_ids: int = METRICS_TRACE_IDS):
+        self.buckets = tuple(buckets)
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self.route_latency = {} # (endpoint, method) -> Histogram
+        self.route_responses = collections.Counter() # (endpoint, method, status)
+        self.upstream_latency = {} # (method, endpoint) -> Histogram
+        self.upstream_responses = collections.Counter() # (method, endpoint, status); status 'error' if there was no response
+        self.upstream_retries = collections.Counter() # (method, endpoint, status) of attempts the transport retried
+        self.upstream_in_flight = 0
+        self.upstream_rate = EventRate(rate_window)
+        self.poll_rate = EventRate(rate_window) # Jobs fetched by the background poller
+        self.trace_ids = collections.deque(maxlen=max_trace_ids) # Recent upstream errors, newest last
+        self.trace_ids_total = 0
+        self._gauges = {} # name -> (help, label, fn, kind)
+
+    def init_app(self, app):
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    def _start_request(self):
+        g.metrics_started = time.perf_counter()
+
+    def _finish_request(self, response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            self.observe_route(request.endpoint or 'unmatched', request.method, response.status_code,
+                               time.perf_counter() - started)
+        return response
+
+    def _histogram(self, series: dict, key) -> Histogram:
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(self.buckets)
+        return histogram
+
+    def observe_route(self, endpoint: str, method: str, status: int, seconds: float):
+        with self._lock:
+            self._histogram(self.route_latency, (endpoint, method)).observe(seconds)
+            self.route_responses[endpoint, method, str(status)] += 1
+
+    def upstream_started(self):
+        with self._lock:
+            self.upstream_in_flight += 1
+
+    def upstream_finished(self, method: str, endpoint: str, response: requests.Response | None, seconds: float):
+        """Records a finished upstream call, including any attempts the transport retried before `response`."""
+        retries = getattr(getattr(response, 'raw', None), 'retries', None)
+        with self._lock:
+            self.upstream_in_flight -= 1
+            self.upstream_rate.add()
+            self._histogram(self.upstream_latency, (method, endpoint)).observe(seconds)
+            self.upstream_responses[method, endpoint, str(response.status_code) if response is not None else 'error'] += 1
+            for attempt in getattr(retries, 'history', None) or ():
+                self.upstream_retries[method, endpoint, str(attempt.status) if attempt.status else 'error'] += 1
+
+    def record_trace_id(self, response: requests.Response, trace_id: str | None):
+        """Keeps the trace id the API returned with an error response, for quoting in support requests."""
+        if not trace_id:
+            return
+        with self._lock:
+            self.trace_ids_total += 1
+            self.trace_ids.append({'time': format_api_time(int(time.time())), 'method': response.request.method,
+                                   'path': response.request.path_url, 'status': response.status_code, 'trace_id': trace_id})
+
+    def record_poll(self, jobs: int):
+        with self._lock:
+            self.poll_rate.add(jobs)
+
+    def add_gauge(self, name: str, help: str, fn, label: str | None = None, kind: str = 'gauge'):
+        """Exports fn() as `name`: a number, or with `label` a {label value: number} dict. kind is 'gauge' or 'counter'."""
+        self._gauges[name] = (help, label, fn, kind)
+
+    def _gauge_values(self) -> dict:
+        values = {}
+        for name, (_, label, fn, _) in self._gauges.items():
+            try:
+                values[name] = fn()
+            except Exception as e:
+                app.logger.warning(f"Metric {name} could not be read: {e}")
+        return values
+
+    def snapshot(self) -> dict:
+        """All metrics as plain data, for the JSON endpoint."""
+        gauges = self._gauge_values()
+        with self._lock:
+            upstream_statuses = collections.Counter()
+            for (_, _, status), count in self.upstream_responses.items():
+                upstream_statuses[status] += count
+            retried_statuses = collections.Counter()
+            for (_, _, status), count in self.upstream_retries.items():
+                retried_statuses[status] += count
+            return {
+                'uptime_s': time.time() - self.started,
+                'routes': [
+                    {'endpoint': endpoint, 'method': method, **histogram.to_dict(),
+                     'statuses': {status: count for (e, m, status), count in self.route_responses.items()
+                                  if (e, m) == (endpoint, method)}}
+                    for (endpoint, method), histogram in sorted(self.route_latency.items())
+                ],
+                'upstream': {
+                    'in_flight': self.upstream_in_flight,
+                    'requests_per_minute': self.upstream_rate.per_minute(),
+                    'statuses': dict(upstream_statuses),
+                    'retried_statuses': dict(retried_statuses),
+                    'rate_limited': upstream_statuses['429'] + retried_statuses['429'],
+                    'endpoints': [
+                        {'method': method, 'endpoint': endpoint, **histogram.to_dict(),
+                         'statuses': {status: count for (m, e, status), count in self.upstream_responses.items()
+                                      if (m, e) == (method, endpoint)},
+                         'retried_statuses': {status: count for (m, e, status), count in self.upstream_retries.items()
+                                              if (m, e) == (method, endpoint)}}
+                        for (method, endpoint), histogram in sorted(self.upstream_latency.items())
+                    ],
+                    'trace_ids_total': self.trace_ids_total,
+                    'recent_trace_ids': list(reversed(self.trace_ids)),
+                },
+                'poller': {'jobs_per_minute': self.poll_rate.per_minute()},
+                'gauges': gauges,
+            }
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+
+        def header(name, help, kind):
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        def escape_label(value) -> str:
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        def sample(name, labels: dict, value):
+            text = ','.join(f'{key}="{escape_label(label_value)}"' for key, label_value in labels.items())
+            value = str(value) if isinstance(value, int) else repr(float(value)) # Counts stay exact
+            lines.append(f'{name}{{{text}}} {value}' if text else f'{name} {value}')
+
+        def histograms(name, help, series, label_names):
+            header(name, help, 'histogram')
+            for key, histogram in sorted(series.items()):
+                labels = dict(zip(label_names, key))
+                for le, count in histogram.cumulative():
+                    sample(f'{name}_bucket', {**labels, 'le': le}, count)
+                sample(f'{name}_sum', labels, histogram.sum)
+                sample(f'{name}_count', labels, histogram.count)
+
+        def counters(name, help, counter, label_names):
+            header(name, help, 'counter')
+            for key, count in sorted(counter.items()):
+                sample(name, dict(zip(label_names, key)), count)
+
+        gauges = self._gauge_values()
+        with self._lock:
+            header('process_uptime_seconds', 'Seconds since this process started collecting metrics.', 'gauge')
+            sample('process_uptime_seconds', {}, time.time() - self.started)
+            histograms('http_request_duration_seconds', 'Time to response headers per Flask endpoint.',
+                       self.route_latency, ('endpoint', 'method'))
+            counters('http_responses_total', 'Responses per Flask endpoint and status code.',
+                     self.route_responses, ('endpoint', 'method', 'status'))
+            histograms('upstream_request_duration_seconds', 'Competition API call time to response headers, including transport retries.',
+                       self.upstream_latency, ('method', 'endpoint'))
+            counters('upstream_responses_total', "Final competition API responses per status code ('error' if none).",
+                     self.upstream_responses, ('method', 'endpoint', 'status'))
+            counters('upstream_retried_responses_total', 'Competition API attempts retried by the transport, per status code.',
+                     self.upstream_retries, ('method', 'endpoint', 'status'))
+            header('upstream_in_flight_requests', 'Competition API calls currently waiting for a response.', 'gauge')
+            sample('upstream_in_flight_requests', {}, self.upstream_in_flight)
+            header('upstream_requests_per_minute', f'Competition API calls per minute over the last {self.upstream_rate.window:g}s.', 'gauge')
+            sample('upstream_requests_per_minute', {}, self.upstream_rate.per_minute())
+            header('upstream_trace_ids_total', 'Trace ids captured from competition API error responses.', 'counter')
+            sample('upstream_trace_ids_total', {}, self.trace_ids_total)
+            header('job_poller_jobs_per_minute', f'Jobs fetched by the background poller per minute over the last {self.poll_rate.window:g}s.', 'gauge')
+            sample('job_poller_jobs_per_minute', {}, self.poll_rate.per_minute())
+        for name, value in gauges.items():
+            help, label, _, kind = self._gauges[name]
+            header(name, help, kind)
+            for label_value, number in (value.items() if label else [(None, value)]):
+                sample(name, {label: label_value} if label else {}, number)
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
+metrics.init_app(app)
 
 # --- API Client Code ---
 
@@ -112,7 +727,19 @@ class TokenGenerationForm(FlaskForm):
 class APIKeyNotConfiguredError(Exception):
     pass
 
-@dataclasses.dataclass
+# Raised for any other error response from the API
+class APIError(Exception):
+    def __init__(self, message, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+# Raised when the API answers 429 Too Many Requests (rate limits are per team)
+class RateLimitedError(Exception):
+    def __init__(self, message, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after # Seconds, if the API sent a Retry-After header
+
+@dataclasses.dataclass(slots=True)
 class Job:
     job_id: str
     team_id: str
@@ -129,7 +756,7 @@ class Job:
     def is_completed(self):
         return self.completed_time is not None
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Team:
     team_id: str
     name: str
@@ -138,8 +765,86 @@ class Team:
     solved_scenarios: list | None = None
     is_enabled: bool | None = None
 
+def format_api_time(epoch: int) -> str | None:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ') if epoch else None
+
+class UpstreamRetry(Retry):
+    """Retry policy for the competition API.
+
+    GET/PATCH are idempotent and are retried on connection errors, 429 and 5xx.
+    Job submissions (POST) are only retried when the connection could not be
+    opened, so nothing was sent. Any response, 429 included, goes straight back
+    to the caller: retrying after a 5xx or a read timeout could submit the same
+    job twice, and 429s must reach the submission TokenBucket so it backs off
+    instead of spending more of the team quota.
+    """
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method and method.upper() == 'POST':
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+def iter_json_array(chunks, encoding: str = 'utf-8'):
+    """Yields the elements of a JSON array of objects as they arrive, from an iterable of byte chunks.
+
+    Only the current element and an unread chunk are held in memory, whatever
+    the size of the array. Raises ValueError if the input is not such an array.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder(encoding)()
+    chunks = iter(chunks)
+    buffer, pos, started, finished = '', 0, False, False
+    while True:
+        while pos < len(buffer) and (buffer[pos].isspace() or (started and buffer[pos] == ',')):
+            pos += 1
+        if pos < len(buffer):
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError("Expected a JSON array.")
+                started, pos = True, pos + 1
+                continue
+            if buffer[pos] == ']':
+                return
+            if buffer[pos] != '{':
+                raise ValueError(f"Expected a JSON object in the array, got {buffer[pos]!r}.")
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if finished:
+                    raise ValueError("Truncated JSON array.")
+                item = None # Object continues in the next chunk
+            if item is not None:
+                yield item
+                pos = end
+                continue
+        elif finished:
+            raise ValueError("Truncated JSON array.")
+        chunk = next(chunks, None)
+        if chunk is None:
+            finished = True
+            buffer, pos = buffer[pos:] + text_decoder.decode(b'', final=True), 0
+        else:
+            buffer, pos = buffer[pos:] + text_decoder.decode(chunk), 0
+
+def build_api_session(pool_size: int, max_retries: int, backoff_factor: float) -> requests.Session:
+    """Creates a keep-alive session with a bounded connection pool and retry policy."""
+    retry = UpstreamRetry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        backoff_jitter=backoff_factor, # Spread out retries from concurrent workers
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({'GET', 'PATCH'}),
+        raise_on_status=False, # Hand the final error response to _check_response_error
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
 class CompetitionClient:
-    def __init__(self, api_key: str, api_server: str):
+    def __init__(self, api_key: str, api_server: str, pool_size: int = API_POOL_SIZE,
+                 connect_timeout: float = API_CONNECT_TIMEOUT, read_timeout: float = API_READ_TIMEOUT,
+                 max_retries: int = API_MAX_RETRIES, backoff_factor: float = API_BACKOFF_FACTOR):
         # Store the key, even if it's the placeholder
         self.api_key = api_key
         self.api_server = api_server
@@ -148,30 +853,59 @@ class CompetitionClient:
             'Accept': 'application/json; charset=utf-8',
             'Content-Type': 'application/json; charset=utf-8'
         }
+        self.timeout = (connect_timeout, read_timeout)
+        # One pooled session shared by all request threads; headers are passed per
+        # request so the session is only used for connection reuse and retries.
+        self.session = build_api_session(pool_size, max_retries, backoff_factor)
+
+    def _request(self, method: str, path: str, headers: dict | None = None, endpoint: str | None = None,
+                 **kwargs) -> requests.Response:
+        """Sends a request through the pooled session with the configured timeouts (and any extra headers).
+
+        The call is timed in the metrics under `endpoint`, which defaults to the
+        path; pass a template for paths that contain ids.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        metrics.upstream_started()
+        started, resp = time.perf_counter(), None
+        try:
+            resp = self.session.request(method, f"{self.api_server}{path}", headers={**self.headers, **(headers or {})}, **kwargs)
+            return resp
+        finally:
+            metrics.upstream_finished(method, endpoint or path, resp, time.perf_counter() - started)
+
+    def close(self):
+        """Closes pooled connections."""
+        self.session.close()
 
     def _is_key_placeholder(self):
         return self.api_key == "YOUR_API_KEY_HERE"
 
     def _check_response_error(self, resp: requests.Response):
-        """Raises an exception if the API response indicates an error."""
+        """Raises an exception if the API response indicates an error (RateLimitedError for 429s)."""
         if resp.ok:
             return
         try:
             error = resp.json()
             message = error.get('message', 'Unknown error')
             advice = error.get('advice', 'No advice provided')
-            raise Exception(f"API Error ({resp.status_code}): {message} - {advice} (Trace ID: {error.get('trace_id', 'N/A')})")
+            details = f"API Error ({resp.status_code}): {message} - {advice} (Trace ID: {error.get('trace_id', 'N/A')})"
+            metrics.record_trace_id(resp, error.get('trace_id'))
         except requests.exceptions.JSONDecodeError:
-            raise Exception(f"API Error ({resp.status_code}): {resp.text}")
+            details = f"API Error ({resp.status_code}): {resp.text}"
         except Exception as e:
-             raise Exception(f"API Error ({resp.status_code}): {resp.text} (Parsing error details failed: {e})")
+            details = f"API Error ({resp.status_code}): {resp.text} (Parsing error details failed: {e})"
+        if resp.status_code == 429:
+            retry_after = resp.headers.get('Retry-After', '')
+            raise RateLimitedError(details, retry_after=float(retry_after) if retry_after.isdigit() else None)
+        raise APIError(details, status_code=resp.status_code)
 
     def create_job(self, scenario: str, subject: str, body: str) -> Job:
         """Submits a new job. Raises error if API key is placeholder."""
         if self._is_key_placeholder():
             raise APIKeyNotConfiguredError("Cannot create job: API Key is not configured.")
         payload = {'scenario': scenario, 'subject': subject, 'body': body}
-        resp = requests.post(f"{self.api_server}/api/teams/mine/jobs", headers=self.headers, json=payload)
+        resp = self._request('POST', "/api/teams/mine/jobs", json=payload)
         self._check_response_error(resp)
         return Job(**resp.json())
 
@@ -179,26 +913,54 @@ class CompetitionClient:
         """Retrieves details for a specific job. Returns None if API key is placeholder."""
         if self._is_key_placeholder():
             return None # Indicate key is missing
-        resp = requests.get(f"{self.api_server}/api/teams/mine/jobs/{job_id}", headers=self.headers)
+        resp = self._request('GET', f"/api/teams/mine/jobs/{job_id}", endpoint="/api/teams/mine/jobs/{job_id}")
         # Allow 404s to be handled gracefully in the route
         if resp.status_code == 404:
             return None
         self._check_response_error(resp)
         return Job(**resp.json())
 
+    def open_job_list(self, etag: str | None = None, last_modified: str | None = None) -> requests.Response:
+        """Starts a streamed GET of the job list, conditional on the given validators.
+
+        Returns the open response (the caller closes it): 304 if the list is
+        unchanged since those validators, otherwise the checked 200 response.
+        """
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        resp = self._request('GET', "/api/teams/mine/jobs", headers=headers, stream=True)
+        if resp.status_code != 304:
+            try:
+                self._check_response_error(resp)
+            except Exception:
+                resp.close()
+                raise
+        return resp
+
+    def iter_jobs(self, chunk_size: int = API_STREAM_CHUNK_SIZE):
+        """Yields the team's jobs one at a time while the list downloads, in bounded memory.
+
+        The connection is held until the generator is exhausted or closed. Yields
+        nothing if the API key is placeholder.
+        """
+        if self._is_key_placeholder():
+            return
+        with self.open_job_list() as resp:
+            for job_data in iter_json_array(resp.iter_content(chunk_size), encoding=resp.encoding or 'utf-8'):
+                yield Job(**job_data)
+
     def list_jobs(self) -> list[Job]:
         """Lists jobs. Returns empty list if API key is placeholder."""
-        if self._is_key_placeholder():
-            return [] # Return empty list if key is missing
-        resp = requests.get(f"{self.api_server}/api/teams/mine/jobs", headers=self.headers)
-        self._check_response_error(resp)
-        return [Job(**job_data) for job_data in resp.json()]
+        return list(self.iter_jobs())
 
     def get_my_team(self) -> Team | None:
         """Gets team details. Returns None if API key is placeholder."""
         if self._is_key_placeholder():
             return None # Indicate key is missing
-        resp = requests.get(f"{self.api_server}/api/teams/mine", headers=self.headers)
+        resp = self._request('GET', "/api/teams/mine")
          # Allow 404s (e.g., key valid but no team registered) to be handled gracefully
         if resp.status_code == 404:
             return None
@@ -210,48 +972,1704 @@ class CompetitionClient:
         if self._is_key_placeholder():
             raise APIKeyNotConfiguredError("Cannot update team: API Key is not configured.")
         payload = {'members': members}
-        resp = requests.patch(f"{self.api_server}/api/teams/mine", headers=self.headers, json=payload)
+        resp = self._request('PATCH', "/api/teams/mine", json=payload)
         self._check_response_error(resp)
         return Team(**resp.json())
 
+# --- Upstream Response Cache ---
+class _Flight:
+    """A single in-progress load that concurrent callers for the same key wait on."""
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class TTLCache:
+    """Thread-safe TTL cache with single-flight loading.
+
+    get_or_load() returns a fresh cached value if there is one. Otherwise exactly
+    one caller runs the loader and concurrent callers for the same key wait for
+    its result instead of issuing their own upstream request. With stale_ttl, a
+    value that expired less than stale_ttl seconds ago is returned immediately
+    while one background thread refreshes it. Errors are never cached.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {} # key -> (value, expires_at)
+        self._inflight = {} # key -> _Flight
+        self._generation = 0 # Bumped by invalidate() so in-flight loads don't store outdated data
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    def get_or_load(self, key, ttl: float, loader, stale_ttl: float = 0):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self.hits += 1
+                return entry[0]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight(self._generation)
+            serve_stale = entry is not None and now - entry[1] < stale_ttl
+            if serve_stale:
+                self.stale_hits += 1
+            elif leader:
+                self.misses += 1
+        if serve_stale:
+            if leader:
+                threading.Thread(target=self._load, args=(key, ttl, loader, flight), daemon=True).start()
+            return entry[0]
+        if leader:
+            self._load(key, ttl, loader, flight)
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _load(self, key, ttl: float, loader, flight: _Flight):
+        try:
+            flight.value = loader()
+            with self._lock:
+                if flight.generation == self._generation:
+                    self._entries[key] = (flight.value, time.monotonic() + ttl)
+        except Exception as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def set(self, key, value, ttl: float):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.stale_hits + self.misses
+        return (self.hits + self.stale_hits) / total if total else 0.0
+
+class ByteLRUCache:
+    """Thread-safe LRU cache bounded by the total size of its values in bytes.
+
+    Entries never expire; the least recently used ones are evicted once the
+    summed sizes (as reported by `sizeof`) exceed max_bytes. Values larger than
+    the whole budget are not cached.
+    """
+    def __init__(self, max_bytes: int, sizeof):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict() # key -> (value, size), least recently used first
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+class CachedCompetitionClient(CompetitionClient):
+    """CompetitionClient with a TTL/single-flight cache in front of get_my_team and list_jobs.
+
+    The team is served stale-while-revalidate, so pages render from memory in the
+    steady state. update_my_team writes through to the cache and create_job
+    invalidates the entries it changes. Completed jobs are immutable upstream, so
+    get_job keeps them in a byte-bounded LRU and only pending jobs hit the network.
+    """
+    def __init__(self, *args, team_ttl: float = TEAM_CACHE_TTL, jobs_ttl: float = JOBS_CACHE_TTL,
+                 team_stale_ttl: float = TEAM_CACHE_STALE_TTL, completed_job_cache_bytes: int = COMPLETED_JOB_CACHE_BYTES,
+                 **kwargs):
+        super().__init__(*args, **kwargs)
+        self.team_ttl = team_ttl
+        self.jobs_ttl = jobs_ttl
+        self.team_stale_ttl = team_stale_ttl
+        self.cache = TTLCache()
+        self.completed_jobs = ByteLRUCache(completed_job_cache_bytes, sizeof=self._job_size)
+
+    @staticmethod
+    def _job_size(job: Job) -> int:
+        """Approximate payload size of a job: its JSON encoding plus fixed per-entry overhead."""
+        return len(json.dumps(dataclasses.asdict(job)).encode()) + 256
+
+    def get_job(self, job_id: str) -> Job | None:
+        job = self.completed_jobs.get(job_id)
+        if job is not None:
+            return job
+        job = super().get_job(job_id)
+        if job is not None and job.is_completed:
+            self.completed_jobs.put(job_id, job)
+        return job
+
+    def get_my_team(self) -> Team | None:
+        return self.cache.get_or_load('team', self.team_ttl, super().get_my_team, stale_ttl=self.team_stale_ttl)
+
+    def list_jobs(self) -> list[Job]:
+        return list(self.cache.get_or_load('jobs', self.jobs_ttl, super().list_jobs))
+
+    def update_my_team(self, members: list[str]) -> Team:
+        team = super().update_my_team(members)
+        self.cache.set('team', team, self.team_ttl)
+        return team
+
+    def create_job(self, scenario: str, subject: str, body: str) -> Job:
+        job = super().create_job(scenario, subject, body)
+        self.cache.invalidate('jobs', 'team') # New job in the list; score may change
+        return job
+
 # Initialize CompetitionClient directly
 # The methods above will now handle the placeholder key internally
-client = CompetitionClient(api_key=API_KEY, api_server=API_SERVER)
+client = CachedCompetitionClient(api_key=API_KEY, api_server=API_SERVER)
+
+# --- Async Client ---
+class AsyncCompetitionClient:
+    """asyncio interface to a CompetitionClient, for running several upstream calls at once.
+
+    Methods mirror CompetitionClient and return the same Job/Team objects. Calls
+    run on a private executor sized to the HTTP pool, which bounds the number
+    of in-flight requests; a cancelled call that has not started yet is dropped.
+    Sync code (Flask routes, the poller) uses run() to await several calls and
+    pays for the slowest one rather than the sum.
+    """
+    def __init__(self, sync_client: CompetitionClient, max_concurrency: int = API_POOL_SIZE):
+        self.sync_client = sync_client
+        self.max_concurrency = max_concurrency
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='api-async')
+
+    async def _call(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(method, *args, **kwargs))
 
-# --- Helper Function to Parse Scenarios ---
-def get_scenarios_from_html(html_content: str) -> list[dict]:
-    """Extracts scenario IDs and display names from the provided HTML snippet."""
-    scenarios = []
-    # Regex to find the text content inside the specific div elements
-    pattern = r'<div data-v-e2c99c4a="" class="select-item">(.*?)<span class="tag'
-    matches = re.findall(pattern, html_content)
-
-    for display_name_full in matches:
-        display_name = display_name_full.strip()
-        # Derive the ID: Find first colon, take text before it,
-        # convert to lowercase, remove spaces.
-        match_id_part = re.match(r"^(.*?):", display_name)
-        if match_id_part:
-            scenario_id = match_id_part.group(1).lower().replace(" ", "")
-            scenarios.append({'id': scenario_id, 'display': display_name})
+    def _is_key_placeholder(self):
+        return self.sync_client._is_key_placeholder()
+
+    async def create_job(self, scenario: str, subject: str, body: str) -> Job:
+        return await self._call(self.sync_client.create_job, scenario=scenario, subject=subject, body=body)
+
+    async def get_job(self, job_id: str) -> Job | None:
+        return await self._call(self.sync_client.get_job, job_id=job_id)
+
+    async def list_jobs(self) -> list[Job]:
+        return await self._call(self.sync_client.list_jobs)
+
+    async def get_my_team(self) -> Team | None:
+        return await self._call(self.sync_client.get_my_team)
+
+    async def update_my_team(self, members: list[str]) -> Team:
+        return await self._call(self.sync_client.update_my_team, members)
+
+    async def get_jobs(self, job_ids, return_exceptions: bool = False) -> dict:
+        """Fetches several jobs concurrently. Returns {job_id: Job | None (or the exception)}."""
+        job_ids = list(job_ids)
+        results = await asyncio.gather(*(self.get_job(job_id) for job_id in job_ids), return_exceptions=return_exceptions)
+        return dict(zip(job_ids, results))
+
+    @staticmethod
+    async def _gather(awaitables, timeout, return_exceptions):
+        tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+        try:
+            return await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=return_exceptions), timeout)
+        finally:
+            for task in tasks:
+                task.cancel() # No-op for finished tasks; drops queued calls after a timeout or error
+
+    def run(self, *awaitables, timeout: float | None = None, return_exceptions: bool = False) -> list:
+        """Sync facade: awaits the given calls concurrently and returns their results in order.
+
+        Raises asyncio.TimeoutError (cancelling whatever has not started) if `timeout` expires.
+        Must not be called from inside a running event loop.
+        """
+        return asyncio.run(self._gather(awaitables, timeout, return_exceptions))
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+async_client = AsyncCompetitionClient(client)
+
+# --- Job Storage Benchmark ---
+def _benchmark_payloads(count: int, seed: int) -> str:
+    """JSON text of `count` synthetic API jobs, so both representations pay for decoding like a real list_jobs()."""
+    rng = random.Random(seed)
+    scenarios = [f'level{level}{variant}' for level in range(1, 5) for variant in 'abcdefghij']
+    objectives = ('email.retrieved', 'defense.undetected', 'exfil.sent', 'exfil.destination', 'exfil.content')
+    start = int(time.time()) - 90 * 86400
+    payloads = []
+    for i in range(count):
+        scheduled = start + rng.randrange(90 * 86400)
+        completed = rng.random() < 0.95
+        payloads.append({
+            'job_id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'team_id': 'benchmark-team',
+            'scenario': rng.choice(scenarios),
+            'subject': f'Benchmark subject {i}',
+            'body': f'Benchmark body {i} ' + 'x' * rng.randrange(400),
+            'scheduled_time': format_api_time(scheduled),
+            'started_time': format_api_time(scheduled + 5),
+            'completed_time': format_api_time(scheduled + 60) if completed else None,
+            'output': f'Benchmark output {i}' if completed else None,
+            'objectives': {name: rng.random() < 0.4 for name in objectives} if completed else None,
+        })
+    return json.dumps(payloads)
+
+def benchmark_job_storage(count: int = 50000, repeat: int = 5, seed: int = 0) -> dict:
+    """Compares retained memory and build time of plain and slotted Job dataclasses on synthetic jobs."""
+    raw = _benchmark_payloads(count, seed)
+    plain_job = dataclasses.make_dataclass('PlainJob', [ # Job as it would be without slots=True
+        (field.name, field.type) if field.default is dataclasses.MISSING else (field.name, field.type, field.default)
+        for field in dataclasses.fields(Job)])
+    builders = {
+        'dataclasses': lambda data: [plain_job(**payload) for payload in data],
+        'slots': lambda data: [Job(**payload) for payload in data],
+    }
+    results = {}
+    for name, build in builders.items():
+        # Memory retained once the decoded JSON is gone (tracemalloc slows allocation, so build time is measured apart)
+        gc.collect()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        jobs = build(json.loads(raw))
+        gc.collect()
+        results[name] = {'memory_bytes': tracemalloc.get_traced_memory()[0] - baseline}
+        tracemalloc.stop()
+        del jobs
+        data = json.loads(raw)
+        results[name]['build'] = min(timeit.repeat(lambda data=data: build(data), number=1, repeat=repeat))
+        del data
+    return results
+
+# --- Local Job Store ---
+# Jobs are mirrored into the JobRecord table. Completed jobs never change upstream,
+# so they are written once and then served locally; pending jobs are kept fresh by
+# the JobPoller below. The full team list is re-downloaded at most every
+# JOB_SYNC_INTERVAL seconds to pick up jobs submitted outside this app.
+_job_sync_lock = threading.Lock()
+_last_full_sync = 0.0
+
+def store_job(job: Job) -> JobRecord:
+    """Inserts or refreshes a job in the local store (caller commits). Completed rows are left untouched."""
+    record = db.session.get(JobRecord, job.job_id)
+    if record is None:
+        record = JobRecord(job_id=job.job_id)
+        record.update_from_job(job)
+        db.session.add(record)
+        similarity_index.add(job) # Subject and body never change, so new jobs are indexed once
+        search_index.add(record)
+        if record.is_completed:
+            record_job_outcome(record)
+        return record
+    if not record.is_completed:
+        # Claim the completion with a conditional UPDATE: if another writer (the poller, a sync,
+        # another worker) has already stored it, the row no longer matches and it is not counted again
+        completed = job.is_completed and db.session.execute(
+            db.update(JobRecord).where(JobRecord.job_id == job.job_id, JobRecord.completed_time.is_(None))
+            .values(completed_time=job.completed_time)).rowcount == 1
+        record.update_from_job(job)
+        if completed:
+            search_index.add(record) # Now with its output
+            record_job_outcome(record)
+    return record
+
+def sync_jobs(force: bool = False) -> bool:
+    """Syncs the job list when the store is empty, when forced, or every JOB_SYNC_INTERVAL seconds.
+
+    Only changes are written (see JobListSync); a forced sync re-reads the whole list.
+    Returns True if this call ran a sync.
+    """
+    global _last_full_sync
+    if not force and time.time() - _last_full_sync < JOB_SYNC_INTERVAL:
+        return False
+    if not _job_sync_lock.acquire(blocking=False):
+        return False # Another request is already syncing; serve what we have
+    try:
+        job_list_sync.run(force=force)
+        _last_full_sync = time.time()
+        return True
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        _job_sync_lock.release()
+
+def ensure_job_store_schema():
+    """Drops the JobRecord table if its columns or indexes predate the model, so create_all() rebuilds it.
+
+    The table is only a mirror of the API; it is refilled by the next sync.
+    """
+    inspector = db.inspect(db.engine)
+    table = JobRecord.__table__
+    if not inspector.has_table(table.name):
+        return
+    columns = {column['name'] for column in inspector.get_columns(table.name)}
+    indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+    if columns != {column.name for column in table.columns} or not {index.name for index in table.indexes} <= indexes:
+        print(f"Job store schema is out of date; rebuilding table '{table.name}' from the API.")
+        table.drop(db.engine)
+        JobStats.__table__.drop(db.engine, checkfirst=True) # Recounted as the jobs are synced again
+
+# Keyset orderings for the job list; each ends in a unique column so the cursor is unambiguous
+JOB_SORTS = {
+    'date-desc': ((JobRecord.scheduled_time, True), (JobRecord.job_id, True)),
+    'date-asc': ((JobRecord.scheduled_time, False), (JobRecord.job_id, False)),
+    'scenario': ((JobRecord.scenario, False), (JobRecord.scheduled_time, True), (JobRecord.job_id, True)),
+    'success-rate': ((JobRecord.success_rate, True), (JobRecord.scheduled_time, True), (JobRecord.job_id, True)),
+}
+JOB_STATUSES = ('success', 'partial', 'failed', 'processing')
+OBJECTIVE_NAME_PATTERN = re.compile(r'^[\w.\-]+$')
+
+def _encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+def _decode_cursor(cursor: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid page cursor: {e}")
+    if not isinstance(values, list):
+        raise ValueError("Invalid page cursor.")
+    return values
+
+def filter_jobs_query(scenario: str | None = None, status: str | None = None, objective: str | None = None,
+                      objective_status: str = 'any', subject: str | None = None):
+    """Returns a JobRecord query restricted to the job list filters (None means no restriction)."""
+    query = JobRecord.query
+    if scenario:
+        query = query.filter(JobRecord.scenario == scenario)
+    if status in JOB_STATUSES:
+        query = query.filter(JobRecord.status == status)
+    if objective and OBJECTIVE_NAME_PATTERN.match(objective):
+        result = db.func.json_extract(JobRecord.objectives, f'$."{objective}"') # 1/0 for true/false, NULL if absent
+        if objective_status == 'success':
+            query = query.filter(result == 1)
+        elif objective_status == 'failed':
+            query = query.filter(result == 0)
         else:
-            print(f"Warning: Could not derive ID from scenario display name: {display_name}")
-            # Optionally append with a dummy/display name as ID, or skip
-            # scenarios.append({'id': display_name, 'display': display_name})
+            query = query.filter(result.isnot(None))
+    if subject:
+        pattern = subject.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        query = query.filter(JobRecord.subject.ilike(f'%{pattern}%', escape='\\'))
+    return query
+
+def query_jobs(sort: str = 'date-desc', cursor: str | None = None, limit: int = JOBS_PAGE_SIZE,
+               **filters) -> tuple[list[JobRecord], str | None]:
+    """Returns one page of stored jobs matching the filters and the cursor for the next page (or None).
+
+    Pages are keyset-paginated on the sort columns, so every page costs the same
+    regardless of how deep it is. Raises ValueError for a malformed cursor.
+    """
+    query = filter_jobs_query(**filters)
+    order = JOB_SORTS.get(sort, JOB_SORTS['date-desc'])
+    if cursor:
+        values = _decode_cursor(cursor)
+        if len(values) != len(order):
+            raise ValueError("Invalid page cursor.")
+        # Rows strictly after the cursor: (a, b, c) > (x, y, z) expanded per column direction
+        query = query.filter(db.or_(*(
+            db.and_(*(column == values[j] for j, (column, _) in enumerate(order[:i])),
+                    column < values[i] if descending else column > values[i])
+            for i, (column, descending) in enumerate(order)
+        )))
+    query = query.order_by(*(column.desc() if descending else column.asc() for column, descending in order))
+
+    records = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        next_cursor = _encode_cursor([getattr(records[-1], column.key) for column, _ in order])
+    return records, next_cursor
+
+def get_stored_job(job_id: str) -> Job | None:
+    """Returns a job from the local store, going to the API only if it is unknown or its pending copy is stale."""
+    record = db.session.get(JobRecord, job_id)
+    if record is not None and (record.is_completed or time.time() - record.synced_at < JOB_PENDING_REFRESH_INTERVAL):
+        return record.to_job()
+    job = client.get_job(job_id=job_id)
+    if job is None:
+        return record.to_job() if record is not None else None
+    store_job(job)
+    db.session.commit()
+    return job
+
+def get_stored_jobs(job_ids: list[str]) -> dict[str, Job | None]:
+    """Bulk get_stored_job: one query for stored rows, then concurrent API fetches for unknown or stale ones."""
+    records = {record.job_id: record for record in JobRecord.query.filter(JobRecord.job_id.in_(job_ids))}
+    now = time.time()
+    jobs, stale = {}, []
+    for job_id in job_ids:
+        record = records.get(job_id)
+        if record is not None and (record.is_completed or now - record.synced_at < JOB_PENDING_REFRESH_INTERVAL):
+            jobs[job_id] = record.to_job()
+        else:
+            stale.append(job_id)
+    if stale:
+        for job_id, job in zip(stale, async_client.run(*(async_client.get_job(job_id) for job_id in stale))):
+            if job is None:
+                jobs[job_id] = records[job_id].to_job() if job_id in records else None
+            else:
+                store_job(job)
+                jobs[job_id] = job
+        db.session.commit()
+    return {job_id: jobs[job_id] for job_id in job_ids}
+
+# --- Prompt Similarity Index ---
+class SimilarityIndex:
+    """MinHash/LSH index over job subjects and bodies for finding near-duplicate prompts.
+
+    Each job is reduced to word 3-gram shingles and a MinHash signature built
+    with one-permutation hashing: every shingle is hashed once and lands in one
+    of `num_bins` bins keyed by its low bits, and each bin keeps its minimum.
+    Empty bins borrow from the next non-empty bin (rotation densification) so
+    short prompts still give comparable signatures.
+
+    Signatures are split into `bands` bands whose hashes are stored in the
+    JobLSHBucket table; two jobs are candidates when any band matches, which for
+    the defaults (128 bins, 32 bands of 4) starts to happen around 40% Jaccard
+    similarity. A lookup is one indexed probe per band plus an exact signature
+    comparison for at most `max_candidates` jobs, independent of the job count.
+    """
+    WORD_PATTERN = re.compile(r'\w+')
+
+    def __init__(self, num_bins: int = SIMILARITY_NUM_BINS, bands: int = SIMILARITY_BANDS,
+                 max_candidates: int = SIMILARITY_MAX_CANDIDATES):
+        if num_bins & (num_bins - 1) or num_bins % bands:
+            raise ValueError("num_bins must be a power of two and a multiple of bands.")
+        self.num_bins = num_bins
+        self.bands = bands
+        self.rows = num_bins // bands
+        self.max_candidates = max_candidates
+        self._bin_bits = num_bins.bit_length() - 1
+        self._value_bits = 64 - self._bin_bits
+
+    def _shingles(self, subject: str, body: str) -> set[str]:
+        words = self.WORD_PATTERN.findall(f'{subject}\n{body}'.lower())
+        if len(words) < 3:
+            return {' '.join(words)} if words else set()
+        return {' '.join(words[i:i + 3]) for i in range(len(words) - 2)}
+
+    def signature(self, subject: str, body: str) -> array.array | None:
+        """Returns the job's MinHash signature, or None if it has no words at all."""
+        shingles = self._shingles(subject or '', body or '')
+        if not shingles:
+            return None
+        empty = 1 << 64
+        mins = [empty] * self.num_bins
+        mask = self.num_bins - 1
+        for shingle in shingles:
+            h = int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'little')
+            slot, value = h & mask, h >> self._bin_bits
+            if value < mins[slot]:
+                mins[slot] = value
+        signature = array.array('Q', bytes(8 * self.num_bins))
+        for slot in range(self.num_bins):
+            distance = 0
+            while mins[(slot + distance) & mask] == empty:
+                distance += 1
+            # Borrowed minima are offset by their distance so they only match bins borrowed the same way
+            signature[slot] = mins[(slot + distance) & mask] | (distance << self._value_bits)
+        return signature
+
+    def _band_buckets(self, signature: array.array) -> list[tuple[int, int]]:
+        buckets = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            buckets.append((band, int.from_bytes(hashlib.blake2b(rows, digest_size=8).digest(), 'little', signed=True)))
+        return buckets
+
+    def add(self, job) -> bool:
+        """Indexes a job (JobRecord or Job) unless it already is (caller commits). Returns True if added."""
+        if db.session.get(JobSignature, job.job_id) is not None:
+            return False
+        signature = self.signature(job.subject, job.body)
+        if signature is None:
+            return False
+        db.session.add(JobSignature(job_id=job.job_id, signature=signature.tobytes()))
+        db.session.add_all(JobLSHBucket(band=band, bucket=bucket, job_id=job.job_id)
+                           for band, bucket in self._band_buckets(signature))
+        return True
+
+    def backfill(self, batch_size: int = 500) -> int:
+        """Indexes stored jobs that have no signature yet (e.g. synced before the index existed)."""
+        added = 0
+        while True:
+            records = (JobRecord.query.outerjoin(JobSignature, JobSignature.job_id == JobRecord.job_id)
+                       .filter(JobSignature.job_id.is_(None), JobRecord.body != '').limit(batch_size).all())
+            batch_added = sum(self.add(record) for record in records)
+            db.session.commit()
+            added += batch_added
+            if len(records) < batch_size or not batch_added:
+                return added
+
+    def most_similar(self, job_id: str, k: int = 10) -> list[tuple[str, float]]:
+        """Returns up to k (job_id, estimated Jaccard similarity) pairs, most similar first, excluding the job itself."""
+        row = db.session.get(JobSignature, job_id)
+        if row is None:
+            record = db.session.get(JobRecord, job_id)
+            if record is None or not self.add(record):
+                return []
+            db.session.commit()
+            row = db.session.get(JobSignature, job_id)
+        signature = array.array('Q')
+        signature.frombytes(row.signature)
+
+        shared_bands = db.func.count(JobLSHBucket.band)
+        candidates = [candidate_id for candidate_id, _ in
+                      db.session.query(JobLSHBucket.job_id, shared_bands)
+                      .filter(db.tuple_(JobLSHBucket.band, JobLSHBucket.bucket).in_(self._band_buckets(signature)),
+                              JobLSHBucket.job_id != job_id)
+                      .group_by(JobLSHBucket.job_id)
+                      .order_by(shared_bands.desc())
+                      .limit(self.max_candidates)]
+        scored = []
+        for candidate in JobSignature.query.filter(JobSignature.job_id.in_(candidates)):
+            other = array.array('Q')
+            other.frombytes(candidate.signature)
+            scored.append((candidate.job_id, sum(a == b for a, b in zip(signature, other)) / self.num_bins))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:k]
+
+similarity_index = SimilarityIndex()
+
+def query_similar_jobs(reference: str, limit: int = JOBS_PAGE_SIZE, **filters) -> list[tuple[JobRecord, float]]:
+    """Returns up to `limit` (record, similarity) pairs for the stored jobs most similar to `reference` that match the filters."""
+    # Over-fetch when filtering so that enough neighbours survive it
+    restricted = any(value not in (None, 'any') for value in filters.values())
+    scores = dict(similarity_index.most_similar(reference, k=limit * 4 if restricted else limit))
+    if not scores:
+        return []
+    records = filter_jobs_query(**filters).filter(JobRecord.job_id.in_(scores)).all()
+    records.sort(key=lambda record: scores[record.job_id], reverse=True)
+    return [(record, scores[record.job_id]) for record in records[:limit]]
+
+# --- Full-Text Job Search ---
+class JobSearchIndex:
+    """SQLite FTS5 index over job subjects, bodies and model output, used by /jobs/search.
+
+    The index is the `job_search` virtual table in the app database, created by
+    db.create_all() (see the after_create hook below). Rows are keyed by a hash
+    of the job id so a job can be re-indexed in place once its output arrives;
+    store_job() does that, so the index follows the job store without rescans.
+    """
+    TABLE = 'job_search'
+    COLUMNS = ('subject', 'body', 'output')
+    WEIGHTS = (0.0, 2.0, 1.0, 1.0) # bm25 weights for job_id (unindexed), subject, body, output
+    TERM_PATTERN = re.compile(r'(?:(subject|body|output):)?("[^"]*"?|\S+)')
+    OPERATORS = ('AND', 'OR', 'NOT')
+    HIGHLIGHT_START, HIGHLIGHT_END = '\x02', '\x03'
+
+    def __init__(self, page_size: int = SEARCH_PAGE_SIZE, snippet_tokens: int = SEARCH_SNIPPET_TOKENS):
+        self.page_size = page_size
+        self.snippet_tokens = snippet_tokens
+        self.table = db.table(self.TABLE, db.column('rowid'), db.column('job_id'), *(db.column(name) for name in self.COLUMNS))
+
+    def create_table_ddl(self):
+        return db.DDL(f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.TABLE} USING fts5("
+                      f"job_id UNINDEXED, {', '.join(self.COLUMNS)}, tokenize='porter unicode61')")
+
+    @staticmethod
+    def _rowid(job_id: str) -> int:
+        return int.from_bytes(hashlib.blake2b(job_id.encode(), digest_size=8).digest(), 'little', signed=True)
+
+    def add(self, record: JobRecord):
+        """Indexes or re-indexes a stored job (caller commits)."""
+        db.session.execute(db.text(
+            f"INSERT OR REPLACE INTO {self.TABLE} (rowid, job_id, subject, body, output) "
+            "VALUES (:rowid, :job_id, :subject, :body, :output)"
+        ), {'rowid': self._rowid(record.job_id), 'job_id': record.job_id, 'subject': record.subject or '',
+            'body': record.body or '', 'output': record.output or ''})
+
+    def backfill(self, batch_size: int = 500) -> int:
+        """Indexes stored jobs that are missing from the index, or whose output arrived without being indexed."""
+        indexed = dict(db.session.execute(db.text(f"SELECT job_id, output != '' FROM {self.TABLE}")).all())
+        added = 0
+        for record in JobRecord.query.yield_per(batch_size):
+            if record.job_id not in indexed or (record.output and not indexed[record.job_id]):
+                self.add(record)
+                added += 1
+        db.session.commit()
+        return added
+
+    def match_expression(self, text: str) -> str:
+        """Turns a search box query into an FTS5 MATCH expression.
+
+        Words and "quoted phrases" are matched literally (all must appear), word*
+        matches a prefix, subject:/body:/output: restrict a term to one column and
+        AND/OR/NOT combine terms. Raises ValueError if nothing searchable is left.
+        """
+        terms = []
+        for column, value in self.TERM_PATTERN.findall(text):
+            if not column and value in self.OPERATORS:
+                if terms and terms[-1] not in self.OPERATORS:
+                    terms.append(value)
+                continue
+            prefix = value.endswith('*') and not value.startswith('"')
+            phrase = value.strip('"').rstrip('*') if not value.startswith('"') else value.strip('"')
+            if not re.search(r'\w', phrase):
+                continue
+            term = '"' + phrase.replace('"', '""') + '"' + ('*' if prefix else '')
+            terms.append(f'{column} : {term}' if column else term)
+        while terms and terms[-1] in self.OPERATORS:
+            terms.pop()
+        if not terms:
+            raise ValueError("Enter a word or \"phrase\" to search for.")
+        return ' '.join(terms)
+
+    def search(self, text: str, page: int = 1, **filters) -> tuple[list[tuple[JobRecord, str]], bool]:
+        """Returns one page of (record, snippet) pairs, best match first, and whether there are more.
+
+        `filters` are the job list filters (see filter_jobs_query). Snippets mark
+        matched terms with HIGHLIGHT_START/HIGHLIGHT_END; see highlight().
+        """
+        match = self.match_expression(text)
+        fts = db.literal_column(self.TABLE)
+        rank = db.func.bm25(fts, *self.WEIGHTS)
+        snippet = db.func.snippet(fts, -1, self.HIGHLIGHT_START, self.HIGHLIGHT_END, '…', self.snippet_tokens)
+        rows = (filter_jobs_query(**filters)
+                .join(self.table, self.table.c.job_id == JobRecord.job_id)
+                .filter(fts.op('MATCH')(match))
+                .add_columns(snippet)
+                .order_by(rank, JobRecord.scheduled_time.desc())
+                .offset((max(page, 1) - 1) * self.page_size)
+                .limit(self.page_size + 1)
+                .all())
+        return [(record, text) for record, text in rows[:self.page_size]], len(rows) > self.page_size
+
+    def highlight(self, snippet: str) -> Markup:
+        """HTML for a search snippet, with matched terms in <mark>."""
+        return Markup(str(escape(snippet)).replace(self.HIGHLIGHT_START, '<mark>').replace(self.HIGHLIGHT_END, '</mark>'))
+
+search_index = JobSearchIndex()
+db.event.listen(db.metadata, 'after_create', search_index.create_table_ddl())
+
+# --- Job Statistics ---
+STATS_OBJECTIVES = ('email.retrieved', 'defense.undetected', 'exfil.sent', 'exfil.destination', 'exfil.content')
+STATS_DAY_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+def _job_stats_rows(record: JobRecord) -> list[dict]:
+    """JobStats increments for one completed job: whole-job and per-objective rows, all-time and for its day."""
+    day = (record.scheduled_time or '')[:10]
+    rows = []
+    for bucket in ('', day) if STATS_DAY_PATTERN.match(day) else ('',):
+        rows.append(dict(scenario=record.scenario, objective='', day=bucket, attempts=1,
+                         successes=int(record.status == 'success'), partials=int(record.status == 'partial')))
+        for objective, met in (record.objectives or {}).items():
+            rows.append(dict(scenario=record.scenario, objective=objective, day=bucket, attempts=1,
+                             successes=int(bool(met)), partials=0))
+    return rows
+
+def record_job_outcome(record: JobRecord):
+    """Adds a newly completed job to the JobStats counters (caller commits).
+
+    One upsert of a handful of rows, so the cost does not depend on how many
+    jobs have been stored. store_job() calls this exactly once per job, when
+    its conditional UPDATE moves the stored row from pending to completed.
+    """
+    stmt = sqlite_insert(JobStats).values(_job_stats_rows(record))
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[JobStats.scenario, JobStats.objective, JobStats.day],
+        set_={column: getattr(JobStats, column) + getattr(stmt.excluded, column) for column in ('attempts', 'successes', 'partials')},
+    ))
+
+def rebuild_job_stats(batch_size: int = 1000) -> int:
+    """Recomputes JobStats from the job store in one pass (after a schema rebuild, or to repair drift). Returns jobs counted."""
+    totals = collections.Counter()
+    counted = 0
+    for record in JobRecord.query.filter(JobRecord.completed_time.isnot(None)).yield_per(batch_size):
+        counted += 1
+        for row in _job_stats_rows(record):
+            key = (row['scenario'], row['objective'], row['day'])
+            totals[key + ('attempts',)] += row['attempts']
+            totals[key + ('successes',)] += row['successes']
+            totals[key + ('partials',)] += row['partials']
+    JobStats.query.delete()
+    keys = {key[:3] for key in totals}
+    db.session.add_all(JobStats(scenario=scenario, objective=objective, day=day,
+                                attempts=totals[(scenario, objective, day, 'attempts')],
+                                successes=totals[(scenario, objective, day, 'successes')],
+                                partials=totals[(scenario, objective, day, 'partials')])
+                       for scenario, objective, day in keys)
+    db.session.commit()
+    return counted
+
+def _rate(successes: int, attempts: int) -> float | None:
+    return successes / attempts if attempts else None
+
+def job_stats_summary(days: int = STATS_DAYS) -> dict:
+    """Success statistics per scenario (with per-objective and per-day breakdowns) read from JobStats only."""
+    since = time.strftime('%Y-%m-%d', time.gmtime(time.time() - (days - 1) * 86400))
+    rows = JobStats.query.filter(db.or_(JobStats.day == '', JobStats.day >= since)).all()
+    scenarios = {}
+    for row in rows:
+        entry = scenarios.setdefault(row.scenario, {'attempts': 0, 'successes': 0, 'partials': 0, 'success_rate': None,
+                                                    'objectives': {}, 'daily': {}})
+        counts = {'attempts': row.attempts, 'successes': row.successes, 'success_rate': _rate(row.successes, row.attempts)}
+        if row.day and not row.objective:
+            entry['daily'][row.day] = counts
+        elif not row.day and row.objective:
+            entry['objectives'][row.objective] = counts
+        elif not row.day:
+            entry.update(counts, partials=row.partials)
+    totals = {field: sum(entry[field] for entry in scenarios.values()) for field in ('attempts', 'successes', 'partials')}
+    totals['success_rate'] = _rate(totals['successes'], totals['attempts'])
+    day_list = [time.strftime('%Y-%m-%d', time.gmtime(time.time() - offset * 86400)) for offset in range(days - 1, -1, -1)]
+    return {'totals': totals, 'days': day_list, 'scenarios': dict(sorted(scenarios.items()))}
+
+# --- Job List Delta Sync ---
+@dataclasses.dataclass
+class JobListDelta:
+    """One batch of changes found by JobListSync: jobs seen for the first time and jobs that have completed since."""
+    new: list[Job] = dataclasses.field(default_factory=list)
+    completed: list[Job] = dataclasses.field(default_factory=list)
+
+    def __len__(self):
+        return len(self.new) + len(self.completed)
+
+class JobListSync:
+    """Finds what changed in the team's job list and publishes per-job deltas to subscribers.
+
+    A run first asks for the list conditionally (If-None-Match / If-Modified-Since)
+    once the API has sent an ETag or Last-Modified; a 304 ends it. Otherwise the
+    body is hashed while it downloads (spooled to disk past `spool_bytes`) and is
+    only parsed if the hash differs from the last run's. Parsed jobs are compared
+    with the state known from the previous run: only new jobs and newly completed
+    ones are published, in batches of `batch_size`, so subscribers (the job store,
+    and through it the search/similarity indexes and statistics; the poller; the
+    client cache) do work proportional to the changes rather than to the history.
+    Validators are only remembered after every subscriber has accepted the run.
+    """
+    def __init__(self, api_client: CompetitionClient, batch_size: int = JOB_SYNC_BATCH_SIZE,
+                 spool_bytes: int = JOB_SYNC_SPOOL_BYTES, chunk_size: int = API_STREAM_CHUNK_SIZE):
+        self.client = api_client
+        self.batch_size = batch_size
+        self.spool_bytes = spool_bytes
+        self.chunk_size = chunk_size
+        self.etag = None
+        self.last_modified = None
+        self.content_hash = None
+        self.runs = 0
+        self.not_modified = 0 # Runs ended by a 304
+        self.unchanged = 0 # Runs whose body hash matched the previous one
+        self.published = 0 # Job deltas published in total
+        self._known = None # job_id -> completed?, loaded from the job store on first use
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """Registers callback(delta: JobListDelta), called once per batch of changes in publish order."""
+        self._subscribers.append(callback)
+        return callback
+
+    def reset(self):
+        """Forgets validators and known job states, so the next run re-reads everything from the job store and API."""
+        self.etag = self.last_modified = self.content_hash = None
+        self._known = None
+
+    def _load_known(self) -> dict[str, bool]:
+        return {job_id: completed for job_id, completed in
+                db.session.query(JobRecord.job_id, JobRecord.completed_time.isnot(None))}
+
+    def _publish(self, delta: JobListDelta):
+        for callback in self._subscribers:
+            callback(delta)
+        for job in delta.new + delta.completed:
+            self._known[job.job_id] = job.is_completed
+        self.published += len(delta)
+
+    def run(self, force: bool = False) -> dict:
+        """Runs one sync (force ignores validators and reloads known states). Returns counts of what happened."""
+        with self._lock:
+            if force:
+                self.reset()
+            if self._known is None:
+                self._known = self._load_known()
+            self.runs += 1
+            with self.client.open_job_list(self.etag, self.last_modified) as resp:
+                if resp.status_code == 304:
+                    self.not_modified += 1
+                    return {'status': 'not-modified', 'new': 0, 'completed': 0}
+                etag, last_modified = resp.headers.get('ETag'), resp.headers.get('Last-Modified')
+                encoding = resp.encoding or 'utf-8'
+                with tempfile.SpooledTemporaryFile(max_size=self.spool_bytes) as body:
+                    digest = hashlib.sha256()
+                    for chunk in resp.iter_content(self.chunk_size):
+                        digest.update(chunk)
+                        body.write(chunk)
+                    content_hash = digest.hexdigest()
+                    if content_hash == self.content_hash:
+                        self.unchanged += 1
+                        self.etag, self.last_modified = etag, last_modified
+                        return {'status': 'unchanged', 'new': 0, 'completed': 0}
+                    body.seek(0)
+                    counts = self._diff(iter_json_array(iter(lambda: body.read(self.chunk_size), b''), encoding=encoding))
+            self.etag, self.last_modified, self.content_hash = etag, last_modified, content_hash
+            return {'status': 'changed', **counts}
+
+    def _diff(self, items) -> dict:
+        known = self._known
+        delta = JobListDelta()
+        counts = {'new': 0, 'completed': 0}
+        for job_data in items:
+            job = Job(**job_data)
+            was_completed = known.get(job.job_id)
+            if was_completed is None:
+                delta.new.append(job)
+                counts['new'] += 1
+            elif job.is_completed and not was_completed:
+                delta.completed.append(job)
+                counts['completed'] += 1
+            else:
+                continue
+            if len(delta) >= self.batch_size:
+                self._publish(delta)
+                delta = JobListDelta()
+        if delta:
+            self._publish(delta)
+        return counts
+
+job_list_sync = JobListSync(client)
+
+@job_list_sync.subscribe
+def _store_job_delta(delta: JobListDelta):
+    """Writes changed jobs to the job store; store_job() keeps the indexes and statistics in step."""
+    try:
+        for job in delta.new + delta.completed:
+            store_job(job)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+@job_list_sync.subscribe
+def _track_job_delta(delta: JobListDelta):
+    """Hands pending jobs to the poller and completions to its event subscribers."""
+    for job in delta.new + delta.completed:
+        job_poller.track(job)
+
+@job_list_sync.subscribe
+def _cache_job_delta(delta: JobListDelta):
+    """Warms the completed-job cache and drops the cached job list, which is now out of date."""
+    for job in delta.new + delta.completed:
+        if job.is_completed:
+            client.completed_jobs.put(job.job_id, job)
+    client.cache.invalidate('jobs')
+
+# --- Background Job Poller ---
+class JobPoller:
+    """Refreshes pending jobs from the API on one shared background schedule.
+
+    /job_status answers from the poller's in-memory snapshots and only registers
+    job ids here, so upstream calls scale with the number of pending jobs rather
+    than with open browser tabs. Every `interval` seconds the poller fetches at
+    most `max_per_cycle` jobs, least recently polled first, concurrently through
+    async_client so a cycle takes about one round trip. Successful fetches are
+    stored even if others in the cycle fail; the first error is then raised.
+
+    Completions are also pushed to subscribers (see /events/jobs), so browsers
+    can hold one streaming connection instead of polling.
+    """
+    def __init__(self, app=None, interval: float = JOB_POLL_INTERVAL, max_per_cycle: int = JOB_POLL_MAX_PER_CYCLE,
+                 completed_capacity: int = 1000):
+        self.app = app
+        self.interval = interval
+        self.max_per_cycle = max_per_cycle
+        self.completed_capacity = completed_capacity
+        self.cycles = 0
+        self.upstream_calls = 0
+        self._lock = threading.Lock()
+        self._pending = collections.OrderedDict() # job_id -> status snapshot, least recently polled first
+        self._completed = collections.OrderedDict() # Recently completed snapshots, bounded LRU
+        self._subscribers = set() # Queues of open event streams
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.before_request(self.start) # Start lazily inside the serving process (not the reloader parent)
+
+    def start(self):
+        """Seeds the pending set from the job store and starts the polling thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='job-poller', daemon=True)
+        with self.app.app_context():
+            for record in JobRecord.query.filter(JobRecord.completed_time.is_(None)).order_by(JobRecord.synced_at):
+                self.track(record.to_job())
+        self._thread.start()
+
+    @staticmethod
+    def _snapshot(job: Job) -> dict:
+        return {'job_id': job.job_id, 'completed': job.is_completed, 'output': job.output, 'objectives': job.objectives}
+
+    def subscribe(self, maxsize: int = 100) -> queue.Queue:
+        """Returns a queue that receives the snapshot of every job that completes from now on."""
+        subscription = queue.Queue(maxsize=maxsize)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: queue.Queue):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def track(self, job: Job) -> dict:
+        """Records the latest known state of a job and keeps polling it while it is pending."""
+        snapshot = self._snapshot(job)
+        with self._lock:
+            if job.is_completed:
+                if self._pending.pop(job.job_id, None) is not None:
+                    for subscription in self._subscribers:
+                        try:
+                            subscription.put_nowait(snapshot)
+                        except queue.Full:
+                            pass # Slow consumer; it can still fall back to /job_status
+                self._completed[job.job_id] = snapshot
+                self._completed.move_to_end(job.job_id)
+                while len(self._completed) > self.completed_capacity:
+                    self._completed.popitem(last=False)
+            elif job.job_id in self._pending:
+                self._pending[job.job_id] = snapshot
+            else:
+                self._pending[job.job_id] = snapshot
+                self._pending.move_to_end(job.job_id, last=False) # New jobs are polled first
+        return snapshot
+
+    def status(self, job_id: str) -> dict | None:
+        with self._lock:
+            return self._pending.get(job_id) or self._completed.get(job_id)
+
+    def lookup(self, job_id: str) -> dict | None:
+        """Returns a job's status from memory, falling back to the local store and, once, the API."""
+        snapshot = self.status(job_id)
+        if snapshot is not None:
+            return snapshot
+        job = get_stored_job(job_id)
+        return self.track(job) if job is not None else None
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.poll_once()
+            except Exception as e:
+                self.app.logger.error(f"Job poller cycle failed: {e}")
+
+    def poll_once(self) -> int:
+        """Runs one polling cycle. Returns the number of jobs fetched."""
+        with self._lock:
+            batch = list(itertools.islice(self._pending, self.max_per_cycle))
+            for job_id in batch:
+                self._pending.move_to_end(job_id)
+        self.upstream_calls += len(batch)
+        metrics.record_poll(len(batch))
+        results = async_client.run(*(async_client.get_job(job_id) for job_id in batch), return_exceptions=True)
+        errors = [job for job in results if isinstance(job, Exception)]
+        fetched = [job for job in results if isinstance(job, Job)]
+        with self._lock:
+            for job_id, job in zip(batch, results):
+                if job is None:
+                    self._pending.pop(job_id, None) # Gone upstream; stop polling it
+        with self.app.app_context():
+            for job in fetched:
+                store_job(job)
+            db.session.commit()
+        for job in fetched:
+            self.track(job) # After the commit, so subscribers find the stored result
+        self.cycles += 1
+        if errors:
+            raise errors[0]
+        return len(batch)
+
+job_poller = JobPoller(app)
+
+# --- Job Submission Queue ---
+class TokenBucket:
+    """Token-bucket rate limiter whose rate adapts to the API's 429 responses.
+
+    Each success nudges the rate up by `rate_step` tokens/second; a 429 halves it,
+    empties the bucket and pauses all acquisitions for Retry-After (or `cooldown`)
+    seconds, so throughput settles just under the team limit.
+    """
+    def __init__(self, rate: float, capacity: int, min_rate: float | None = None, max_rate: float | None = None,
+                 rate_step: float | None = None, cooldown: float = SUBMIT_RATE_LIMIT_COOLDOWN):
+        self.rate = rate # Tokens per second
+        self.capacity = max(1, capacity)
+        self.min_rate = min_rate if min_rate is not None else rate / 8
+        self.max_rate = max_rate if max_rate is not None else rate * 4
+        self.rate_step = rate_step if rate_step is not None else rate / 10
+        self.cooldown = cooldown
+        self.rate_limited_count = 0
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """Takes a token if one is available. Returns 0 on success, otherwise the seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout: float | None = None) -> bool:
+        """Blocks until a token is available (or `timeout` expires). Returns True if a token was taken."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire()
+            if wait == 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.rate_step)
+
+    def on_rate_limited(self, retry_after: float | None = None):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = 0.0
+            self._paused_until = max(self._paused_until, now + (retry_after if retry_after is not None else self.cooldown))
+            self.rate_limited_count += 1
+
+
+def submission_not_created(error: Exception) -> bool:
+    """Whether a failed create_job certainly created nothing upstream, so sending it again cannot duplicate it.
+
+    That is the case when the connection could not be opened (nothing was sent)
+    or the API answered with a 4xx. A read timeout, a connection lost after
+    sending or a 5xx leaves the outcome unknown.
+    """
+    if isinstance(error, APIError):
+        return error.status_code is not None and 400 <= error.status_code < 500
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        return isinstance(getattr(error.args[0], 'reason', error.args[0]), ConnectTimeoutError) # Includes refused/DNS failures
+    return False
+
+def ensure_submission_queue_schema():
+    """Adds columns the QueuedSubmission model has gained to an existing table (its rows must be kept)."""
+    inspector = db.inspect(db.engine)
+    table = QueuedSubmission.__table__
+    if not inspector.has_table(table.name):
+        return
+    existing = {column['name'] for column in inspector.get_columns(table.name)}
+    with db.engine.begin() as conn:
+        for column in table.columns:
+            if column.name not in existing:
+                conn.execute(db.text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(db.engine.dialect)}'))
+
+class SubmissionDispatcher:
+    """Drains the QueuedSubmission table into the API under the shared TokenBucket.
+
+    /create_job only enqueues and returns a ticket, so a burst never turns into
+    a wall of 429s and nothing is lost if the app restarts: rows stay 'queued'
+    in SQLite until a submission succeeds. A 429 leaves the row queued and backs
+    the limiter off.
+
+    A job is never sent twice. A row is claimed ('sending', committed) before
+    its request goes out and its job id is committed before anything else is
+    done with the job, so a crash or a second dispatcher cannot send it again.
+    Only failures that certainly created nothing (see submission_not_created)
+    are retried, after a per-row exponential backoff, up to SUBMIT_MAX_ATTEMPTS.
+    A row whose outcome is unknown moves to 'unknown' until reconcile_unknown()
+    finds its job in the team's job list or confirms that it is not there.
+    """
+    def __init__(self, app=None, limiter: TokenBucket | None = None, max_attempts: int = SUBMIT_MAX_ATTEMPTS):
+        self.app = app
+        self.limiter = limiter or TokenBucket(rate=SUBMIT_RATE_PER_MINUTE / 60, capacity=SUBMIT_BURST)
+        self.max_attempts = max_attempts
+        self.dispatched = 0
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.before_request(self.start)
+
+    def start(self):
+        """Starts the dispatcher thread (idempotent). Rows left queued by a previous run are picked up."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='submission-dispatcher', daemon=True)
+        self._thread.start()
+
+    def enqueue(self, scenario: str, subject: str, body: str) -> QueuedSubmission:
+        """Stores a submission durably and wakes the dispatcher. Commits the session."""
+        submission = QueuedSubmission(scenario=scenario, subject=subject, body=body)
+        db.session.add(submission)
+        db.session.commit()
+        self._wake.set()
+        return submission
+
+    def enqueue_many(self, rows: list[dict]) -> list[QueuedSubmission]:
+        """Stores one submission per (scenario, subject, body) row in a single transaction and wakes the dispatcher."""
+        submissions = [QueuedSubmission(scenario=row['scenario'], subject=row['subject'], body=row['body']) for row in rows]
+        db.session.add_all(submissions)
+        db.session.commit()
+        self._wake.set()
+        return submissions
+
+    def queue_position(self, submission: QueuedSubmission) -> int | None:
+        """1-based position among queued submissions, or None once it has left the queue."""
+        if submission.status != 'queued':
+            return None
+        return QueuedSubmission.query.filter(QueuedSubmission.status == 'queued',
+                                             QueuedSubmission.id < submission.id).count() + 1
 
+    @property
+    def queued_count(self) -> int:
+        return QueuedSubmission.query.filter_by(status='queued').count()
+
+    def _run(self):
+        timeout = 0 # Rows left queued by a previous run are due at once
+        while True:
+            self._wake.wait(timeout=timeout)
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    self.reconcile_unknown()
+                    self.dispatch_pending()
+                    timeout = self.next_due_in()
+            except Exception as e:
+                self.app.logger.error(f"Submission dispatcher cycle failed: {e}")
+                timeout = SUBMIT_RATE_LIMIT_COOLDOWN
+
+    def next_due_in(self) -> float:
+        """Seconds until a backed-off row is due or an unknown or stale sending row can be reconciled (at most the cooldown)."""
+        now = time.time()
+        next_retry = db.session.query(db.func.min(QueuedSubmission.next_attempt_at)).filter(
+            QueuedSubmission.status == 'queued').scalar()
+        next_check = db.session.query(db.func.min(QueuedSubmission.attempted_at)).filter(
+            QueuedSubmission.status.in_(('unknown', 'sending'))).scalar()
+        waits = [SUBMIT_RATE_LIMIT_COOLDOWN]
+        if next_retry is not None:
+            waits.append(next_retry - now)
+        if next_check is not None:
+            waits.append(next_check + SUBMIT_RECONCILE_DELAY - now)
+        return max(0.5, min(waits))
+
+    @staticmethod
+    def retry_delay(attempts: int) -> float:
+        """Backoff before retrying a row that has failed `attempts` times."""
+        return min(SUBMIT_RETRY_BACKOFF_MAX, SUBMIT_RETRY_BACKOFF * 2 ** (attempts - 1))
+
+    def dispatch_pending(self, limit: int | None = None) -> int:
+        """Submits due queued rows oldest first until none are left, `limit` is reached, or the API rate-limits us."""
+        sent = 0
+        while limit is None or sent < limit:
+            submission = QueuedSubmission.query.filter(
+                QueuedSubmission.status == 'queued',
+                db.or_(QueuedSubmission.next_attempt_at.is_(None), QueuedSubmission.next_attempt_at <= time.time()),
+            ).order_by(QueuedSubmission.id).first()
+            if submission is None:
+                break
+            self.limiter.acquire()
+            if not self.claim(submission):
+                continue # Taken by another dispatcher since the query
+            if not self.dispatch_one(submission):
+                break
+            sent += 1
+        return sent
+
+    def claim(self, submission: QueuedSubmission) -> bool:
+        """Moves a queued row to 'sending' and commits, before it is sent. Returns False if it was no longer queued."""
+        result = db.session.execute(db.update(QueuedSubmission).where(
+            QueuedSubmission.id == submission.id,
+            QueuedSubmission.status == 'queued',
+        ).values(status='sending', attempted_at=time.time(), attempts=QueuedSubmission.attempts + 1))
+        db.session.commit() # Also expires `submission`, which reloads with the claim
+        return result.rowcount == 1
+
+    def dispatch_one(self, submission: QueuedSubmission) -> bool:
+        """Sends one claimed submission. Returns False if the API rate-limited it (the row goes back in the queue)."""
+        try:
+            job = client.create_job(scenario=submission.scenario, subject=submission.subject, body=submission.body)
+        except RateLimitedError as e:
+            self.limiter.on_rate_limited(e.retry_after)
+            submission.status = 'queued'
+            submission.attempts -= 1 # Rate limits are expected and do not count against the row
+            submission.last_error = str(e)
+            db.session.commit()
+            self._wake.set() # Resume once the limiter's pause is over
+            return False
+        except Exception as e:
+            submission.last_error = str(e)
+            if isinstance(e, APIKeyNotConfiguredError) or (isinstance(e, APIError) and e.status_code in (400, 422)):
+                submission.status = 'failed' # Sending the same request again cannot succeed
+            elif not submission_not_created(e):
+                submission.status = 'unknown' # It may exist upstream; reconcile_unknown() decides
+            elif submission.attempts >= self.max_attempts:
+                submission.status = 'failed'
+            else:
+                submission.status = 'queued'
+                submission.next_attempt_at = time.time() + self.retry_delay(submission.attempts)
+            db.session.commit()
+            self.app.logger.error(f"Submission {submission.ticket} failed (attempt {submission.attempts}, now {submission.status}): {e}")
+            return True
+        self._mark_dispatched(submission, job)
+        db.session.commit() # Before store_job, which may fail: the row must never be sent again
+        job_poller.track(job)
+        self.limiter.on_success()
+        store_job(job)
+        db.session.commit()
+        return True
+
+    def _mark_dispatched(self, submission: QueuedSubmission, job: Job):
+        submission.status = 'dispatched'
+        submission.job_id = job.job_id
+        submission.dispatched_at = time.time()
+        submission.next_attempt_at = None
+        submission.last_error = None
+        self.dispatched += 1
+
+    def reconcile_unknown(self) -> int:
+        """Settles 'unknown' submissions against the team's job list. Returns how many were settled.
+
+        Rows left 'sending' by a process that stopped mid-request are settled the
+        same way. Rows are checked SUBMIT_RECONCILE_DELAY after their last attempt,
+        so a job that was created has had time to appear, against a freshly synced
+        list. A job with the same scenario, subject and body, scheduled after that
+        attempt and not claimed by another row, is taken as this submission's.
+        Otherwise nothing was created and the row goes back in the queue (or
+        fails once out of attempts).
+        """
+        rows = QueuedSubmission.query.filter(
+            QueuedSubmission.status.in_(('unknown', 'sending')),
+            QueuedSubmission.attempted_at <= time.time() - SUBMIT_RECONCILE_DELAY,
+        ).order_by(QueuedSubmission.id).all()
+        if not rows or not sync_jobs(force=True):
+            return 0 # Nothing to do, or another sync is running: try again next cycle
+        claimed = db.select(QueuedSubmission.job_id).where(QueuedSubmission.job_id.isnot(None))
+        for submission in rows:
+            record = JobRecord.query.filter(
+                JobRecord.scenario == submission.scenario,
+                JobRecord.subject == submission.subject,
+                JobRecord.body == submission.body,
+                JobRecord.scheduled_time >= format_api_time(int(submission.attempted_at) - 300), # Allows for clock skew
+                JobRecord.job_id.not_in(claimed),
+            ).order_by(JobRecord.scheduled_time).first()
+            if record is not None:
+                self._mark_dispatched(submission, record.to_job())
+                job_poller.track(record.to_job())
+            elif submission.attempts >= self.max_attempts:
+                submission.status = 'failed'
+                submission.last_error = f"{submission.last_error or 'Sending was interrupted'} (not found in the job list)"
+            else:
+                submission.status = 'queued'
+                submission.next_attempt_at = None
+            db.session.commit() # Row by row, so the next one sees this claim
+        return len(rows)
+
+submission_dispatcher = SubmissionDispatcher(app)
+
+# --- Batch Submission ---
+BATCH_FIELDS = ('scenario', 'subject', 'body')
+
+def parse_batch_rows(text: str, filename: str = '') -> list[dict]:
+    """Parses a JSONL or CSV batch (header row with scenario,subject,body) into row dicts.
+
+    The format is taken from the file extension, or sniffed from the first
+    character when there is none. Rows keep their 1-based line/record number in 'row'.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    is_jsonl = extension in ('.jsonl', '.ndjson', '.json') or (not extension and text.lstrip().startswith('{'))
+    rows = []
+    if is_jsonl:
+        for number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError as e:
+                rows.append({'row': number, 'error': f"Invalid JSON: {e}"})
+                continue
+            rows.append({'row': number, **{field: data.get(field) for field in BATCH_FIELDS}} if isinstance(data, dict)
+                        else {'row': number, 'error': 'Expected a JSON object.'})
+    else:
+        for number, data in enumerate(csv.DictReader(io.StringIO(text)), start=1):
+            rows.append({'row': number, **{field: data.get(field) for field in BATCH_FIELDS}})
+    if len(rows) > BATCH_MAX_ROWS:
+        raise ValueError(f"Batch has {len(rows)} rows; the limit is {BATCH_MAX_ROWS}.")
+    return rows
+
+def submit_batch(rows: list[dict], interval: float = BATCH_PROGRESS_INTERVAL):
+    """Queues every valid row as a QueuedSubmission and yields a result dict each time a row's status changes.
+
+    Each row is yielded first as 'invalid' or 'queued' (with its ticket), then
+    again as it moves through the queue, until every row is 'dispatched' or
+    'failed'. The rows are sent by the submission dispatcher exactly like
+    /create_job submissions, so a batch shares its rate limit and retry rules
+    and survives a restart; a consumer that goes away leaves its rows queued.
+    """
+    valid = []
+    for row in rows:
+        result = {'row': row['row'], 'scenario': row.get('scenario'), 'subject': row.get('subject'),
+                  'ticket': None, 'status': None, 'job_id': None, 'error': None}
+        if row.get('error') or not all(row.get(field) for field in BATCH_FIELDS):
+            result.update(status='invalid', error=row.get('error') or 'Scenario, Subject, and Body are required.')
+            yield result
+        else:
+            valid.append((row, result))
+    pending = {}
+    for (row, result), submission in zip(valid, submission_dispatcher.enqueue_many([row for row, _ in valid])):
+        result.update(ticket=submission.ticket, status=submission.status)
+        pending[submission.id] = result
+        yield dict(result)
+    while pending:
+        time.sleep(interval)
+        changes = db.session.query(QueuedSubmission.id, QueuedSubmission.status, QueuedSubmission.job_id,
+                                   QueuedSubmission.last_error).filter(QueuedSubmission.id.in_(list(pending))).all()
+        db.session.commit() # End the read so the next check sees the dispatcher's writes
+        for submission_id, status, job_id, error in changes:
+            result = pending[submission_id]
+            if status == result['status']:
+                continue
+            result.update(status=status, job_id=job_id, error=error)
+            yield dict(result)
+            if status in ('dispatched', 'failed'):
+                del pending[submission_id]
+
+def wait_for_jobs(job_ids, interval: float = JOB_POLL_INTERVAL):
+    """Yields the status snapshot of each job as it completes, polling through job_poller."""
+    remaining = set(job_ids)
+    while remaining:
+        for job_id in list(remaining):
+            snapshot = job_poller.lookup(job_id)
+            if snapshot is None or snapshot['completed']:
+                remaining.discard(job_id)
+                yield snapshot or {'job_id': job_id, 'completed': False, 'error': 'Job not found.'}
+        if remaining:
+            time.sleep(interval)
+            job_poller.poll_once()
+
+# --- Scenario Registry ---
+# One select-item per scenario: "<display> <span class="tag ...">N solves</span>"; attribute order and extra attributes may vary
+SCENARIO_ITEM_PATTERN = re.compile(r'<div\b[^>]*\bclass="select-item"[^>]*>(.*?)<span\b[^>]*\bclass="tag\b[^"]*"[^>]*>(.*?)</span>', re.S)
+SCENARIO_DISPLAY_PATTERN = re.compile(r'^(?P<label>[^:]+):\s*(?P<model>.*?)(?:\s+with\s+(?P<defense>.+))?$')
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Scenario:
+    id: str # e.g. 'level1k', the value submitted to the API
+    display: str # e.g. 'Level 1K: Phi3 with promptshield'
+    model: str = ''
+    defense: str = ''
+    solves: int | None = None
+
+def get_scenarios_from_html(html_content: str) -> list[Scenario]:
+    """Extracts scenarios (ID, display name, model, defense, solve count) from the provided HTML snippet."""
+    scenarios = []
+    for display_part, tag in SCENARIO_ITEM_PATTERN.findall(html_content):
+        display_name = display_part.strip()
+        # Derive the ID: text before the first colon, lowercased with spaces removed
+        match = SCENARIO_DISPLAY_PATTERN.match(display_name)
+        if not match:
+            print(f"Warning: Could not derive ID from scenario display name: {display_name}")
+            continue
+        solves = re.search(r'\d+', tag)
+        scenarios.append(Scenario(id=match['label'].lower().replace(" ", ""), display=display_name, model=match['model'],
+                                  defense=match['defense'] or '', solves=int(solves.group()) if solves else None))
     return scenarios
 
-# Load scenarios at startup
-try:
-    with open("jobs.html", "r", encoding="utf-8") as f:
-        jobs_html_content = f.read()
-    AVAILABLE_SCENARIOS = get_scenarios_from_html(jobs_html_content)
-except FileNotFoundError:
-    print("Warning: jobs.html not found. Scenario list will be empty.")
-    AVAILABLE_SCENARIOS = []
-except Exception as e:
-    print(f"Warning: Failed to parse jobs.html: {e}")
-    AVAILABLE_SCENARIOS = []
+class ScenarioRegistry:
+    """The scenario list from jobs.html, indexed by ID and reloaded when the file changes.
+
+    Each distinct file content is parsed once: the result is cached as JSON
+    keyed by the file's sha256, so restarts and other processes load it without
+    parsing. Lookups stat the file at most every `check_interval` seconds and
+    swap in a new index when its mtime or size changed; until a file has been
+    loaded the registry is empty, and a file that disappears keeps the last list.
+    """
+    CACHE_FORMAT = 1
+
+    def __init__(self, path: str, cache_path: str | None = None, check_interval: float = 2.0):
+        self.path = path
+        self.cache_path = cache_path or f'{path}.cache.json'
+        self.check_interval = check_interval
+        self.sha256 = None # Of the file content the index was built from
+        self.loaded_at = None
+        self._state = ((), {}) # (scenarios in file order, id -> Scenario), replaced as a whole on reload
+        self._stat = None
+        self._checked = float('-inf')
+        self._lock = threading.Lock()
+
+    def reload(self, force: bool = False):
+        """Checks the file now instead of waiting for the next interval; `force` also re-parses it."""
+        with self._lock:
+            if force:
+                self._stat = self.sha256 = None
+            self._checked = float('-inf')
+        self._refresh()
+
+    def _refresh(self):
+        if time.monotonic() - self._checked < self.check_interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked < self.check_interval:
+                return
+            self._checked = now
+            try:
+                stat = os.stat(self.path)
+                stat = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                stat = None
+            if stat != self._stat:
+                self._load(stat)
+
+    def _load(self, stat):
+        if stat is None:
+            print(f"Warning: {self.path} not found. Scenario list will {'be empty' if self.sha256 is None else 'not be updated'}.")
+            self._stat = None
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                content = f.read()
+            digest = hashlib.sha256(content).hexdigest()
+            self._stat = stat
+            if digest == self.sha256:
+                return # Touched but unchanged
+            scenarios = self._read_cache(digest)
+            if scenarios is None:
+                scenarios = get_scenarios_from_html(content.decode('utf-8'))
+                self._write_cache(digest, scenarios)
+        except Exception as e:
+            print(f"Warning: Failed to parse {self.path}: {e}")
+            return
+        index = {}
+        for scenario in scenarios:
+            index.setdefault(scenario.id, scenario)
+        self._state = (tuple(scenarios), index)
+        self.sha256 = digest
+        self.loaded_at = datetime.now(timezone.utc)
+
+    def _read_cache(self, digest: str) -> list[Scenario] | None:
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('format') != self.CACHE_FORMAT or data.get('sha256') != digest:
+                return None
+            return [Scenario(**item) for item in data['scenarios']]
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            return None
+
+    def _write_cache(self, digest: str, scenarios: list[Scenario]):
+        data = {'format': self.CACHE_FORMAT, 'sha256': digest, 'scenarios': [dataclasses.asdict(s) for s in scenarios]}
+        directory = os.path.dirname(os.path.abspath(self.cache_path))
+        try:
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory, suffix='.tmp', delete=False) as f:
+                json.dump(data, f)
+            os.replace(f.name, self.cache_path) # Readers never see a partial file
+        except OSError as e:
+            print(f"Warning: Could not write scenario cache {self.cache_path}: {e}")
+
+    def all(self) -> tuple[Scenario, ...]:
+        self._refresh()
+        return self._state[0]
+
+    def get(self, scenario_id: str | None) -> Scenario | None:
+        self._refresh()
+        return self._state[1].get(scenario_id)
+
+    def display_name(self, scenario_id: str) -> str:
+        """The scenario's display name, or the ID itself when it is not in the list."""
+        scenario = self.get(scenario_id)
+        return scenario.display if scenario else scenario_id
+
+    def __contains__(self, scenario_id) -> bool:
+        return self.get(scenario_id) is not None
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def __len__(self) -> int:
+        return len(self.all())
+
+# Loaded at startup; the create-job form, submission checks and templates all read this one index
+scenario_registry = ScenarioRegistry(SCENARIOS_FILE, cache_path=SCENARIO_CACHE_FILE, check_interval=SCENARIO_RELOAD_INTERVAL)
+scenario_registry.reload()
+
+@app.context_processor
+def inject_scenario_registry():
+    return {'scenario_registry': scenario_registry}
+
+# --- Logged-in User Cache ---
+# Every authenticated request (including each /job_status poll) loads its user; a short-lived
+# per-process cache answers those from memory. Routes that change a User call invalidate_user().
+user_cache = TTLCache()
+
+def _detached_user_copy(user: User | None) -> User | None:
+    """A copy of the row's columns outside any session, safe to share between requests and threads."""
+    if user is None:
+        return None
+    return User(id=user.id, username=user.username, password_hash=user.password_hash, is_admin=user.is_admin)
+
+@login_manager.user_loader
+def load_user(user_id):
+    user_id = int(user_id)
+    return user_cache.get_or_load(user_id, USER_CACHE_TTL, lambda: _detached_user_copy(db.session.get(User, user_id)))
+
+def invalidate_user(user_id: int):
+    """Drops a user from the cache after it was changed, so the next request reloads it."""
+    user_cache.invalidate(user_id)
+
+# --- Auth Benchmark ---
+def benchmark_auth(registrations: int = 300, logins: int = 1200, threads: int = 8, seed: int = 0) -> dict:
+    """Measures concurrent registration and login throughput on scratch databases, before and after the SQLite tuning.
+
+    'before' uses SQLite's defaults (rollback journal, 5s lock wait) and the old
+    registration path: the token looked up by the form validator and again by
+    the route, COUNT(*) of users, and a read-modify-write of uses_left. 'after'
+    uses configure_sqlite_connection() and the single-transaction path of
+    register(). Registrations and logins run mixed across `threads` workers, all
+    spending one shared token. Passwords use a trivial hash, so only database
+    work is measured.
+    """
+    users, tokens = User.__table__, RegistrationToken.__table__
+    password_hash = generate_password_hash('benchmark', method='pbkdf2:sha256:1')
+    seeded_users = 100
+
+    def register_before(conn, username, token):
+        token_row = conn.execute(db.select(tokens).where(tokens.c.token == token)).first() # Form validator
+        if not token_row or token_row.is_used or token_row.uses_left <= 0:
+            return False
+        conn.execute(db.select(users.c.id).where(users.c.username == username)).first()
+        token_row = conn.execute(db.select(tokens).where(tokens.c.token == token)).first() # Route
+        is_admin = conn.execute(db.select(db.func.count()).select_from(users)).scalar() == 0
+        uses_left = token_row.uses_left - 1
+        conn.execute(db.update(tokens).where(tokens.c.id == token_row.id).values(uses_left=uses_left, is_used=uses_left <= 0))
+        conn.execute(db.insert(users).values(username=username, password_hash=password_hash, is_admin=is_admin))
+        return True
+
+    def register_after(conn, username, token):
+        conn.execute(db.select(users.c.id).where(users.c.username == username)).first()
+        consumed = conn.execute(db.update(tokens).where(tokens.c.token == token, tokens.c.is_used.is_(False), tokens.c.uses_left > 0)
+                                .values(uses_left=tokens.c.uses_left - 1, is_used=tokens.c.uses_left <= 1)).rowcount == 1
+        if not consumed:
+            return False
+        is_admin = not conn.execute(db.select(db.exists().where(users.c.id.isnot(None)))).scalar()
+        conn.execute(db.insert(users).values(username=username, password_hash=password_hash, is_admin=is_admin))
+        return True
+
+    def login(conn, username, _token):
+        row = conn.execute(db.select(users).where(users.c.username == username)).first()
+        conn.execute(db.select(users).where(users.c.id == row.id)).first() # user_loader on the next request
+        return check_password_hash(row.password_hash, 'benchmark')
+
+    rng = random.Random(seed)
+    ops = ['register'] * registrations + ['login'] * logins
+    rng.shuffle(ops)
+    results = {}
+    for profile, register in (('before', register_before), ('after', register_after)):
+        with tempfile.TemporaryDirectory() as directory:
+            engine = db.create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}", pool_size=threads, max_overflow=0)
+            if profile == 'after':
+                db.event.listen(engine, 'connect', configure_sqlite_connection)
+            db.metadata.create_all(engine, tables=[users, tokens])
+            token = str(uuid.uuid4())
+            with engine.begin() as conn:
+                conn.execute(db.insert(tokens).values(token=token, is_used=False, uses_left=registrations))
+                conn.execute(db.insert(users), [{'username': f'seed{i}', 'password_hash': password_hash, 'is_admin': False}
+                                                for i in range(seeded_users)])
+            counter = itertools.count()
+            counts = collections.Counter()
+            counts_lock = threading.Lock()
+
+            def worker():
+                while (index := next(counter)) < len(ops):
+                    op = ops[index]
+                    username = f'user{index}' if op == 'register' else f'seed{index % seeded_users}'
+                    started = time.perf_counter()
+                    try:
+                        with engine.begin() as conn:
+                            ok = (register if op == 'register' else login)(conn, username, token)
+                    except db.exc.OperationalError:
+                        ok = False
+                    with counts_lock:
+                        counts[op, ok] += 1
+                        counts[op, 'seconds'] += time.perf_counter() - started
+
+            started = time.perf_counter()
+            workers = [threading.Thread(target=worker) for _ in range(threads)]
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            with engine.connect() as conn:
+                registered = conn.execute(db.select(db.func.count()).select_from(users)).scalar() - seeded_users
+                uses_left = conn.execute(db.select(tokens.c.uses_left)).scalar()
+            engine.dispose()
+        results[profile] = {
+            'elapsed': elapsed,
+            'register_per_s': counts['register', True] / elapsed,
+            'login_per_s': counts['login', True] / elapsed,
+            'failed': counts['register', False] + counts['login', False],
+            'registered': registered,
+            'token_uses_spent': registrations - uses_left, # Below `registered` means lost updates
+        }
+    return results
 
 # --- Authentication Routes ---
 @app.route('/login', methods=['GET', 'POST'])
@@ -261,7 +2679,14 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(username=form.username.data).first()
-        if user and user.check_password(form.password.data):
+        try:
+            valid = user is not None and user.check_password(form.password.data)
+        except PasswordHasherBusyError as e:
+            flash(str(e), 'warning')
+            return render_template('login.html', title='Login', form=form), 503
+        if valid:
+            if password_hasher.needs_rehash(user.password_hash):
+                upgrade_password_hash(user, form.password.data)
             login_user(user)
             flash('Logged in successfully.', 'success')
             next_page = request.args.get('next')
@@ -270,6 +2695,15 @@ def login():
             flash('Login Unsuccessful. Please check username and password', 'danger')
     return render_template('login.html', title='Login', form=form)
 
+def upgrade_password_hash(user: User, password: str):
+    """Re-hashes a just-verified password with the current PASSWORD_HASH_METHOD. Skipped if hashing is busy."""
+    try:
+        user.set_password(password)
+    except PasswordHasherBusyError:
+        return # Upgraded on a later login
+    db.session.commit()
+    invalidate_user(user.id)
+
 @app.route('/logout')
 def logout():
     logout_user()
@@ -282,31 +2716,29 @@ def register():
         return redirect(url_for('index'))
     form = RegistrationForm()
     if form.validate_on_submit():
-        token_entry = RegistrationToken.query.filter_by(token=form.registration_token.data).first()
-        # Double-check token validity (already done in form validator, but good practice)
-        if not token_entry or token_entry.is_used or token_entry.uses_left <= 0:
+        # Create new user (hashed before the transaction, which then holds the write lock only briefly)
+        user = User(username=form.username.data)
+        try:
+            user.set_password(form.password.data)
+        except PasswordHasherBusyError as e:
+            flash(str(e), 'warning')
+            return render_template('register.html', title='Register', form=form), 503
+
+        # One transaction: spending the token takes SQLite's write lock first, so the
+        # first-user check below cannot race another registration
+        if not RegistrationToken.consume(form.registration_token.data):
+            db.session.rollback()
             flash('Invalid or expired registration token.', 'danger')
             return render_template('register.html', title='Register', form=form)
-
-        # Create new user
-        user = User(username=form.username.data)
-        user.set_password(form.password.data)
         # First user registered automatically becomes admin
-        if User.query.count() == 0:
-            user.is_admin = True
-            flash('Admin account created successfully!', 'success')
-        else:
-             user.is_admin = False # Ensure non-first users are not admin by default
-
-        # Update token usage
-        token_entry.uses_left -= 1
-        if token_entry.uses_left <= 0:
-             token_entry.is_used = True # Mark as fully used if uses reach 0
-
+        user.is_admin = not User.any_exist()
 
         try:
             db.session.add(user)
-            db.session.commit()
+            db.session.commit() # A failure (e.g. the username was just taken) also gives the token use back
+            invalidate_user(user.id)
+            if user.is_admin:
+                flash('Admin account created successfully!', 'success')
             flash(f'Account created for {form.username.data}! You can now log in.', 'success')
             return redirect(url_for('login'))
         except Exception as e:
@@ -320,11 +2752,19 @@ def register():
 def change_password():
     form = PasswordChangeForm()
     if form.validate_on_submit():
-        # Verify current password
-        if current_user.check_password(form.current_password.data):
-            # Set new password
-            current_user.set_password(form.new_password.data)
+        # current_user is a cached copy; verify and update the stored row
+        user = db.session.get(User, current_user.id)
+        try:
+            valid = user.check_password(form.current_password.data)
+            if valid:
+                # Set new password
+                user.set_password(form.new_password.data)
+        except PasswordHasherBusyError as e:
+            flash(str(e), 'warning')
+            return render_template('change_password.html', title='Change Password', form=form), 503
+        if valid:
             db.session.commit()
+            invalidate_user(user.id)
             flash('Your password has been updated!', 'success')
             return redirect(url_for('index')) # Or redirect to a profile page if you add one
         else:
@@ -349,7 +2789,7 @@ def index():
             api_error = f"Failed to fetch team details from API: {e}"
             flash(api_error, 'danger')
 
-    return render_template('index.html', scenarios=AVAILABLE_SCENARIOS, team=team_details, api_error=api_error, client=client)
+    return render_template('index.html', scenarios=scenario_registry.all(), team=team_details, api_error=api_error, client=client)
 
 @app.route('/create_job', methods=['POST'])
 @login_required
@@ -364,21 +2804,59 @@ def create_job_route():
         return jsonify({'error': 'Scenario, Subject, and Body are required.'}), 400
 
     # Check if the submitted scenario ID exists in our list of known scenario IDs
-    known_scenario_ids = [s['id'] for s in AVAILABLE_SCENARIOS]
-    if scenario not in known_scenario_ids and AVAILABLE_SCENARIOS:
+    if scenario not in scenario_registry and len(scenario_registry):
          # Log this warning server-side if needed, flashing won't work
          app.logger.warning(f"Submitted scenario ID '{scenario}' was not found in the list derived from jobs.html.")
 
+    if client._is_key_placeholder():
+        return jsonify({'error': 'API Key is not configured. Cannot create job.'}), 503 # Service Unavailable
+
     try:
-        job = client.create_job(scenario=scenario, subject=subject, body=body)
-        # Return JSON on success
-        return jsonify({'job_id': job.job_id, 'status': 'processing'}), 200
-    except APIKeyNotConfiguredError as e:
-        app.logger.error(f"API Key error during job creation: {e}")
-        return jsonify({'error': str(e)}), 503 # Service Unavailable
+        submission = submission_dispatcher.enqueue(scenario=scenario, subject=subject, body=body)
+        # The job is created upstream by the dispatcher; the client polls /submission/<ticket> for its job_id
+        return jsonify({'ticket': submission.ticket, 'status': 'queued', 'job_id': None}), 202
     except Exception as e:
-        app.logger.error(f"Exception during job creation: {e}")
-        return jsonify({'error': f"Error creating job via API: {e}"}), 500
+        db.session.rollback()
+        app.logger.error(f"Exception while queueing job: {e}")
+        return jsonify({'error': f"Error queueing job: {e}"}), 500
+
+@app.route('/submission/<ticket>')
+@login_required
+def submission_status_route(ticket):
+    """Returns the dispatch state of a queued submission as JSON."""
+    submission = QueuedSubmission.query.filter_by(ticket=ticket).first()
+    if submission is None:
+        return jsonify({'error': 'Unknown submission ticket.'}), 404
+    return jsonify({
+        'ticket': submission.ticket,
+        'status': submission.status,
+        'job_id': submission.job_id,
+        'error': submission.last_error,
+        'attempts': submission.attempts,
+        'next_attempt_at': submission.next_attempt_at,
+        'queue_position': submission_dispatcher.queue_position(submission),
+    })
+
+@app.route('/batch_jobs', methods=['POST'])
+@login_required
+def batch_jobs_route():
+    """Queues a JSONL/CSV upload of jobs, streaming a JSON line per row each time its status changes."""
+    if client._is_key_placeholder():
+        return jsonify({'error': 'API Key is not configured. Cannot create jobs.'}), 503
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({'error': 'A JSONL or CSV file is required.'}), 400
+    try:
+        rows = parse_batch_rows(upload.read().decode('utf-8-sig'), upload.filename or '')
+    except (UnicodeDecodeError, ValueError) as e:
+        return jsonify({'error': f"Invalid batch: {e}"}), 400
+
+    def stream():
+        yield json.dumps({'total': len(rows)}) + '\n'
+        for result in submit_batch(rows):
+            yield json.dumps(result) + '\n'
+
+    return Response(stream_with_context(stream()), mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
 
 @app.route('/job/<job_id>')
 @login_required
@@ -390,7 +2868,7 @@ def get_job_route(job_id):
         flash("API Key not configured. Cannot fetch job details.", "warning")
     else:
         try:
-            job = client.get_job(job_id=job_id)
+            job = get_stored_job(job_id)
             if job is None:
                 flash(f"Job '{job_id}' not found or API key is invalid.", 'warning')
                 # Optionally redirect, or let template handle job=None
@@ -406,20 +2884,129 @@ def get_job_route(job_id):
 @app.route('/jobs')
 @login_required
 def list_jobs_route():
-    """Displays a list of all jobs for the team from API."""
+    """Displays one page of the team's jobs from the local job store, filtered and sorted by query parameters."""
     jobs = []
     api_error = None
+    next_url = None
+    scenarios = []
+    filters = {
+        'scenario': request.args.get('scenario', 'all'),
+        'status': request.args.get('status', 'all'),
+        'objective': request.args.get('objective', 'all'),
+        'objective_status': request.args.get('objective_status', 'any'),
+        'subject': request.args.get('subject', '').strip(),
+        'sort': request.args.get('sort', 'date-desc'),
+        'reference': request.args.get('reference', '').strip(),
+    }
+    similarity_scores = {}
+    reference_job = None
     if client._is_key_placeholder():
          flash("API Key not configured. Cannot list jobs.", "warning")
     else:
         try:
-            jobs = client.list_jobs()
-            jobs.sort(key=lambda j: j.scheduled_time, reverse=True)
+            sync_jobs(force=JobRecord.query.first() is None)
         except Exception as e:
-            api_error = f"Error listing jobs from API: {e}"
+            api_error = f"Error syncing jobs from API: {e}"
             flash(api_error, 'danger')
+        limit = max(1, min(request.args.get('limit', JOBS_PAGE_SIZE, type=int), JOBS_MAX_PAGE_SIZE))
+        query_args = dict(
+            scenario=None if filters['scenario'] == 'all' else filters['scenario'],
+            status=None if filters['status'] == 'all' else filters['status'],
+            objective=None if filters['objective'] == 'all' else filters['objective'],
+            objective_status=filters['objective_status'],
+            subject=filters['subject'] or None,
+            sort=filters['sort'],
+            limit=limit,
+        )
+        if filters['sort'] == 'similarity' and filters['reference']:
+            # Nearest neighbours form a single ranked page, so there is no next cursor
+            query_args.pop('sort')
+            ranked = query_similar_jobs(filters['reference'], **query_args)
+            records, next_cursor = [record for record, _ in ranked], None
+            similarity_scores = {record.job_id: score for record, score in ranked}
+            reference_job = db.session.get(JobRecord, filters['reference'])
+            if reference_job is None:
+                flash("The reference job for the similarity sort is not in the local job store.", 'warning')
+        else:
+            try:
+                records, next_cursor = query_jobs(cursor=request.args.get('cursor'), **query_args)
+            except ValueError as e:
+                flash(f"{e} Showing the first page instead.", 'warning')
+                records, next_cursor = query_jobs(**query_args)
+        jobs = [record.to_job() for record in records]
+        if next_cursor:
+            next_url = url_for('list_jobs_route', **{**request.args.to_dict(), 'cursor': next_cursor})
+        scenarios = [scenario for (scenario,) in db.session.query(JobRecord.scenario).distinct().order_by(JobRecord.scenario)]
+
+    first_url = url_for('list_jobs_route', **{key: value for key, value in request.args.items() if key != 'cursor'})
+    return render_template('job_list.html', jobs=jobs, api_error=api_error, filters=filters, scenarios=scenarios,
+                           next_url=next_url, first_url=first_url, is_first_page='cursor' not in request.args,
+                           similarity_scores=similarity_scores, reference_job=reference_job)
+
+def _search_args() -> tuple[str, dict, int]:
+    """Query text, job list filters and page number of a search request."""
+    objective = request.args.get('objective', 'all')
+    filters = dict(
+        scenario=None if request.args.get('scenario', 'all') == 'all' else request.args['scenario'],
+        objective=None if objective == 'all' else objective,
+        objective_status=request.args.get('objective_status', 'any'),
+    )
+    return request.args.get('q', '').strip(), filters, max(1, request.args.get('page', 1, type=int))
+
+@app.route('/jobs/search')
+@login_required
+def search_jobs_route():
+    """Full-text search over stored jobs' subjects, bodies and model output, best matches first."""
+    text, filters, page = _search_args()
+    results, has_more = [], False
+    if text:
+        try:
+            results, has_more = search_index.search(text, page=page, **filters)
+        except ValueError as e:
+            flash(str(e), 'warning')
+    scenarios = [scenario for (scenario,) in db.session.query(JobRecord.scenario).distinct().order_by(JobRecord.scenario)]
+    def page_url(number):
+        return url_for('search_jobs_route', **{**request.args.to_dict(), 'page': number})
+    return render_template('job_search.html', query=text, filters=filters, scenarios=scenarios,
+                           results=[(record.to_job(), search_index.highlight(snippet)) for record, snippet in results],
+                           prev_url=page_url(page - 1) if page > 1 else None, next_url=page_url(page + 1) if has_more else None)
+
+@app.route('/api/jobs/search')
+@login_required
+def api_search_jobs():
+    """JSON version of /jobs/search: ?q=...&scenario=&objective=&objective_status=&page=."""
+    text, filters, page = _search_args()
+    try:
+        results, has_more = search_index.search(text, page=page, **filters)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'query': text,
+        'page': page,
+        'next_page': page + 1 if has_more else None,
+        'results': [{**_job_payload(record.to_job()), 'snippet': str(search_index.highlight(snippet))}
+                    for record, snippet in results],
+    })
+
+@app.route('/stats')
+@login_required
+def job_stats_route():
+    """Success rates per scenario and objective, from the incrementally maintained JobStats table."""
+    summary = job_stats_summary(days=max(1, min(request.args.get('days', STATS_DAYS, type=int), 366)))
+    return render_template('job_stats.html', stats=summary, objectives=STATS_OBJECTIVES)
 
-    return render_template('job_list.html', jobs=jobs, api_error=api_error)
+@app.route('/api/stats')
+@login_required
+def api_job_stats():
+    """JSON version of /stats; ?days= sets how many days of daily rates to include."""
+    return jsonify(job_stats_summary(days=max(1, min(request.args.get('days', STATS_DAYS, type=int), 366))))
+
+@app.route('/api/scenarios')
+@login_required
+def api_scenarios():
+    """Known scenarios with their metadata, and the sha256 of the jobs.html they were parsed from."""
+    scenarios = scenario_registry.all()
+    return jsonify({'sha256': scenario_registry.sha256, 'scenarios': [dataclasses.asdict(s) for s in scenarios]})
 
 @app.route('/team')
 @login_required
@@ -479,41 +3066,132 @@ def admin_required(f):
 @login_required
 @admin_required
 def admin_dashboard():
-    return render_template('admin/dashboard.html', title='Admin Dashboard')
+    return render_template('admin/dashboard.html', title='Admin Dashboard', password_hashing=password_hasher.stats())
+
+def keyset_page(query, column, after=None, limit: int = ADMIN_PAGE_SIZE, descending: bool = False):
+    """Returns one page of `query` ordered on the unique `column`, starting after the value `after`,
+    and the value to continue after for the next page (or None).
+
+    Like query_jobs(), each page is one index range scan, so deep pages cost the same as the first.
+    """
+    if after is not None:
+        query = query.filter(column < after if descending else column > after)
+    rows = query.order_by(column.desc() if descending else column.asc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, getattr(rows[-1], column.key)
+    return rows, None
+
+def filter_tokens_query(status: str | None = None):
+    """Returns a RegistrationToken query restricted to 'active' (still usable) or 'spent' tokens, or all of them."""
+    query = RegistrationToken.query
+    if status == 'active':
+        query = query.filter(db.not_(RegistrationToken.spent()))
+    elif status == 'spent':
+        query = query.filter(RegistrationToken.spent())
+    return query
+
+def tokens_csv_response(rows, filename: str) -> Response:
+    """Streams (token, uses_left, is_used) rows as a CSV download."""
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(('token', 'uses_left', 'is_used'))
+        for row in rows:
+            writer.writerow(row)
+            if buffer.tell() >= 64 * 1024: # Flush in chunks instead of per row
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    return Response(stream_with_context(generate()), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
 
 @app.route('/admin/users')
 @login_required
 @admin_required
 def admin_users():
-    users = User.query.all()
-    return render_template('admin/users.html', title='Manage Users', users=users)
+    users, next_after = keyset_page(User.query, User.id, after=request.args.get('after', type=int))
+    next_url = url_for('admin_users', after=next_after) if next_after is not None else None
+    return render_template('admin/users.html', title='Manage Users', users=users, next_url=next_url,
+                           first_url=url_for('admin_users'), is_first_page='after' not in request.args)
 
 @app.route('/admin/tokens')
 @login_required
 @admin_required
 def admin_tokens():
     form = TokenGenerationForm()
-    tokens = RegistrationToken.query.order_by(RegistrationToken.id.desc()).all()
-    return render_template('admin/tokens.html', title='Manage Tokens', tokens=tokens, form=form)
+    bulk_form = TokenBulkActionForm()
+    status = request.args.get('status', 'all')
+    tokens, next_after = keyset_page(filter_tokens_query(status), RegistrationToken.id,
+                                     after=request.args.get('after', type=int), descending=True)
+    next_url = url_for('admin_tokens', status=status, after=next_after) if next_after is not None else None
+    return render_template('admin/tokens.html', title='Manage Tokens', tokens=tokens, form=form, bulk_form=bulk_form,
+                           status=status, next_url=next_url, first_url=url_for('admin_tokens', status=status),
+                           is_first_page='after' not in request.args)
 
 @app.route('/admin/generate_token', methods=['POST'])
 @login_required
 @admin_required
 def generate_token():
+    """Creates one or more tokens in a single transaction, optionally returning them as a CSV download."""
     form = TokenGenerationForm() # Process the submitted form
     if form.validate_on_submit():
-        uses = form.uses.data
+        uses, count = form.uses.data, form.count.data
         if uses <= 0:
             flash('Number of uses must be positive.', 'warning')
         else:
-            token = RegistrationToken(uses_left=uses)
-            db.session.add(token)
+            tokens = RegistrationToken.generate(count, uses)
             db.session.commit()
-            flash(f'New registration token generated: {token.token}', 'success')
+            if form.download.data:
+                filename = f"registration-tokens-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.csv"
+                return tokens_csv_response([(token, uses, False) for token in tokens], filename)
+            if count == 1:
+                flash(f'New registration token generated: {tokens[0]}', 'success')
+            else:
+                flash(f'{count} registration tokens generated with {uses} use(s) each.', 'success')
     else:
-        flash('Invalid input for token generation.', 'error')
+        flash(f'Invalid input for token generation (at most {TOKEN_BULK_MAX} tokens per request).', 'error')
     return redirect(url_for('admin_tokens'))
 
+@app.route('/admin/tokens/bulk', methods=['POST'])
+@login_required
+@admin_required
+def bulk_tokens():
+    """Expires or deletes the selected tokens, or deletes every spent token, in one statement."""
+    form = TokenBulkActionForm()
+    if not form.validate_on_submit():
+        flash('Invalid bulk token action.', 'error')
+        return redirect(url_for('admin_tokens'))
+    token_ids = request.form.getlist('token_ids', type=int)
+    if form.action.data == 'delete_spent':
+        changed = RegistrationToken.delete_many()
+        message = f'{changed} used or expired token(s) deleted.'
+    elif not token_ids:
+        flash('No tokens selected.', 'warning')
+        return redirect(url_for('admin_tokens'))
+    elif form.action.data == 'expire':
+        changed = RegistrationToken.expire_many(token_ids)
+        message = f'{changed} token(s) expired.'
+    else:
+        changed = RegistrationToken.delete_many(token_ids)
+        message = f'{changed} token(s) deleted.'
+    db.session.commit()
+    flash(message, 'success')
+    return redirect(url_for('admin_tokens'))
+
+@app.route('/admin/tokens/export')
+@login_required
+@admin_required
+def export_tokens():
+    """Downloads the tokens matching ?status= as CSV, read from the database in batches."""
+    status = request.args.get('status', 'active')
+    query = filter_tokens_query(status).order_by(RegistrationToken.id)
+    rows = db.session.execute(query.with_entities(RegistrationToken.token, RegistrationToken.uses_left,
+                                                  RegistrationToken.is_used).statement.execution_options(yield_per=1000))
+    return tokens_csv_response(rows, f'registration-tokens-{status}.csv')
+
 @app.route('/admin/delete_token/<int:token_id>', methods=['POST'])
 @login_required
 @admin_required
@@ -527,35 +3205,281 @@ def delete_token(token_id):
          flash('Token not found.', 'error')
      return redirect(url_for('admin_tokens'))
 
+# --- Metrics Endpoints ---
+def _cache_counts(attribute: str) -> dict:
+    caches = {'upstream': client.cache, 'completed_jobs': client.completed_jobs, 'users': user_cache}
+    if attribute == 'hits':
+        return {name: cache.hits + getattr(cache, 'stale_hits', 0) for name, cache in caches.items()}
+    return {name: getattr(cache, attribute) for name, cache in caches.items()}
+
+metrics.add_gauge('cache_hit_ratio', 'Share of lookups served from cache (stale hits included).',
+                  lambda: _cache_counts('hit_ratio'), label='cache')
+metrics.add_gauge('cache_hits_total', 'Cache lookups served from cache.', lambda: _cache_counts('hits'), label='cache', kind='counter')
+metrics.add_gauge('cache_misses_total', 'Cache lookups that had to load the value.', lambda: _cache_counts('misses'), label='cache', kind='counter')
+metrics.add_gauge('job_poller_pending_jobs', 'Jobs the background poller is waiting on.', lambda: job_poller.pending_count)
+metrics.add_gauge('job_poller_cycles_total', 'Background polling cycles run.', lambda: job_poller.cycles, kind='counter')
+metrics.add_gauge('job_poller_upstream_calls_total', 'Job fetches made by the background poller.', lambda: job_poller.upstream_calls, kind='counter')
+metrics.add_gauge('submit_rate_per_minute', 'Current job submission rate allowed by the adaptive limiter.',
+                  lambda: submission_dispatcher.limiter.rate * 60)
+metrics.add_gauge('submit_rate_limited_total', '429 responses that made the submission limiter back off.',
+                  lambda: submission_dispatcher.limiter.rate_limited_count, kind='counter')
+metrics.add_gauge('submit_dispatched_total', 'Queued submissions sent to the API.', lambda: submission_dispatcher.dispatched, kind='counter')
+
+@app.route('/admin/metrics')
+@login_required
+@admin_required
+def metrics_route():
+    """Metrics in the Prometheus text format."""
+    return Response(metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/admin/metrics.json')
+@login_required
+@admin_required
+def metrics_json_route():
+    return jsonify(metrics.snapshot())
+
 # --- API Endpoint for Job Status Polling ---
 @app.route('/job_status/<job_id>')
 @login_required
 def job_status_route(job_id):
-    """API endpoint to check job status (for AJAX polling)."""
+    """API endpoint to check job status (for AJAX polling). Served from the background poller's state."""
     if client._is_key_placeholder():
          return jsonify({'error': 'API Key not configured.'}), 403 # Use 403 Forbidden
 
     try:
-        job = client.get_job(job_id=job_id)
-        if job is None:
+        status = job_poller.lookup(job_id)
+        if status is None:
              # Could be job not found or API key invalid
              return jsonify({'error': f'Job {job_id} not found or API access denied.'}), 404
 
         return jsonify({
-            'completed': job.is_completed,
-            'output': job.output,
-            'objectives': job.objectives,
+            'completed': status['completed'],
+            'output': status['output'],
+            'objectives': status['objectives'],
             'error': None
         })
     except Exception as e:
          # Catch other potential API errors
          return jsonify({'error': str(e)}), 500
 
+# --- JSON Job API ---
+def _job_payload(job: Job) -> dict:
+    return {**dataclasses.asdict(job), 'is_completed': job.is_completed}
+
+def _cacheable_json(payload, immutable: bool) -> Response:
+    """JSON response with a strong ETag over its bytes; immutable (completed) payloads may be cached for good."""
+    response = jsonify(payload)
+    response.set_etag(hashlib.sha256(response.get_data()).hexdigest())
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable' if immutable else 'private, no-cache'
+    return response.make_conditional(request)
+
+@app.route('/api/jobs/<job_id>')
+@login_required
+def api_job_route(job_id):
+    """Returns one job as JSON from the local job store."""
+    if client._is_key_placeholder():
+        return jsonify({'error': 'API Key not configured.'}), 503
+    try:
+        job = get_stored_job(job_id)
+    except Exception as e:
+        app.logger.error(f"Error fetching job {job_id} for JSON API: {e}")
+        return jsonify({'error': f"Error fetching job {job_id} from API: {e}"}), 502
+    if job is None:
+        return jsonify({'error': f"Job '{job_id}' not found."}), 404
+    return _cacheable_json(_job_payload(job), immutable=job.is_completed)
+
+@app.route('/api/jobs')
+@login_required
+def api_jobs_route():
+    """Returns several jobs as JSON: /api/jobs?ids=a,b,c -> {"jobs": [...], "missing": [...]}."""
+    if client._is_key_placeholder():
+        return jsonify({'error': 'API Key not configured.'}), 503
+    job_ids = list(dict.fromkeys(job_id.strip() for job_id in request.args.get('ids', '').split(',') if job_id.strip()))
+    if not job_ids:
+        return jsonify({'error': 'The ids parameter is required.'}), 400
+    if len(job_ids) > JOBS_MAX_PAGE_SIZE:
+        return jsonify({'error': f"At most {JOBS_MAX_PAGE_SIZE} ids may be requested at once."}), 400
+    try:
+        jobs = get_stored_jobs(job_ids)
+    except Exception as e:
+        app.logger.error(f"Error fetching jobs for JSON API: {e}")
+        return jsonify({'error': f"Error fetching jobs from API: {e}"}), 502
+    found = [job for job in jobs.values() if job is not None]
+    missing = [job_id for job_id, job in jobs.items() if job is None]
+    return _cacheable_json({'jobs': [_job_payload(job) for job in found], 'missing': missing},
+                           immutable=not missing and all(job.is_completed for job in found))
+
+# --- Server-Sent Events for Job Completion ---
+@app.route('/events/jobs')
+@login_required
+def job_events_route():
+    """Streams the completions of the jobs in ?ids=a,b (at most SSE_MAX_IDS) as Server-Sent Events.
+
+    One message is sent per job as it completes (immediately for jobs that are
+    already done), and the stream ends once all of them have been sent. A
+    stream is also closed after SSE_MAX_LIFETIME seconds, so no request thread
+    is held indefinitely; EventSource then reconnects with the same ids.
+    """
+    if client._is_key_placeholder():
+         return jsonify({'error': 'API Key not configured.'}), 403
+
+    watched = {job_id for job_id in request.args.get('ids', '').split(',') if job_id}
+    if not watched:
+        return jsonify({'error': 'The ids parameter is required.'}), 400
+    if len(watched) > SSE_MAX_IDS:
+        return jsonify({'error': f'At most {SSE_MAX_IDS} job ids can be watched per stream.'}), 400
+    def stream():
+        # Subscribed and looked up here, not in the view, so a response that is never iterated holds nothing
+        subscription = job_poller.subscribe() # Before the lookups, so no completion is missed
+        deadline = time.monotonic() + SSE_MAX_LIFETIME
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            ready = []
+            with app.app_context():
+                for job_id in sorted(watched):
+                    try:
+                        status = job_poller.lookup(job_id)
+                        if status is None:
+                            ready.append({'job_id': job_id, 'error': f'Job {job_id} not found or API access denied.'})
+                        elif status['completed']:
+                            ready.append(status)
+                    except Exception as e:
+                        ready.append({'job_id': job_id, 'error': str(e)})
+            for event in ready:
+                watched.discard(event['job_id'])
+                yield f"data: {json.dumps(event)}\n\n"
+            while watched:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    event = subscription.get(timeout=min(SSE_HEARTBEAT_INTERVAL, remaining))
+                except queue.Empty:
+                    yield ": keep-alive\n\n" # Also detects disconnected browsers
+                    continue
+                if event['job_id'] in watched:
+                    watched.discard(event['job_id'])
+                    yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            job_poller.unsubscribe(subscription)
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# --- CLI Commands ---
+@app.cli.command('submit-batch')
+@click.argument('batch_file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--output', '-o', type=click.File('w'), default='-', help='Where to write JSONL results (default: stdout).')
+@click.option('--dispatch/--no-dispatch', default=False,
+              help='Send the queued rows from this process. Only when the web app is not running: it sends them otherwise, '
+                   'and a second dispatcher would double the submission rate.')
+@click.option('--wait/--no-wait', default=False, help='Also wait for every job to complete and write its outcome.')
+def submit_batch_command(batch_file, output, dispatch, wait):
+    """Queue every (scenario, subject, body) row of a JSONL or CSV file and report each row's progress."""
+    if client._is_key_placeholder():
+        raise click.ClickException('API Key is not configured.')
+    try:
+        rows = parse_batch_rows(batch_file.read(), batch_file.name)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    db.create_all()
+    ensure_submission_queue_schema() # An existing queue table may predate the retry columns
+    if dispatch:
+        submission_dispatcher.start()
+    else:
+        click.echo('Rows are sent by the running web app; pass --dispatch if it is not running.', err=True)
+    job_ids, done = [], 0
+    for result in submit_batch(rows):
+        output.write(json.dumps(result) + '\n')
+        output.flush()
+        if result['status'] in ('invalid', 'dispatched', 'failed'):
+            done += 1
+        click.echo(f"[{done}/{len(rows)}] row {result['row']}: {result['status']} "
+                   f"{result['job_id'] or result['error'] or result['ticket']}", err=True)
+        if result['status'] == 'dispatched':
+            job_ids.append(result['job_id'])
+    if wait:
+        for done, snapshot in enumerate(wait_for_jobs(job_ids), start=1):
+            output.write(json.dumps({'outcome': snapshot}) + '\n')
+            output.flush()
+            click.echo(f"[{done}/{len(job_ids)}] job {snapshot['job_id']} finished", err=True)
+
+@app.cli.command('export-jobs')
+@click.option('--output', '-o', type=click.File('w'), default='-', help='Where to write JSONL (default: stdout).')
+@click.option('--completed-only', is_flag=True, help='Skip jobs that are still processing.')
+def export_jobs_command(output, completed_only):
+    """Stream every job of the team from the API as JSON lines."""
+    if client._is_key_placeholder():
+        raise click.ClickException('API Key is not configured.')
+    exported = 0
+    for job in client.iter_jobs():
+        if completed_only and not job.is_completed:
+            continue
+        output.write(json.dumps(dataclasses.asdict(job)) + '\n')
+        exported += 1
+    click.echo(f"Exported {exported} jobs.", err=True)
+
+@app.cli.command('build-similarity-index')
+@click.option('--rebuild', is_flag=True, help='Discard existing signatures and index every stored job again.')
+def build_similarity_index_command(rebuild):
+    """Index stored jobs for the 'most similar' sort."""
+    db.create_all()
+    if rebuild:
+        JobLSHBucket.query.delete()
+        JobSignature.query.delete()
+        db.session.commit()
+    click.echo(f"Indexed {similarity_index.backfill()} jobs.")
+
+@app.cli.command('benchmark-job-storage')
+@click.option('--jobs', '-n', 'count', default=50000, show_default=True, help='Synthetic jobs to generate.')
+@click.option('--repeat', '-r', default=5, show_default=True, help='Timing runs per workload (best is reported).')
+@click.option('--seed', default=0, show_default=True)
+def benchmark_job_storage_command(count, repeat, seed):
+    """Compare Job dataclasses with and without slots for memory and build time."""
+    results = benchmark_job_storage(count=count, repeat=repeat, seed=seed)
+    metrics = [key for key in results['dataclasses'] if key != 'memory_bytes']
+    click.echo(f"{f'{count} jobs':<24}{'dataclasses':>14}{'slots':>14}{'ratio':>8}")
+    base, slotted = results['dataclasses']['memory_bytes'], results['slots']['memory_bytes']
+    click.echo(f"{'memory (MiB)':<24}{base / 2**20:>14.1f}{slotted / 2**20:>14.1f}{base / slotted:>7.1f}x")
+    for metric in metrics:
+        base, slotted = results['dataclasses'][metric], results['slots'][metric]
+        click.echo(f"{metric + ' (ms)':<24}{base * 1000:>14.1f}{slotted * 1000:>14.1f}{base / slotted:>7.1f}x")
+
+@app.cli.command('benchmark-auth')
+@click.option('--registrations', '-r', default=300, show_default=True, help='Registrations to run.')
+@click.option('--logins', '-l', default=1200, show_default=True, help='Logins to run, mixed with the registrations.')
+@click.option('--threads', '-t', default=8, show_default=True, help='Concurrent workers.')
+def benchmark_auth_command(registrations, logins, threads):
+    """Compare concurrent registration and login throughput before and after the SQLite tuning."""
+    results = benchmark_auth(registrations=registrations, logins=logins, threads=threads)
+    click.echo(f"{f'{threads} threads':<24}{'before':>12}{'after':>12}")
+    for key, label in (('register_per_s', 'registrations/s'), ('login_per_s', 'logins/s'), ('failed', 'failed (locked)'),
+                       ('registered', 'users registered'), ('token_uses_spent', 'token uses spent')):
+        before, after = results['before'][key], results['after'][key]
+        click.echo(f"{label:<24}{before:>12.1f}{after:>12.1f}" if isinstance(before, float) else f"{label:<24}{before:>12}{after:>12}")
+
+@app.cli.command('rebuild-job-stats')
+def rebuild_job_stats_command():
+    """Recount the job statistics from the local job store."""
+    db.create_all()
+    click.echo(f"Counted {rebuild_job_stats()} completed jobs.")
+
+@app.cli.command('build-search-index')
+@click.option('--rebuild', is_flag=True, help='Empty the full-text index and index every stored job again.')
+def build_search_index_command(rebuild):
+    """Index stored jobs for /jobs/search."""
+    db.create_all()
+    if rebuild:
+        db.session.execute(db.text(f"DELETE FROM {search_index.TABLE}"))
+        db.session.commit()
+    click.echo(f"Indexed {search_index.backfill()} jobs.")
+
 # --- Initialization and Run ---
 def initialize_database():
     # Get the absolute path for clarity
     db_path = os.path.abspath(DATABASE_FILE)
     print(f"Initializing database (checking path: {db_path})...")
+    indexed = searchable = 0
 
     if not os.path.exists(db_path):
         print(f"Database file '{db_path}' not found, creating...")
@@ -566,12 +3490,23 @@ def initialize_database():
         print(f"Database file '{db_path}' exists.")
         # Ensure all tables exist even if file exists
         with app.app_context(): # Ensure operations are within app context
+            ensure_job_store_schema()
             db.create_all()
+            ensure_submission_queue_schema()
+            ensure_indexes()
+            indexed = similarity_index.backfill()
+            searchable = search_index.backfill()
+            if JobStats.query.first() is None and JobRecord.query.filter(JobRecord.completed_time.isnot(None)).first():
+                print(f"Counted {rebuild_job_stats()} completed jobs into the job statistics.")
         print("Ensured all tables are created.")
+        if indexed:
+            print(f"Added {indexed} stored jobs to the similarity index.")
+        if searchable:
+            print(f"Added {searchable} stored jobs to the search index.")
 
     # Create first admin user if no users exist
     with app.app_context(): # Ensure DB operations are within app context
-        if User.query.count() == 0:
+        if not User.any_exist():
             print("No users found. Creating default admin user.")
             print("IMPORTANT: Please change the default admin password immediately after login.")
             admin_user = User(username='admin', is_admin=True)
@@ -131,7 +131,20 @@ function extractJobData() {
 }
 
 /**
- * Fetches a job's full details from the server
+ * Saves several jobs' data to the localStorage cache in one write
+ */
+function saveJobCacheEntries(entries) {
+    try {
+        const cache = loadJobCache();
+        Object.assign(cache, entries);
+        localStorage.setItem(JOB_CACHE_KEY, JSON.stringify(cache));
+    } catch (e) {
+        console.error('Error saving job cache:', e);
+    }
+}
+
+/**
+ * Fetches a job's details from the JSON job API
  * @param {string} jobId - The ID of the job to fetch
  * @returns {Promise<object>} - Promise resolving to the job data
  */
@@ -142,30 +155,19 @@ async function fetchJobDetails(jobId) {
             return jobDataCache[jobId];
         }
         
-        // Fetch from server
-        const response = await fetch(`/job/${jobId}`);
+        // Completed jobs are served as immutable, so repeat requests come from the browser cache
+        const response = await fetch(`/api/jobs/${encodeURIComponent(jobId)}`, { headers: { 'Accept': 'application/json' } });
         if (!response.ok) {
             throw new Error(`Error fetching job: ${response.status}`);
         }
         
-        const html = await response.text();
-        
-        // Create a DOM parser
-        const parser = new DOMParser();
-        const doc = parser.parseFromString(html, 'text/html');
-        
-        // Extract job body from the job details page
-        const bodyContent = doc.querySelector('#job-body-content');
-        
-        if (!bodyContent) {
-            throw new Error('Could not find job body content');
-        }
-        
+        const job = await response.json();
         const jobData = {
-            body: bodyContent.textContent
+            body: job.body
         };
         
         // Save to cache
+        jobDataCache[jobId] = jobData;
         saveJobCache(jobId, jobData);
         return jobData;
     } catch (error) {
@@ -174,6 +176,42 @@ async function fetchJobDetails(jobId) {
     }
 }
 
+/**
+ * Fetches details for several jobs with one /api/jobs request
+ * @param {string[]} jobIds - The IDs of the jobs to fetch
+ * @returns {Promise<object>} - Promise resolving to {jobId: jobData} for the jobs found
+ */
+async function fetchJobsDetails(jobIds) {
+    const result = {};
+    const uncached = [];
+    jobIds.forEach(jobId => {
+        if (jobDataCache[jobId]) {
+            result[jobId] = jobDataCache[jobId];
+        } else {
+            uncached.push(jobId);
+        }
+    });
+    if (uncached.length === 0) return result;
+
+    try {
+        const response = await fetch(`/api/jobs?ids=${uncached.map(encodeURIComponent).join(',')}`, { headers: { 'Accept': 'application/json' } });
+        if (!response.ok) {
+            throw new Error(`Error fetching jobs: ${response.status}`);
+        }
+        const data = await response.json();
+        const fetched = {};
+        data.jobs.forEach(job => {
+            fetched[job.job_id] = { body: job.body };
+        });
+        Object.assign(jobDataCache, fetched);
+        saveJobCacheEntries(fetched);
+        Object.assign(result, fetched);
+    } catch (error) {
+        console.error('Error fetching jobs:', error);
+    }
+    return result;
+}
+
 /**
  * Tags System Functions
  */
@@ -270,53 +308,68 @@ function deleteTag(tagName) {
 
 /**
  * Filtering Functions
+ *
+ * Scenario, status, objective and subject filters, date/scenario/success-rate
+ * sorting and paging are done by /jobs on the server; the controls only build
+ * its query string. The similarity sort sends the chosen reference job
+ * and the server ranks its nearest neighbours. Tags live in this browser's
+ * localStorage, so they still apply to the jobs of the current page.
  */
 function filterJobs() {
     allJobs.forEach(job => {
-        const isVisible = 
-            filterByScenario(job) && 
-            filterByStatus(job) && 
-            filterByObjective(job) &&
-            filterBySubject(job) &&
-            filterByTags(job);
-        
-        job.element.style.display = isVisible ? '' : 'none';
+        job.element.style.display = filterByTags(job) ? '' : 'none';
     });
 }
 
-function filterByScenario(job) {
-    return activeFilters.scenario === 'all' || job.scenario === activeFilters.scenario;
+function filterByTags(job) {
+    if (activeFilters.tags.length === 0) return true;
+    
+    // Return true if job has ANY of the selected tags
+    return activeFilters.tags.some(tag => job.tags.includes(tag));
 }
 
-function filterByStatus(job) {
-    return activeFilters.status === 'all' || job.status === activeFilters.status;
+function readFilterControls() {
+    if (scenarioFilterSelect) activeFilters.scenario = scenarioFilterSelect.value;
+    if (statusFilterSelect) activeFilters.status = statusFilterSelect.value;
+    if (objectiveFilterSelect) activeFilters.objective = objectiveFilterSelect.value;
+    if (objectiveStatusSelect) activeFilters.objectiveStatus = objectiveStatusSelect.value;
+    if (subjectSearchInput) activeFilters.subject = subjectSearchInput.value.trim();
+    if (sortBySelect) activeSorting = sortBySelect.value;
 }
 
-function filterByObjective(job) {
-    if (activeFilters.objective === 'all') return true;
-    
-    if (activeFilters.objectiveStatus === 'success') {
-        return job.succeededObjectives.includes(activeFilters.objective);
-    } else if (activeFilters.objectiveStatus === 'failed') {
-        return job.failedObjectives.includes(activeFilters.objective);
-    } else {
-        // 'any' status - check if objective exists in either list
-        return job.allObjectives.includes(activeFilters.objective);
+/**
+ * Builds the /jobs query string for the active filters (without a page cursor)
+ */
+function buildJobsQuery() {
+    const params = new URLSearchParams();
+    if (activeFilters.scenario !== 'all') params.set('scenario', activeFilters.scenario);
+    if (activeFilters.status !== 'all') params.set('status', activeFilters.status);
+    if (activeFilters.objective !== 'all') {
+        params.set('objective', activeFilters.objective);
+        if (activeFilters.objectiveStatus !== 'any') params.set('objective_status', activeFilters.objectiveStatus);
     }
+    if (activeFilters.subject) params.set('subject', activeFilters.subject);
+    if (activeSorting === 'similarity') {
+        // Without a reference job there is nothing to rank against, so keep the server's order
+        if (referenceJobId) {
+            params.set('sort', 'similarity');
+            params.set('reference', referenceJobId);
+        } else {
+            const sort = new URLSearchParams(window.location.search).get('sort');
+            if (sort && sort !== 'similarity' && sort !== 'date-desc') params.set('sort', sort);
+        }
+    } else if (activeSorting !== 'date-desc') {
+        params.set('sort', activeSorting);
+    }
+    const limit = new URLSearchParams(window.location.search).get('limit');
+    if (limit) params.set('limit', limit);
+    return params.toString();
 }
 
-function filterBySubject(job) {
-    if (!activeFilters.subject) return true;
-    
-    const searchTerm = activeFilters.subject.toLowerCase();
-    return job.subject.toLowerCase().includes(searchTerm);
-}
-
-function filterByTags(job) {
-    if (activeFilters.tags.length === 0) return true;
-    
-    // Return true if job has ANY of the selected tags
-    return activeFilters.tags.some(tag => job.tags.includes(tag));
+function currentJobsQuery() {
+    const params = new URLSearchParams(window.location.search);
+    params.delete('cursor');
+    return params.toString();
 }
 
 /**
@@ -333,11 +386,6 @@ function sortJobs() {
                 return a.scenario.localeCompare(b.scenario);
             case 'success-rate':
                 return b.successRate - a.successRate;
-            case 'similarity':
-                if (!referenceJobId) return 0;
-                const refJob = allJobs.find(job => job.id === referenceJobId);
-                if (!refJob) return 0;
-                return calculateSimilarity(b, refJob) - calculateSimilarity(a, refJob);
             default:
                 return 0;
         }
@@ -429,49 +477,6 @@ function populateReferenceJobsList() {
 /**
  * UI Update Functions
  */
-function populateScenarioFilter() {
-    if (!scenarioFilterSelect) return;
-    
-    // Get unique scenarios
-    const scenarios = [...new Set(allJobs.map(job => job.scenario))];
-    
-    // Clear existing options (except the first one)
-    while (scenarioFilterSelect.options.length > 1) {
-        scenarioFilterSelect.remove(1);
-    }
-    
-    // Add new options
-    scenarios.forEach(scenario => {
-        const option = document.createElement('option');
-        option.value = scenario;
-        option.textContent = scenario;
-        scenarioFilterSelect.appendChild(option);
-    });
-}
-
-function populateObjectiveFilter() {
-    if (!objectiveFilterSelect) return;
-    
-    // Get unique objectives from all jobs
-    const objectives = new Set();
-    allJobs.forEach(job => {
-        job.allObjectives.forEach(obj => objectives.add(obj));
-    });
-    
-    // Clear existing options (except the first one)
-    while (objectiveFilterSelect.options.length > 1) {
-        objectiveFilterSelect.remove(1);
-    }
-    
-    // Add new options
-    Array.from(objectives).sort().forEach(objective => {
-        const option = document.createElement('option');
-        option.value = objective;
-        option.textContent = objective;
-        objectiveFilterSelect.appendChild(option);
-    });
-}
-
 function refreshTagDisplay() {
     if (!tagsContainer || !allTagsContainer) return;
     
@@ -568,8 +573,14 @@ function showTagModal() {
 }
 
 function applyFiltersAndSort() {
+    readFilterControls();
+    const query = buildJobsQuery();
+    if (query !== currentJobsQuery()) {
+        // Server-side filters or order changed: load the first matching page
+        window.location.search = query;
+        return;
+    }
     filterJobs();
-    sortJobs();
 }
 
 function resetFilters() {
@@ -597,7 +608,11 @@ function resetFilters() {
     refreshTagDisplay();
     
     // Apply changes
-    applyFiltersAndSort();
+    if (currentJobsQuery()) {
+        window.location.search = '';
+    } else {
+        filterJobs();
+    }
 }
 
 /**
@@ -983,15 +998,13 @@ async function performComparisonAnalysis(container) {
         // Get selected jobs
         const selectedJobs = allJobs.filter(job => selectedJobsForComparison.has(job.id));
         
-        // Fetch full job data for each selected job
-        for (const job of selectedJobs) {
-            if (!job.body) {
-                const jobData = await fetchJobDetails(job.id);
-                if (jobData) {
-                    job.body = jobData.body;
-                }
+        // Fetch full job data for the selected jobs in one request
+        const jobsData = await fetchJobsDetails(selectedJobs.filter(job => !job.body).map(job => job.id));
+        selectedJobs.forEach(job => {
+            if (!job.body && jobsData[job.id]) {
+                job.body = jobsData[job.id].body;
             }
-        }
+        });
         
         // Build comparison content
         let comparisonHtml = '<div class="comparison-header">';
@@ -1775,4 +1788,58 @@ function generateSemanticDiffSummary(text1, text2) {
         console.error('Error generating semantic diff summary:', error);
         return '<p>Error analyzing differences.</p>';
     }
-}
\ No newline at end of file
+}
+
+// --- Initialization ---
+document.addEventListener('DOMContentLoaded', () => {
+    jobListContainer = document.querySelector('.job-list-container');
+    if (!jobListContainer) return;
+
+    scenarioFilterSelect = document.getElementById('scenario-filter');
+    statusFilterSelect = document.getElementById('status-filter');
+    objectiveFilterSelect = document.getElementById('objective-filter');
+    objectiveStatusSelect = document.getElementById('objective-status');
+    subjectSearchInput = document.getElementById('subject-search');
+    tagsContainer = document.getElementById('tags-container');
+    sortBySelect = document.getElementById('sort-by');
+    applyFiltersBtn = document.getElementById('apply-filters-btn');
+    resetFiltersBtn = document.getElementById('reset-filters-btn');
+    manageTagsBtn = document.getElementById('manage-tags-btn');
+    tagModal = document.getElementById('tag-modal');
+    newTagInput = document.getElementById('new-tag-input');
+    allTagsContainer = document.getElementById('all-tags-container');
+    tagModalCloseBtn = document.getElementById('tag-modal-close-btn');
+    similarityModal = document.getElementById('similarity-modal');
+    referenceJobsList = document.getElementById('reference-jobs-list');
+    similarityModalCloseBtn = document.getElementById('similarity-modal-close-btn');
+
+    allJobs = extractJobData();
+    readFilterControls(); // Controls were rendered with the server's active filters
+    referenceJobId = new URLSearchParams(window.location.search).get('reference');
+    refreshTagDisplay();
+
+    if (applyFiltersBtn) applyFiltersBtn.addEventListener('click', applyFiltersAndSort);
+    if (resetFiltersBtn) resetFiltersBtn.addEventListener('click', resetFilters);
+    if (subjectSearchInput) {
+        subjectSearchInput.addEventListener('keydown', (e) => {
+            if (e.key === 'Enter') applyFiltersAndSort();
+        });
+    }
+    if (sortBySelect) {
+        sortBySelect.addEventListener('change', () => {
+            if (sortBySelect.value === 'similarity') showSimilarityModal();
+        });
+    }
+    if (similarityModalCloseBtn) {
+        similarityModalCloseBtn.addEventListener('click', () => { similarityModal.style.display = 'none'; });
+    }
+    if (manageTagsBtn) manageTagsBtn.addEventListener('click', showTagModal);
+    if (tagModalCloseBtn) tagModalCloseBtn.addEventListener('click', () => { tagModal.style.display = 'none'; });
+    const addTagBtn = document.getElementById('add-tag-btn');
+    if (addTagBtn && newTagInput) {
+        addTagBtn.addEventListener('click', () => {
+            createNewTag(newTagInput.value.trim());
+            newTagInput.value = '';
+        });
+    }
+});
@@ -0,0 +1,46 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+# main.py reads its configuration at import time
+_db_dir = tempfile.mkdtemp(prefix='llmail-tests-')
+os.environ.update(
+    FLASK_SECRET_KEY='test',
+    DATABASE_FILE=os.path.join(_db_dir, 'app.db'),
+    API_SERVER='http://127.0.0.1:9', # Nothing listens there; tests must not reach the API
+    COMPETITION_API_KEY='test-key',
+)
+
+@pytest.fixture(scope='session')
+def _website():
+    sys.path.insert(0, os.path.join(ROOT_DIR, 'website'))
+    from app import create_app, db
+
+    class Config:
+        SECRET_KEY = 'test'
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(_db_dir, 'website.db')}"
+        SHARED_CACHE_FILE = os.path.join(_db_dir, 'shared_cache.db')
+
+    return create_app(Config), db
+
+@pytest.fixture
+def website_app(_website):
+    app, db = _website
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
+
+@pytest.fixture
+def main_app():
+    import main
+
+    with main.app.app_context():
+        main.db.drop_all()
+        main.db.create_all()
+    return main
@@ -0,0 +1,26 @@
+import json
+
+import pytest
+
+JOBS = [
+    {'job_id': 'job-1', 'subject': 'Grüße', 'body': 'Braces } and ] inside "strings" {', 'objectives': {'exfil.sent': True}},
+    {'job_id': 'job-2', 'subject': '', 'body': 'Emoji \U0001f600 and escapes \\" \\u00e9', 'objectives': None},
+    {'job_id': 'job-3', 'subject': 'Last', 'body': 'x' * 100, 'objectives': {}},
+]
+
+def _chunks(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64, 10_000])
+def test_iter_json_array_across_chunk_boundaries(main_app, size):
+    data = json.dumps(JOBS, ensure_ascii=False, indent=1).encode() # Multi-byte characters get split at size 1-3
+    assert list(main_app.iter_json_array(_chunks(data, size))) == JOBS
+
+@pytest.mark.parametrize('chunks', [[b'[]'], [b' [ ', b' ] '], [b'[', b']']])
+def test_iter_json_array_empty(main_app, chunks):
+    assert list(main_app.iter_json_array(chunks)) == []
+
+@pytest.mark.parametrize('data', [b'{"job_id": "job-1"}', b'[1, 2]', b'[{"job_id": "job-1"}', b'[{"job_id": '])
+def test_iter_json_array_rejects_other_input(main_app, data):
+    with pytest.raises(ValueError):
+        list(main_app.iter_json_array(_chunks(data, 4)))
@@ -0,0 +1,35 @@
+import pytest
+
+def _store(main, job_id, scheduled_time='2026-10-17T10:00:00Z', scenario='level1a'):
+    main.store_job(main.Job(job_id=job_id, team_id='team-1', scenario=scenario, subject=f'Subject {job_id}',
+                            body=f'Body {job_id}', scheduled_time=scheduled_time))
+
+def _all_pages(main, sort, limit):
+    job_ids, cursor = [], None
+    while True:
+        records, cursor = main.query_jobs(sort=sort, cursor=cursor, limit=limit)
+        job_ids += [record.job_id for record in records]
+        if cursor is None:
+            return job_ids
+
+@pytest.mark.parametrize('sort', ['date-desc', 'date-asc', 'scenario', 'success-rate'])
+def test_cursor_pages_through_equal_sort_keys(main_app, sort):
+    main = main_app
+    with main.app.app_context():
+        for i in range(7): # Every job shares its scenario and scheduled time, so only the job id orders them
+            _store(main, f'job-{i}')
+        _store(main, 'job-early', scheduled_time='2026-10-16T10:00:00Z')
+        main.db.session.commit()
+
+        expected = [record.job_id for record in main.query_jobs(sort=sort, limit=100)[0]]
+        assert len(expected) == 8
+        for limit in (1, 2, 3):
+            assert _all_pages(main, sort, limit) == expected
+
+def test_malformed_cursor_is_rejected(main_app):
+    main = main_app
+    with main.app.app_context():
+        with pytest.raises(ValueError):
+            main.query_jobs(cursor='not-a-cursor')
+        with pytest.raises(ValueError):
+            main.query_jobs(cursor=main._encode_cursor(['2026-10-17T10:00:00Z'])) # Too few columns for the sort
@@ -0,0 +1,30 @@
+def _job(main, **changes):
+    fields = dict(job_id='job-1', team_id='team-1', scenario='level1a', subject='Hello', body='Body',
+                  scheduled_time='2026-10-17T10:00:00Z', started_time='2026-10-17T10:00:01Z',
+                  completed_time=None, output=None, objectives=None)
+    fields.update(changes)
+    return main.Job(**fields)
+
+def _stats(main):
+    row = main.JobStats.query.filter_by(scenario='level1a', objective='', day='').one()
+    return row.attempts, row.successes
+
+def test_same_completion_stored_twice_is_counted_once(main_app):
+    main = main_app
+    completed = _job(main, completed_time='2026-10-17T10:05:00Z', output='Done',
+                     objectives={'exfil.sent': True})
+    with main.app.app_context():
+        main.store_job(_job(main))
+        main.db.session.commit()
+        stale = main.db.session.get(main.JobRecord, 'job-1') # This session now holds the job as pending
+        assert not stale.is_completed
+
+        with main.app.app_context(): # Another writer (poller, sync) stores the completion first
+            main.store_job(completed)
+            main.db.session.commit()
+            assert _stats(main) == (1, 1)
+
+        main.store_job(completed)
+        main.db.session.commit()
+        assert _stats(main) == (1, 1)
+        assert stale.status == 'success'
@@ -0,0 +1,51 @@
+import pytest
+
+@pytest.fixture(params=['main', 'website'])
+def tokens(request):
+    """(app, db, RegistrationToken) for main.py and for the website package."""
+    if request.param == 'main':
+        main = request.getfixturevalue('main_app')
+        return main.app, main.db, main.RegistrationToken
+    website_app = request.getfixturevalue('website_app') # Puts the package on sys.path
+    from app import db
+    from app.models import RegistrationToken
+    return website_app, db, RegistrationToken
+
+def test_token_cannot_be_consumed_twice(tokens):
+    app, db, RegistrationToken = tokens
+    with app.app_context():
+        [token] = RegistrationToken.generate(1, uses=1)
+        db.session.commit()
+        assert RegistrationToken.consume(token)
+        db.session.commit()
+        assert not RegistrationToken.consume(token)
+        row = RegistrationToken.query.filter_by(token=token).one()
+        assert (row.uses_left, row.is_used) == (0, True)
+
+def test_multi_use_token_is_spent_once_per_use(tokens):
+    app, db, RegistrationToken = tokens
+    with app.app_context():
+        [token] = RegistrationToken.generate(1, uses=2)
+        db.session.commit()
+        assert [RegistrationToken.consume(token) for _ in range(3)] == [True, True, False]
+
+def test_expired_or_unknown_token_cannot_be_consumed(tokens):
+    app, db, RegistrationToken = tokens
+    with app.app_context():
+        expired, drained = RegistrationToken.generate(2, uses=3)
+        db.session.commit()
+        assert RegistrationToken.expire_many([RegistrationToken.query.filter_by(token=expired).one().id]) == 1
+        RegistrationToken.query.filter_by(token=drained).one().uses_left = 0 # Out of uses, but never marked used
+        db.session.commit()
+        assert not RegistrationToken.consume(expired)
+        assert not RegistrationToken.consume(drained)
+        assert not RegistrationToken.consume('no-such-token')
+
+def test_consume_is_rolled_back_with_the_registration(tokens):
+    app, db, RegistrationToken = tokens
+    with app.app_context():
+        [token] = RegistrationToken.generate(1, uses=1)
+        db.session.commit()
+        assert RegistrationToken.consume(token)
+        db.session.rollback() # The registration failed, so the use is given back
+        assert RegistrationToken.consume(token)
@@ -0,0 +1,136 @@
+import pytest
+import requests
+from urllib3.exceptions import ConnectTimeoutError, MaxRetryError, ReadTimeoutError
+
+@pytest.fixture
+def clock(main_app, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(main_app.time, 'monotonic', lambda: now[0])
+    return now
+
+def test_token_bucket_refills_at_its_rate(main_app, clock):
+    bucket = main_app.TokenBucket(rate=2, capacity=3)
+    assert [bucket.try_acquire() for _ in range(3)] == [0, 0, 0]
+    assert bucket.try_acquire() == pytest.approx(0.5)
+    clock[0] += 0.5
+    assert bucket.try_acquire() == 0
+    clock[0] += 100 # Refills up to the capacity only
+    assert [bucket.try_acquire() for _ in range(4)][-1] == pytest.approx(0.5)
+
+def test_token_bucket_backs_off_on_rate_limit(main_app, clock):
+    bucket = main_app.TokenBucket(rate=4, capacity=4, min_rate=1, max_rate=5, rate_step=0.5, cooldown=30)
+    bucket.on_rate_limited(retry_after=10)
+    assert bucket.rate == 2
+    assert bucket.try_acquire() == pytest.approx(10) # Paused, although tokens were left
+    clock[0] += 1
+    assert bucket.try_acquire() == pytest.approx(9)
+    clock[0] += 9 # The emptied bucket refilled at the halved rate during the pause
+    assert [bucket.try_acquire() for _ in range(5)][-1] == pytest.approx(0.5)
+    bucket.on_rate_limited() # No Retry-After: the cooldown
+    bucket.on_rate_limited()
+    assert bucket.rate == 1 # Never below min_rate
+    assert bucket.try_acquire() == pytest.approx(30)
+    assert bucket.rate_limited_count == 3
+    for _ in range(20):
+        bucket.on_success()
+    assert bucket.rate == 5 # Never above max_rate
+
+def _connection_error(reason):
+    return requests.exceptions.ConnectionError(MaxRetryError(None, '/jobs', reason=reason))
+
+def test_submission_not_created(main_app):
+    main = main_app
+    assert main.submission_not_created(main.APIError('Bad request', status_code=400))
+    assert main.submission_not_created(_connection_error(ConnectTimeoutError('Connection refused')))
+    assert not main.submission_not_created(main.APIError('Server error', status_code=502))
+    assert not main.submission_not_created(main.APIError('No status'))
+    assert not main.submission_not_created(_connection_error(ReadTimeoutError(None, '/jobs', 'Read timed out')))
+    assert not main.submission_not_created(requests.exceptions.ReadTimeout('Read timed out'))
+
+@pytest.fixture
+def dispatcher(main_app):
+    dispatcher = main_app.SubmissionDispatcher(limiter=main_app.TokenBucket(rate=100, capacity=100), max_attempts=2)
+    dispatcher.app = main_app.app # Not init_app: no background thread
+    return dispatcher
+
+def _fail_with(main, monkeypatch, error):
+    def create_job(**kwargs):
+        raise error
+    monkeypatch.setattr(main.client, 'create_job', create_job)
+
+def test_dispatch_sends_a_claimed_row_once(main_app, dispatcher, monkeypatch):
+    main = main_app
+    sent = []
+    def create_job(scenario, subject, body):
+        sent.append(subject)
+        return main.Job(job_id=f'job-{len(sent)}', team_id='team-1', scenario=scenario, subject=subject, body=body,
+                        scheduled_time='2026-10-17T10:00:00Z')
+    monkeypatch.setattr(main.client, 'create_job', create_job)
+    with main.app.app_context():
+        first = dispatcher.enqueue('level1a', 'First', 'Body')
+        second = dispatcher.enqueue('level1a', 'Second', 'Body')
+        assert dispatcher.claim(second)
+        assert not dispatcher.claim(second) # Already 'sending'
+
+        assert dispatcher.dispatch_pending() == 1
+        assert sent == ['First']
+        assert (first.status, first.job_id, first.attempts) == ('dispatched', 'job-1', 1)
+        assert main.db.session.get(main.JobRecord, 'job-1') is not None
+        assert second.status == 'sending'
+
+def test_dispatch_retries_only_what_was_not_created(main_app, dispatcher, monkeypatch):
+    main = main_app
+    _fail_with(main, monkeypatch, _connection_error(ConnectTimeoutError('Connection refused')))
+    with main.app.app_context():
+        submission = dispatcher.enqueue('level1a', 'Subject', 'Body')
+        assert dispatcher.dispatch_pending() == 1
+        assert (submission.status, submission.attempts) == ('queued', 1)
+        assert submission.next_attempt_at > submission.attempted_at
+        assert dispatcher.dispatch_pending() == 0 # Backing off
+
+        submission.next_attempt_at = None
+        main.db.session.commit()
+        dispatcher.dispatch_pending()
+        assert (submission.status, submission.attempts) == ('failed', 2) # Out of attempts
+
+@pytest.mark.parametrize('make_error, status', [
+    (lambda main: requests.exceptions.ReadTimeout('Read timed out'), 'unknown'),
+    (lambda main: main.APIError('Bad gateway', status_code=502), 'unknown'),
+    (lambda main: main.APIError('Unknown scenario', status_code=422), 'failed'),
+    (lambda main: main.APIKeyNotConfiguredError('API Key is not configured.'), 'failed'),
+])
+def test_dispatch_classifies_failures(main_app, dispatcher, monkeypatch, make_error, status):
+    main = main_app
+    _fail_with(main, monkeypatch, make_error(main))
+    with main.app.app_context():
+        submission = dispatcher.enqueue('level1a', 'Subject', 'Body')
+        dispatcher.dispatch_pending()
+        assert (submission.status, submission.attempts) == (status, 1)
+
+def test_rate_limited_row_goes_back_in_the_queue(main_app, dispatcher, monkeypatch):
+    main = main_app
+    _fail_with(main, monkeypatch, main.RateLimitedError('Too many requests', retry_after=30))
+    with main.app.app_context():
+        submission = dispatcher.enqueue('level1a', 'Subject', 'Body')
+        assert dispatcher.dispatch_pending() == 0
+        assert (submission.status, submission.attempts) == ('queued', 0)
+        assert dispatcher.limiter.rate_limited_count == 1
+
+def test_reconcile_settles_unknown_and_interrupted_rows(main_app, dispatcher, monkeypatch):
+    main = main_app
+    monkeypatch.setattr(main, 'sync_jobs', lambda force=False: True) # The job list is already in the store
+    with main.app.app_context():
+        unknown = dispatcher.enqueue('level1a', 'Subject', 'Body')
+        interrupted = dispatcher.enqueue('level1a', 'Other subject', 'Body')
+        attempted_at = main.time.time() - main.SUBMIT_RECONCILE_DELAY - 1
+        unknown.status, unknown.attempts, unknown.attempted_at = 'unknown', 1, attempted_at
+        unknown.created_at = attempted_at - 7200 # Queued long before it was sent
+        interrupted.status, interrupted.attempts, interrupted.attempted_at = 'sending', 1, attempted_at
+        for job_id, scheduled in (('job-before', attempted_at - 3600), ('job-after', attempted_at + 1)):
+            main.store_job(main.Job(job_id=job_id, team_id='team-1', scenario='level1a', subject='Subject', body='Body',
+                                    scheduled_time=main.format_api_time(int(scheduled))))
+        main.db.session.commit()
+
+        assert dispatcher.reconcile_unknown() == 2
+        assert (unknown.status, unknown.job_id) == ('dispatched', 'job-after') # Not the older identical job
+        assert (interrupted.status, interrupted.job_id) == ('queued', None) # Not found: nothing was created
@@ -1,4 +1,4 @@
-from flask import Flask
+from flask import Flask, current_app, url_for
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 import os
@@ -9,8 +9,19 @@ login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
 login_manager.login_message_category = 'info'
 
+# The templates and static files are shared with the single-file app (main.py) at the repository root
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+def build_blueprint_endpoint(error, endpoint, values):
+    """url_for() fallback for the shared templates, which use main.py's endpoint names ('index', not 'main.index')."""
+    for blueprint in ('main', 'auth', 'admin'):
+        if f'{blueprint}.{endpoint}' in current_app.view_functions:
+            return url_for(f'{blueprint}.{endpoint}', **values)
+    raise error
+
 def create_app(config_class=None):
-    app = Flask(__name__)
+    app = Flask(__name__, template_folder=os.path.join(ROOT_DIR, 'templates'),
+                static_folder=os.path.join(ROOT_DIR, 'static'))
     
     # Load config
     if config_class:
@@ -24,13 +35,21 @@ def create_app(config_class=None):
     # Initialize extensions with app
     db.init_app(app)
     login_manager.init_app(app)
+
+    # State shared by worker processes (see wsgi.py): WAL on the database, the upstream cache and process locks
+    from app.utils.shared_state import init_shared_state, startup_lock
+    init_shared_state(app)
+    
+    # Route and upstream metrics (served by the admin blueprint)
+    from app.utils.metrics import metrics
+    metrics.init_app(app)
     
-    # Import models to ensure they're known to Flask-SQLAlchemy
-    from app.models import User
+    # Importing the user cache also registers the models with Flask-SQLAlchemy
+    from app.utils.user_cache import load_cached_user
     
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return load_cached_user(int(user_id))
     
     # Register blueprints
     from app.routes.main import main_bp
@@ -40,9 +59,42 @@ def create_app(config_class=None):
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp)
     app.register_blueprint(admin_bp)
+    app.url_build_error_handlers.append(build_blueprint_endpoint)
+
+    # Scenario list (reloaded from jobs.html on change)
+    from app.utils.scenario_parser import scenario_registry
+    scenario_registry.reload()
+
+    # Background services
+    from app.utils.job_poller import job_poller
+    job_poller.init_app(app)
+    from app.utils.submission_queue import submission_dispatcher
+    submission_dispatcher.init_app(app)
+
+    # CLI commands
+    from app.utils.batch import submit_batch_command
+    app.cli.add_command(submit_batch_command)
+    from app.utils.similarity import build_similarity_index_command
+    app.cli.add_command(build_similarity_index_command)
+    from app.utils.search import build_search_index_command
+    app.cli.add_command(build_search_index_command)
+    from app.utils.job_stats import rebuild_job_stats_command
+    app.cli.add_command(rebuild_job_stats_command)
+    from app.utils.job_benchmark import benchmark_job_storage_command
+    app.cli.add_command(benchmark_job_storage_command)
+    from app.utils.job_store import export_jobs_command
+    app.cli.add_command(export_jobs_command)
+    from app.utils.auth_benchmark import benchmark_auth_command
+    app.cli.add_command(benchmark_auth_command)
     
     # Create database tables if they don't exist
-    with app.app_context():
+    with app.app_context(), startup_lock: # Workers starting together must not race to create tables
+        from app.utils.job_store import ensure_job_store_schema
+        from app.utils.shared_state import ensure_indexes
+        from app.utils.submission_queue import ensure_submission_queue_schema
+        ensure_job_store_schema()
         db.create_all()
+        ensure_submission_queue_schema()
+        ensure_indexes()
         
     return app
\ No newline at end of file
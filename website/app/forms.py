@@ -1,7 +1,11 @@
+import os
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SubmitField, IntegerField, HiddenField
-from wtforms.validators import DataRequired, Length, EqualTo, Email, ValidationError
-from app.models import User, RegistrationToken
+from wtforms import StringField, PasswordField, SubmitField, IntegerField, HiddenField, BooleanField, SelectField
+from wtforms.validators import DataRequired, Length, EqualTo, Email, ValidationError, NumberRange
+from app.models import User
+
+# Most registration tokens generated by one request
+TOKEN_BULK_MAX = int(os.getenv("TOKEN_BULK_MAX", "1000"))
 
 class LoginForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired()])
@@ -20,10 +24,7 @@ class RegistrationForm(FlaskForm):
         if user:
             raise ValidationError('Username already exists. Please choose a different one.')
 
-    def validate_registration_token(self, registration_token):
-        token_entry = RegistrationToken.query.filter_by(token=registration_token.data).first()
-        if not token_entry or token_entry.is_used or token_entry.uses_left <= 0:
-            raise ValidationError('Invalid or expired registration token.')
+    # The registration token is checked and spent by the register route itself, in the transaction that creates the user
 
 class PasswordChangeForm(FlaskForm):
     current_password = PasswordField('Current Password', validators=[DataRequired()])
@@ -33,4 +34,12 @@ class PasswordChangeForm(FlaskForm):
 
 class TokenGenerationForm(FlaskForm):
     uses = IntegerField('Number of Uses', default=1, validators=[DataRequired()])
-    submit = SubmitField('Generate Token')
\ No newline at end of file
+    count = IntegerField('Number of Tokens', default=1, validators=[DataRequired(), NumberRange(min=1, max=TOKEN_BULK_MAX)])
+    download = BooleanField('Download as CSV')
+    submit = SubmitField('Generate Tokens')
+
+class TokenBulkActionForm(FlaskForm):
+    # The selected token ids arrive as 'token_ids' checkboxes in the token table
+    action = SelectField('With selected', choices=[('expire', 'Expire selected'), ('delete', 'Delete selected'),
+                                                   ('delete_spent', 'Delete all used/expired tokens')])
+    submit = SubmitField('Apply')
\ No newline at end of file
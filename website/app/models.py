@@ -1,6 +1,8 @@
 from app import db
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.utils.passwords import password_hasher
+import dataclasses
+import time
 import uuid
 
 class User(db.Model, UserMixin):
@@ -10,10 +12,15 @@ class User(db.Model, UserMixin):
     is_admin = db.Column(db.Boolean, default=False, nullable=False)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+
+    @classmethod
+    def any_exist(cls) -> bool:
+        """Whether there is at least one user; stops at the first row instead of counting them all."""
+        return db.session.query(cls.query.exists()).scalar()
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -24,6 +31,143 @@ class RegistrationToken(db.Model):
     is_used = db.Column(db.Boolean, default=False, nullable=False)
     uses_left = db.Column(db.Integer, default=1, nullable=False)
 
+    @classmethod
+    def consume(cls, token: str) -> bool:
+        """Spends one use of a valid token in the current transaction. Returns False if it is unknown or used up.
+
+        A single conditional UPDATE, so concurrent registrations can neither
+        overspend a token nor lose a decrement.
+        """
+        result = db.session.execute(
+            db.update(cls).where(cls.token == token, cls.is_used.is_(False), cls.uses_left > 0)
+            .values(uses_left=cls.uses_left - 1, is_used=cls.uses_left <= 1)
+            .execution_options(synchronize_session=False))
+        return result.rowcount == 1
+
+    @classmethod
+    def generate(cls, count: int, uses: int) -> list[str]:
+        """Inserts `count` new tokens with `uses` uses each in the current transaction (caller commits) and returns them."""
+        tokens = [str(uuid.uuid4()) for _ in range(count)]
+        db.session.execute(db.insert(cls), [{'token': token, 'uses_left': uses, 'is_used': False} for token in tokens])
+        return tokens
+
+    @classmethod
+    def spent(cls):
+        """SQL condition matching tokens that can no longer be used to register."""
+        return db.or_(cls.is_used.is_(True), cls.uses_left <= 0)
+
+    @classmethod
+    def expire_many(cls, ids) -> int:
+        """Uses up the given tokens so they can no longer register anyone (caller commits). Returns how many changed."""
+        return db.session.execute(
+            db.update(cls).where(cls.id.in_(ids), db.not_(cls.spent())).values(uses_left=0, is_used=True)
+            .execution_options(synchronize_session=False)).rowcount
+
+    @classmethod
+    def delete_many(cls, ids=None) -> int:
+        """Deletes the given tokens, or every spent token if `ids` is None (caller commits). Returns how many went."""
+        condition = cls.spent() if ids is None else cls.id.in_(ids)
+        return db.session.execute(db.delete(cls).where(condition).execution_options(synchronize_session=False)).rowcount
+
     def __repr__(self):
         status = 'Used' if self.is_used else (f'{self.uses_left} uses left' if self.uses_left > 0 else 'Expired')
-        return f'<Token {self.token[:8]}... ({status})>'
\ No newline at end of file
+        return f'<Token {self.token[:8]}... ({status})>'
+
+class JobRecord(db.Model):
+    """Local mirror of a competition job, kept in sync by app.utils.job_store."""
+    job_id = db.Column(db.String(64), primary_key=True)
+    team_id = db.Column(db.String(64), nullable=False)
+    scenario = db.Column(db.String(64), nullable=False, index=True)
+    subject = db.Column(db.Text, nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    scheduled_time = db.Column(db.String(40), nullable=False, index=True)
+    started_time = db.Column(db.String(40))
+    completed_time = db.Column(db.String(40), index=True)
+    output = db.Column(db.Text)
+    objectives = db.Column(db.JSON)
+    synced_at = db.Column(db.Float, nullable=False, default=time.time, index=True) # Last upstream fetch (epoch seconds)
+    # Derived from objectives so the job list can filter and sort in SQL
+    status = db.Column(db.String(16), nullable=False, default='processing') # processing | success | partial | failed
+    success_rate = db.Column(db.Float, nullable=False, default=0.0) # Share of objectives met
+
+    __table_args__ = (
+        db.Index('ix_job_record_status_scheduled', 'status', 'scheduled_time'),
+        db.Index('ix_job_record_scenario_scheduled', 'scenario', 'scheduled_time'),
+        db.Index('ix_job_record_success_scheduled', 'success_rate', 'scheduled_time'),
+    )
+
+    @property
+    def is_completed(self):
+        return self.completed_time is not None
+
+    @staticmethod
+    def outcome(job) -> tuple[str, float]:
+        """Returns (status, success_rate) for a job, matching the job list's status labels."""
+        if not job.is_completed:
+            return 'processing', 0.0
+        results = [bool(value) for value in (job.objectives or {}).values()]
+        if not results:
+            return 'failed', 0.0
+        status = 'success' if all(results) else ('partial' if any(results) else 'failed')
+        return status, sum(results) / len(results)
+
+    def update_from_job(self, job):
+        for field in dataclasses.fields(job):
+            setattr(self, field.name, getattr(job, field.name))
+        self.status, self.success_rate = self.outcome(job)
+        self.synced_at = time.time()
+
+    def to_job(self):
+        from app.utils.api_client import Job
+        return Job(**{field.name: getattr(self, field.name) for field in dataclasses.fields(Job)})
+
+    def __repr__(self):
+        return f'<JobRecord {self.job_id} ({"completed" if self.is_completed else "pending"})>'
+
+class JobSignature(db.Model):
+    """MinHash signature of a job's subject and body, maintained by app.utils.similarity."""
+    job_id = db.Column(db.String(64), primary_key=True)
+    signature = db.Column(db.LargeBinary, nullable=False) # SIMILARITY_NUM_BINS unsigned 64-bit minima
+
+class JobLSHBucket(db.Model):
+    """One LSH band of a job's signature; jobs sharing a (band, bucket) pair are similarity candidates."""
+    band = db.Column(db.Integer, primary_key=True)
+    bucket = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    job_id = db.Column(db.String(64), primary_key=True)
+
+class JobStats(db.Model):
+    """Running success counts for completed jobs, maintained by app.utils.job_stats.
+
+    One row per (scenario, objective, day): objective '' counts whole jobs and
+    day '' is the all-time total, so the dashboard reads a few rows per scenario.
+    """
+    scenario = db.Column(db.String(64), primary_key=True)
+    objective = db.Column(db.String(64), primary_key=True, default='')
+    day = db.Column(db.String(10), primary_key=True, default='') # YYYY-MM-DD of the scheduled time (UTC)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    successes = db.Column(db.Integer, nullable=False, default=0) # All objectives met (per objective: that one met)
+    partials = db.Column(db.Integer, nullable=False, default=0) # Some but not all objectives met (whole-job rows only)
+
+class QueuedSubmission(db.Model):
+    """A job submission waiting for (or done with) dispatch by app.utils.submission_queue."""
+    id = db.Column(db.Integer, primary_key=True)
+    ticket = db.Column(db.String(36), unique=True, nullable=False, default=lambda: str(uuid.uuid4()))
+    scenario = db.Column(db.String(64), nullable=False)
+    subject = db.Column(db.Text, nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='queued') # queued | sending | dispatched | unknown | failed
+    job_id = db.Column(db.String(64))
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.Float, nullable=False, default=time.time)
+    dispatched_at = db.Column(db.Float)
+    attempted_at = db.Column(db.Float) # Last time it was sent
+    next_attempt_at = db.Column(db.Float) # Earliest retry after a failure; None means due now
+
+    __table_args__ = (
+        # The dispatcher takes the oldest queued row and /submission counts the queued rows ahead of one
+        db.Index('ix_queued_submission_status_id', 'status', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<QueuedSubmission {self.ticket[:8]}... ({self.status})>'
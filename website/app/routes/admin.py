@@ -1,12 +1,20 @@
-from flask import Blueprint, render_template, redirect, url_for, flash
+import csv
+import io
+import os
+from datetime import datetime, timezone
+from flask import Blueprint, Response, render_template, redirect, url_for, flash, request, stream_with_context, jsonify
 from flask_login import current_user, login_required
 from functools import wraps
 from app import db
 from app.models import User, RegistrationToken
-from app.forms import TokenGenerationForm
+from app.forms import TokenGenerationForm, TokenBulkActionForm, TOKEN_BULK_MAX
+from app.utils.metrics import metrics
+from app.utils.passwords import password_hasher
 
 admin_bp = Blueprint('admin', __name__)
 
+# Rows per page on the admin user and token lists
+ADMIN_PAGE_SIZE = int(os.getenv("ADMIN_PAGE_SIZE", "50"))
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -20,41 +28,132 @@ def admin_required(f):
 @login_required
 @admin_required
 def admin_dashboard():
-    return render_template('admin/dashboard.html', title='Admin Dashboard')
+    return render_template('admin/dashboard.html', title='Admin Dashboard', password_hashing=password_hasher.stats())
+
+def keyset_page(query, column, after=None, limit: int = ADMIN_PAGE_SIZE, descending: bool = False):
+    """Returns one page of `query` ordered on the unique `column`, starting after the value `after`,
+    and the value to continue after for the next page (or None).
+
+    Like query_jobs(), each page is one index range scan, so deep pages cost the same as the first.
+    """
+    if after is not None:
+        query = query.filter(column < after if descending else column > after)
+    rows = query.order_by(column.desc() if descending else column.asc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, getattr(rows[-1], column.key)
+    return rows, None
+
+def filter_tokens_query(status: str | None = None):
+    """Returns a RegistrationToken query restricted to 'active' (still usable) or 'spent' tokens, or all of them."""
+    query = RegistrationToken.query
+    if status == 'active':
+        query = query.filter(db.not_(RegistrationToken.spent()))
+    elif status == 'spent':
+        query = query.filter(RegistrationToken.spent())
+    return query
+
+def tokens_csv_response(rows, filename: str) -> Response:
+    """Streams (token, uses_left, is_used) rows as a CSV download."""
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(('token', 'uses_left', 'is_used'))
+        for row in rows:
+            writer.writerow(row)
+            if buffer.tell() >= 64 * 1024: # Flush in chunks instead of per row
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    return Response(stream_with_context(generate()), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
 
 @admin_bp.route('/admin/users')
 @login_required
 @admin_required
 def admin_users():
-    users = User.query.all()
-    return render_template('admin/users.html', title='Manage Users', users=users)
+    users, next_after = keyset_page(User.query, User.id, after=request.args.get('after', type=int))
+    next_url = url_for('admin.admin_users', after=next_after) if next_after is not None else None
+    return render_template('admin/users.html', title='Manage Users', users=users, next_url=next_url,
+                           first_url=url_for('admin.admin_users'), is_first_page='after' not in request.args)
 
 @admin_bp.route('/admin/tokens')
 @login_required
 @admin_required
 def admin_tokens():
     form = TokenGenerationForm()
-    tokens = RegistrationToken.query.order_by(RegistrationToken.id.desc()).all()
-    return render_template('admin/tokens.html', title='Manage Tokens', tokens=tokens, form=form)
+    bulk_form = TokenBulkActionForm()
+    status = request.args.get('status', 'all')
+    tokens, next_after = keyset_page(filter_tokens_query(status), RegistrationToken.id,
+                                     after=request.args.get('after', type=int), descending=True)
+    next_url = url_for('admin.admin_tokens', status=status, after=next_after) if next_after is not None else None
+    return render_template('admin/tokens.html', title='Manage Tokens', tokens=tokens, form=form, bulk_form=bulk_form,
+                           status=status, next_url=next_url, first_url=url_for('admin.admin_tokens', status=status),
+                           is_first_page='after' not in request.args)
 
 @admin_bp.route('/admin/generate_token', methods=['POST'])
 @login_required
 @admin_required
 def generate_token():
+    """Creates one or more tokens in a single transaction, optionally returning them as a CSV download."""
     form = TokenGenerationForm() # Process the submitted form
     if form.validate_on_submit():
-        uses = form.uses.data
+        uses, count = form.uses.data, form.count.data
         if uses <= 0:
             flash('Number of uses must be positive.', 'warning')
         else:
-            token = RegistrationToken(uses_left=uses)
-            db.session.add(token)
+            tokens = RegistrationToken.generate(count, uses)
             db.session.commit()
-            flash(f'New registration token generated: {token.token}', 'success')
+            if form.download.data:
+                filename = f"registration-tokens-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.csv"
+                return tokens_csv_response([(token, uses, False) for token in tokens], filename)
+            if count == 1:
+                flash(f'New registration token generated: {tokens[0]}', 'success')
+            else:
+                flash(f'{count} registration tokens generated with {uses} use(s) each.', 'success')
+    else:
+        flash(f'Invalid input for token generation (at most {TOKEN_BULK_MAX} tokens per request).', 'error')
+    return redirect(url_for('admin.admin_tokens'))
+
+@admin_bp.route('/admin/tokens/bulk', methods=['POST'])
+@login_required
+@admin_required
+def bulk_tokens():
+    """Expires or deletes the selected tokens, or deletes every spent token, in one statement."""
+    form = TokenBulkActionForm()
+    if not form.validate_on_submit():
+        flash('Invalid bulk token action.', 'error')
+        return redirect(url_for('admin.admin_tokens'))
+    token_ids = request.form.getlist('token_ids', type=int)
+    if form.action.data == 'delete_spent':
+        changed = RegistrationToken.delete_many()
+        message = f'{changed} used or expired token(s) deleted.'
+    elif not token_ids:
+        flash('No tokens selected.', 'warning')
+        return redirect(url_for('admin.admin_tokens'))
+    elif form.action.data == 'expire':
+        changed = RegistrationToken.expire_many(token_ids)
+        message = f'{changed} token(s) expired.'
     else:
-        flash('Invalid input for token generation.', 'error')
+        changed = RegistrationToken.delete_many(token_ids)
+        message = f'{changed} token(s) deleted.'
+    db.session.commit()
+    flash(message, 'success')
     return redirect(url_for('admin.admin_tokens'))
 
+@admin_bp.route('/admin/tokens/export')
+@login_required
+@admin_required
+def export_tokens():
+    """Downloads the tokens matching ?status= as CSV, read from the database in batches."""
+    status = request.args.get('status', 'active')
+    query = filter_tokens_query(status).order_by(RegistrationToken.id)
+    rows = db.session.execute(query.with_entities(RegistrationToken.token, RegistrationToken.uses_left,
+                                                  RegistrationToken.is_used).statement.execution_options(yield_per=1000))
+    return tokens_csv_response(rows, f'registration-tokens-{status}.csv')
+
 @admin_bp.route('/admin/delete_token/<int:token_id>', methods=['POST'])
 @login_required
 @admin_required
@@ -66,4 +165,17 @@ def delete_token(token_id):
          flash(f'Token {token.token[:8]}... deleted.', 'success')
      else:
          flash('Token not found.', 'error')
-     return redirect(url_for('admin.admin_tokens'))
\ No newline at end of file
+     return redirect(url_for('admin.admin_tokens'))
+
+@admin_bp.route('/admin/metrics')
+@login_required
+@admin_required
+def metrics_route():
+    """Metrics of this worker process in the Prometheus text format."""
+    return Response(metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@admin_bp.route('/admin/metrics.json')
+@login_required
+@admin_required
+def metrics_json_route():
+    return jsonify(metrics.snapshot())
@@ -3,6 +3,8 @@ from flask_login import login_user, logout_user, login_required, current_user
 from app import db
 from app.models import User, RegistrationToken
 from app.forms import LoginForm, RegistrationForm, PasswordChangeForm
+from app.utils.passwords import password_hasher, PasswordHasherBusyError
+from app.utils.user_cache import invalidate_user
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -13,7 +15,14 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(username=form.username.data).first()
-        if user and user.check_password(form.password.data):
+        try:
+            valid = user is not None and user.check_password(form.password.data)
+        except PasswordHasherBusyError as e:
+            flash(str(e), 'warning')
+            return render_template('login.html', title='Login', form=form), 503
+        if valid:
+            if password_hasher.needs_rehash(user.password_hash):
+                upgrade_password_hash(user, form.password.data)
             login_user(user)
             flash('Logged in successfully.', 'success')
             next_page = request.args.get('next')
@@ -22,6 +31,15 @@ def login():
             flash('Login Unsuccessful. Please check username and password', 'danger')
     return render_template('login.html', title='Login', form=form)
 
+def upgrade_password_hash(user: User, password: str):
+    """Re-hashes a just-verified password with the current hashing method. Skipped if hashing is busy."""
+    try:
+        user.set_password(password)
+    except PasswordHasherBusyError:
+        return # Upgraded on a later login
+    db.session.commit()
+    invalidate_user(user.id)
+
 @auth_bp.route('/logout')
 def logout():
     logout_user()
@@ -34,30 +52,29 @@ def register():
         return redirect(url_for('main.index'))
     form = RegistrationForm()
     if form.validate_on_submit():
-        token_entry = RegistrationToken.query.filter_by(token=form.registration_token.data).first()
-        # Double-check token validity (already done in form validator, but good practice)
-        if not token_entry or token_entry.is_used or token_entry.uses_left <= 0:
+        # Create new user (hashed before the transaction, which then holds the write lock only briefly)
+        user = User(username=form.username.data)
+        try:
+            user.set_password(form.password.data)
+        except PasswordHasherBusyError as e:
+            flash(str(e), 'warning')
+            return render_template('register.html', title='Register', form=form), 503
+
+        # One transaction: spending the token takes SQLite's write lock first, so the
+        # first-user check below cannot race another registration
+        if not RegistrationToken.consume(form.registration_token.data):
+            db.session.rollback()
             flash('Invalid or expired registration token.', 'danger')
             return render_template('register.html', title='Register', form=form)
-
-        # Create new user
-        user = User(username=form.username.data)
-        user.set_password(form.password.data)
         # First user registered automatically becomes admin
-        if User.query.count() == 0:
-            user.is_admin = True
-            flash('Admin account created successfully!', 'success')
-        else:
-             user.is_admin = False # Ensure non-first users are not admin by default
-
-        # Update token usage
-        token_entry.uses_left -= 1
-        if token_entry.uses_left <= 0:
-             token_entry.is_used = True # Mark as fully used if uses reach 0
+        user.is_admin = not User.any_exist()
 
         try:
             db.session.add(user)
-            db.session.commit()
+            db.session.commit() # A failure (e.g. the username was just taken) also gives the token use back
+            invalidate_user(user.id)
+            if user.is_admin:
+                flash('Admin account created successfully!', 'success')
             flash(f'Account created for {form.username.data}! You can now log in.', 'success')
             return redirect(url_for('auth.login'))
         except Exception as e:
@@ -71,11 +88,19 @@ def register():
 def change_password():
     form = PasswordChangeForm()
     if form.validate_on_submit():
-        # Verify current password
-        if current_user.check_password(form.current_password.data):
-            # Set new password
-            current_user.set_password(form.new_password.data)
+        # current_user is a cached copy; verify and update the stored row
+        user = db.session.get(User, current_user.id)
+        try:
+            valid = user.check_password(form.current_password.data)
+            if valid:
+                # Set new password
+                user.set_password(form.new_password.data)
+        except PasswordHasherBusyError as e:
+            flash(str(e), 'warning')
+            return render_template('change_password.html', title='Change Password', form=form), 503
+        if valid:
             db.session.commit()
+            invalidate_user(user.id)
             flash('Your password has been updated!', 'success')
             return redirect(url_for('main.index')) # Or redirect to a profile page if you add one
         else:
@@ -1,24 +1,37 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, Response, current_app, stream_with_context, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
+import dataclasses
+import hashlib
+import json
+import queue
 import re
 import os
+import time
 
-from app.utils.api_client import client, APIKeyNotConfiguredError
-from app.utils.scenario_parser import get_scenarios_from_html
+from app import db
+from app.models import JobRecord, QueuedSubmission
+from app.utils.api_client import client, APIKeyNotConfiguredError, Job
+from app.utils.job_store import sync_jobs, get_stored_job, get_stored_jobs, query_jobs, JOBS_PAGE_SIZE, JOBS_MAX_PAGE_SIZE
+from app.utils.job_poller import job_poller
+from app.utils.submission_queue import submission_dispatcher
+from app.utils.batch import parse_batch_rows, submit_batch
+from app.utils.similarity import query_similar_jobs
+from app.utils.search import search_index
+from app.utils.job_stats import STATS_DAYS, STATS_OBJECTIVES, job_stats_summary
+from app.utils.scenario_parser import scenario_registry
 
 main_bp = Blueprint('main', __name__)
 
-# Load scenarios at blueprint initialization
-try:
-    with open(os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "jobs.html"), "r", encoding="utf-8") as f:
-        jobs_html_content = f.read()
-    AVAILABLE_SCENARIOS = get_scenarios_from_html(jobs_html_content)
-except FileNotFoundError:
-    print("Warning: jobs.html not found. Scenario list will be empty.")
-    AVAILABLE_SCENARIOS = []
-except Exception as e:
-    print(f"Warning: Failed to parse jobs.html: {e}")
-    AVAILABLE_SCENARIOS = []
+# Seconds between keep-alive comments on idle /events/jobs streams
+SSE_HEARTBEAT_INTERVAL = float(os.getenv("SSE_HEARTBEAT_INTERVAL", "15"))
+# Jobs one /events/jobs stream may watch, and seconds before it is closed (the browser's EventSource reconnects)
+SSE_MAX_IDS = int(os.getenv("SSE_MAX_IDS", "50"))
+SSE_MAX_LIFETIME = float(os.getenv("SSE_MAX_LIFETIME", "300"))
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "2000")) # Reconnection delay sent to the browser
+
+@main_bp.app_context_processor
+def inject_scenario_registry():
+    return {'scenario_registry': scenario_registry}
 
 @main_bp.route('/')
 @login_required
@@ -37,7 +50,7 @@ def index():
             api_error = f"Failed to fetch team details from API: {e}"
             flash(api_error, 'danger')
 
-    return render_template('index.html', scenarios=AVAILABLE_SCENARIOS, team=team_details, api_error=api_error, client=client)
+    return render_template('index.html', scenarios=scenario_registry.all(), team=team_details, api_error=api_error, client=client)
 
 @main_bp.route('/create_job', methods=['POST'])
 @login_required
@@ -52,21 +65,59 @@ def create_job_route():
         return jsonify({'error': 'Scenario, Subject, and Body are required.'}), 400
 
     # Check if the submitted scenario ID exists in our list of known scenario IDs
-    known_scenario_ids = [s['id'] for s in AVAILABLE_SCENARIOS]
-    if scenario not in known_scenario_ids and AVAILABLE_SCENARIOS:
+    if scenario not in scenario_registry and len(scenario_registry):
          # Log this warning server-side if needed, flashing won't work
          print(f"Submitted scenario ID '{scenario}' was not found in the list derived from jobs.html.")
 
+    if client._is_key_placeholder():
+        return jsonify({'error': 'API Key is not configured. Cannot create job.'}), 503 # Service Unavailable
+
     try:
-        job = client.create_job(scenario=scenario, subject=subject, body=body)
-        # Return JSON on success
-        return jsonify({'job_id': job.job_id, 'status': 'processing'}), 200
-    except APIKeyNotConfiguredError as e:
-        print(f"API Key error during job creation: {e}")
-        return jsonify({'error': str(e)}), 503 # Service Unavailable
+        submission = submission_dispatcher.enqueue(scenario=scenario, subject=subject, body=body)
+        # The job is created upstream by the dispatcher; the client polls /submission/<ticket> for its job_id
+        return jsonify({'ticket': submission.ticket, 'status': 'queued', 'job_id': None}), 202
     except Exception as e:
-        print(f"Exception during job creation: {e}")
-        return jsonify({'error': f"Error creating job via API: {e}"}), 500
+        db.session.rollback()
+        print(f"Exception while queueing job: {e}")
+        return jsonify({'error': f"Error queueing job: {e}"}), 500
+
+@main_bp.route('/submission/<ticket>')
+@login_required
+def submission_status_route(ticket):
+    """Returns the dispatch state of a queued submission as JSON."""
+    submission = QueuedSubmission.query.filter_by(ticket=ticket).first()
+    if submission is None:
+        return jsonify({'error': 'Unknown submission ticket.'}), 404
+    return jsonify({
+        'ticket': submission.ticket,
+        'status': submission.status,
+        'job_id': submission.job_id,
+        'error': submission.last_error,
+        'attempts': submission.attempts,
+        'next_attempt_at': submission.next_attempt_at,
+        'queue_position': submission_dispatcher.queue_position(submission),
+    })
+
+@main_bp.route('/batch_jobs', methods=['POST'])
+@login_required
+def batch_jobs_route():
+    """Queues a JSONL/CSV upload of jobs, streaming a JSON line per row each time its status changes."""
+    if client._is_key_placeholder():
+        return jsonify({'error': 'API Key is not configured. Cannot create jobs.'}), 503
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({'error': 'A JSONL or CSV file is required.'}), 400
+    try:
+        rows = parse_batch_rows(upload.read().decode('utf-8-sig'), upload.filename or '')
+    except (UnicodeDecodeError, ValueError) as e:
+        return jsonify({'error': f"Invalid batch: {e}"}), 400
+
+    def stream():
+        yield json.dumps({'total': len(rows)}) + '\n'
+        for result in submit_batch(rows):
+            yield json.dumps(result) + '\n'
+
+    return Response(stream_with_context(stream()), mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
 
 @main_bp.route('/job/<job_id>')
 @login_required
@@ -78,7 +129,7 @@ def get_job_route(job_id):
         flash("API Key not configured. Cannot fetch job details.", "warning")
     else:
         try:
-            job = client.get_job(job_id=job_id)
+            job = get_stored_job(job_id)
             if job is None:
                 flash(f"Job '{job_id}' not found or API key is invalid.", 'warning')
         except Exception as e:
@@ -90,20 +141,129 @@ def get_job_route(job_id):
 @main_bp.route('/jobs')
 @login_required
 def list_jobs_route():
-    """Displays a list of all jobs for the team from API."""
+    """Displays one page of the team's jobs from the local job store, filtered and sorted by query parameters."""
     jobs = []
     api_error = None
+    next_url = None
+    scenarios = []
+    filters = {
+        'scenario': request.args.get('scenario', 'all'),
+        'status': request.args.get('status', 'all'),
+        'objective': request.args.get('objective', 'all'),
+        'objective_status': request.args.get('objective_status', 'any'),
+        'subject': request.args.get('subject', '').strip(),
+        'sort': request.args.get('sort', 'date-desc'),
+        'reference': request.args.get('reference', '').strip(),
+    }
+    similarity_scores = {}
+    reference_job = None
     if client._is_key_placeholder():
          flash("API Key not configured. Cannot list jobs.", "warning")
     else:
         try:
-            jobs = client.list_jobs()
-            jobs.sort(key=lambda j: j.scheduled_time, reverse=True)
+            sync_jobs(force=JobRecord.query.first() is None)
         except Exception as e:
-            api_error = f"Error listing jobs from API: {e}"
+            api_error = f"Error syncing jobs from API: {e}"
             flash(api_error, 'danger')
+        limit = max(1, min(request.args.get('limit', JOBS_PAGE_SIZE, type=int), JOBS_MAX_PAGE_SIZE))
+        query_args = dict(
+            scenario=None if filters['scenario'] == 'all' else filters['scenario'],
+            status=None if filters['status'] == 'all' else filters['status'],
+            objective=None if filters['objective'] == 'all' else filters['objective'],
+            objective_status=filters['objective_status'],
+            subject=filters['subject'] or None,
+            sort=filters['sort'],
+            limit=limit,
+        )
+        if filters['sort'] == 'similarity' and filters['reference']:
+            # Nearest neighbours form a single ranked page, so there is no next cursor
+            query_args.pop('sort')
+            ranked = query_similar_jobs(filters['reference'], **query_args)
+            records, next_cursor = [record for record, _ in ranked], None
+            similarity_scores = {record.job_id: score for record, score in ranked}
+            reference_job = db.session.get(JobRecord, filters['reference'])
+            if reference_job is None:
+                flash("The reference job for the similarity sort is not in the local job store.", 'warning')
+        else:
+            try:
+                records, next_cursor = query_jobs(cursor=request.args.get('cursor'), **query_args)
+            except ValueError as e:
+                flash(f"{e} Showing the first page instead.", 'warning')
+                records, next_cursor = query_jobs(**query_args)
+        jobs = [record.to_job() for record in records]
+        if next_cursor:
+            next_url = url_for('main.list_jobs_route', **{**request.args.to_dict(), 'cursor': next_cursor})
+        scenarios = [scenario for (scenario,) in db.session.query(JobRecord.scenario).distinct().order_by(JobRecord.scenario)]
 
-    return render_template('job_list.html', jobs=jobs, api_error=api_error)
+    first_url = url_for('main.list_jobs_route', **{key: value for key, value in request.args.items() if key != 'cursor'})
+    return render_template('job_list.html', jobs=jobs, api_error=api_error, filters=filters, scenarios=scenarios,
+                           next_url=next_url, first_url=first_url, is_first_page='cursor' not in request.args,
+                           similarity_scores=similarity_scores, reference_job=reference_job)
+
+def _search_args() -> tuple[str, dict, int]:
+    """Query text, job list filters and page number of a search request."""
+    objective = request.args.get('objective', 'all')
+    filters = dict(
+        scenario=None if request.args.get('scenario', 'all') == 'all' else request.args['scenario'],
+        objective=None if objective == 'all' else objective,
+        objective_status=request.args.get('objective_status', 'any'),
+    )
+    return request.args.get('q', '').strip(), filters, max(1, request.args.get('page', 1, type=int))
+
+@main_bp.route('/jobs/search')
+@login_required
+def search_jobs_route():
+    """Full-text search over stored jobs' subjects, bodies and model output, best matches first."""
+    text, filters, page = _search_args()
+    results, has_more = [], False
+    if text:
+        try:
+            results, has_more = search_index.search(text, page=page, **filters)
+        except ValueError as e:
+            flash(str(e), 'warning')
+    scenarios = [scenario for (scenario,) in db.session.query(JobRecord.scenario).distinct().order_by(JobRecord.scenario)]
+    def page_url(number):
+        return url_for('main.search_jobs_route', **{**request.args.to_dict(), 'page': number})
+    return render_template('job_search.html', query=text, filters=filters, scenarios=scenarios,
+                           results=[(record.to_job(), search_index.highlight(snippet)) for record, snippet in results],
+                           prev_url=page_url(page - 1) if page > 1 else None, next_url=page_url(page + 1) if has_more else None)
+
+@main_bp.route('/api/jobs/search')
+@login_required
+def api_search_jobs():
+    """JSON version of /jobs/search: ?q=...&scenario=&objective=&objective_status=&page=."""
+    text, filters, page = _search_args()
+    try:
+        results, has_more = search_index.search(text, page=page, **filters)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'query': text,
+        'page': page,
+        'next_page': page + 1 if has_more else None,
+        'results': [{**_job_payload(record.to_job()), 'snippet': str(search_index.highlight(snippet))}
+                    for record, snippet in results],
+    })
+
+@main_bp.route('/stats')
+@login_required
+def job_stats_route():
+    """Success rates per scenario and objective, from the incrementally maintained JobStats table."""
+    summary = job_stats_summary(days=max(1, min(request.args.get('days', STATS_DAYS, type=int), 366)))
+    return render_template('job_stats.html', stats=summary, objectives=STATS_OBJECTIVES)
+
+@main_bp.route('/api/stats')
+@login_required
+def api_job_stats():
+    """JSON version of /stats; ?days= sets how many days of daily rates to include."""
+    return jsonify(job_stats_summary(days=max(1, min(request.args.get('days', STATS_DAYS, type=int), 366))))
+
+@main_bp.route('/api/scenarios')
+@login_required
+def api_scenarios():
+    """Known scenarios with their metadata, and the sha256 of the jobs.html they were parsed from."""
+    scenarios = scenario_registry.all()
+    return jsonify({'sha256': scenario_registry.sha256, 'scenarios': [dataclasses.asdict(s) for s in scenarios]})
 
 @main_bp.route('/team')
 @login_required
@@ -151,22 +311,127 @@ def update_team_route():
 @main_bp.route('/job_status/<job_id>')
 @login_required
 def job_status_route(job_id):
-    """API endpoint to check job status (for AJAX polling)."""
+    """API endpoint to check job status (for AJAX polling). Served from the background poller's state."""
     if client._is_key_placeholder():
          return jsonify({'error': 'API Key not configured.'}), 403 # Use 403 Forbidden
 
     try:
-        job = client.get_job(job_id=job_id)
-        if job is None:
+        status = job_poller.lookup(job_id)
+        if status is None:
              # Could be job not found or API key invalid
              return jsonify({'error': f'Job {job_id} not found or API access denied.'}), 404
 
         return jsonify({
-            'completed': job.is_completed,
-            'output': job.output,
-            'objectives': job.objectives,
+            'completed': status['completed'],
+            'output': status['output'],
+            'objectives': status['objectives'],
             'error': None
         })
     except Exception as e:
          # Catch other potential API errors
-         return jsonify({'error': str(e)}), 500
\ No newline at end of file
+         return jsonify({'error': str(e)}), 500
+
+# --- JSON Job API ---
+def _job_payload(job: Job) -> dict:
+    return {**dataclasses.asdict(job), 'is_completed': job.is_completed}
+
+def _cacheable_json(payload, immutable: bool) -> Response:
+    """JSON response with a strong ETag over its bytes; immutable (completed) payloads may be cached for good."""
+    response = jsonify(payload)
+    response.set_etag(hashlib.sha256(response.get_data()).hexdigest())
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable' if immutable else 'private, no-cache'
+    return response.make_conditional(request)
+
+@main_bp.route('/api/jobs/<job_id>')
+@login_required
+def api_job_route(job_id):
+    """Returns one job as JSON from the local job store."""
+    if client._is_key_placeholder():
+        return jsonify({'error': 'API Key not configured.'}), 503
+    try:
+        job = get_stored_job(job_id)
+    except Exception as e:
+        print(f"Error fetching job {job_id} for JSON API: {e}")
+        return jsonify({'error': f"Error fetching job {job_id} from API: {e}"}), 502
+    if job is None:
+        return jsonify({'error': f"Job '{job_id}' not found."}), 404
+    return _cacheable_json(_job_payload(job), immutable=job.is_completed)
+
+@main_bp.route('/api/jobs')
+@login_required
+def api_jobs_route():
+    """Returns several jobs as JSON: /api/jobs?ids=a,b,c -> {"jobs": [...], "missing": [...]}."""
+    if client._is_key_placeholder():
+        return jsonify({'error': 'API Key not configured.'}), 503
+    job_ids = list(dict.fromkeys(job_id.strip() for job_id in request.args.get('ids', '').split(',') if job_id.strip()))
+    if not job_ids:
+        return jsonify({'error': 'The ids parameter is required.'}), 400
+    if len(job_ids) > JOBS_MAX_PAGE_SIZE:
+        return jsonify({'error': f"At most {JOBS_MAX_PAGE_SIZE} ids may be requested at once."}), 400
+    try:
+        jobs = get_stored_jobs(job_ids)
+    except Exception as e:
+        print(f"Error fetching jobs for JSON API: {e}")
+        return jsonify({'error': f"Error fetching jobs from API: {e}"}), 502
+    found = [job for job in jobs.values() if job is not None]
+    missing = [job_id for job_id, job in jobs.items() if job is None]
+    return _cacheable_json({'jobs': [_job_payload(job) for job in found], 'missing': missing},
+                           immutable=not missing and all(job.is_completed for job in found))
+
+@main_bp.route('/events/jobs')
+@login_required
+def job_events_route():
+    """Streams the completions of the jobs in ?ids=a,b (at most SSE_MAX_IDS) as Server-Sent Events.
+
+    One message is sent per job as it completes (immediately for jobs that are
+    already done), and the stream ends once all of them have been sent. A
+    stream is also closed after SSE_MAX_LIFETIME seconds, so no request thread
+    is held indefinitely; EventSource then reconnects with the same ids.
+    """
+    if client._is_key_placeholder():
+         return jsonify({'error': 'API Key not configured.'}), 403
+
+    watched = {job_id for job_id in request.args.get('ids', '').split(',') if job_id}
+    if not watched:
+        return jsonify({'error': 'The ids parameter is required.'}), 400
+    if len(watched) > SSE_MAX_IDS:
+        return jsonify({'error': f'At most {SSE_MAX_IDS} job ids can be watched per stream.'}), 400
+    app = current_app._get_current_object() # The request context is gone by the time the stream runs
+
+    def stream():
+        # Subscribed and looked up here, not in the view, so a response that is never iterated holds nothing
+        subscription = job_poller.subscribe() # Before the lookups, so no completion is missed
+        deadline = time.monotonic() + SSE_MAX_LIFETIME
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            ready = []
+            with app.app_context():
+                for job_id in sorted(watched):
+                    try:
+                        status = job_poller.lookup(job_id)
+                        if status is None:
+                            ready.append({'job_id': job_id, 'error': f'Job {job_id} not found or API access denied.'})
+                        elif status['completed']:
+                            ready.append(status)
+                    except Exception as e:
+                        ready.append({'job_id': job_id, 'error': str(e)})
+            for event in ready:
+                watched.discard(event['job_id'])
+                yield f"data: {json.dumps(event)}\n\n"
+            while watched:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    event = subscription.get(timeout=min(SSE_HEARTBEAT_INTERVAL, remaining))
+                except queue.Empty:
+                    yield ": keep-alive\n\n" # Also detects disconnected browsers
+                    continue
+                if event['job_id'] in watched:
+                    watched.discard(event['job_id'])
+                    yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            job_poller.unsubscribe(subscription)
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
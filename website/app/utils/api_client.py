@@ -1,12 +1,36 @@
+import asyncio
+import codecs
+import concurrent.futures
 import dataclasses
+import functools
+import json
 import requests
 import os
+import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.utils.cache import ByteLRUCache, TTLCache
+from app.utils.metrics import metrics
+from app.utils.shared_state import shared_cache
 
 # Custom Exception for API Key issues
 class APIKeyNotConfiguredError(Exception):
     pass
 
-@dataclasses.dataclass
+# Raised for any other error response from the API
+class APIError(Exception):
+    def __init__(self, message, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+# Raised when the API answers 429 Too Many Requests (rate limits are per team)
+class RateLimitedError(Exception):
+    def __init__(self, message, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after # Seconds, if the API sent a Retry-After header
+
+@dataclasses.dataclass(slots=True)
 class Job:
     job_id: str
     team_id: str
@@ -23,7 +47,7 @@ class Job:
     def is_completed(self):
         return self.completed_time is not None
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Team:
     team_id: str
     name: str
@@ -32,8 +56,82 @@ class Team:
     solved_scenarios: list | None = None
     is_enabled: bool | None = None
 
+class UpstreamRetry(Retry):
+    """Retry policy for the competition API.
+
+    GET/PATCH are idempotent and are retried on connection errors, 429 and 5xx.
+    Job submissions (POST) are only retried when the connection could not be
+    opened, so nothing was sent. Any response, 429 included, goes straight back
+    to the caller: retrying after a 5xx or a read timeout could submit the same
+    job twice, and 429s must reach the submission TokenBucket so it backs off
+    instead of spending more of the team quota.
+    """
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method and method.upper() == 'POST':
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+def iter_json_array(chunks, encoding: str = 'utf-8'):
+    """Yields the elements of a JSON array of objects as they arrive, from an iterable of byte chunks.
+
+    Only the current element and an unread chunk are held in memory, whatever
+    the size of the array. Raises ValueError if the input is not such an array.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder(encoding)()
+    chunks = iter(chunks)
+    buffer, pos, started, finished = '', 0, False, False
+    while True:
+        while pos < len(buffer) and (buffer[pos].isspace() or (started and buffer[pos] == ',')):
+            pos += 1
+        if pos < len(buffer):
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError("Expected a JSON array.")
+                started, pos = True, pos + 1
+                continue
+            if buffer[pos] == ']':
+                return
+            if buffer[pos] != '{':
+                raise ValueError(f"Expected a JSON object in the array, got {buffer[pos]!r}.")
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if finished:
+                    raise ValueError("Truncated JSON array.")
+                item = None # Object continues in the next chunk
+            if item is not None:
+                yield item
+                pos = end
+                continue
+        elif finished:
+            raise ValueError("Truncated JSON array.")
+        chunk = next(chunks, None)
+        if chunk is None:
+            finished = True
+            buffer, pos = buffer[pos:] + text_decoder.decode(b'', final=True), 0
+        else:
+            buffer, pos = buffer[pos:] + text_decoder.decode(chunk), 0
+
+def build_api_session(pool_size: int, max_retries: int, backoff_factor: float) -> requests.Session:
+    """Creates a keep-alive session with a bounded connection pool and retry policy."""
+    retry = UpstreamRetry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        backoff_jitter=backoff_factor, # Spread out retries from concurrent workers
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({'GET', 'PATCH'}),
+        raise_on_status=False, # Hand the final error response to _check_response_error
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
 class CompetitionClient:
-    def __init__(self, api_key=None, api_server=None):
+    def __init__(self, api_key=None, api_server=None, pool_size=None, connect_timeout=None,
+                 read_timeout=None, max_retries=None, backoff_factor=None, stream_chunk_size=None):
         # Get from parameters or environment variables
         self.api_key = api_key or os.getenv("COMPETITION_API_KEY", "YOUR_API_KEY_HERE")
         self.api_server = api_server or os.getenv("API_SERVER", "https://llmailinject.azurewebsites.net")
@@ -42,30 +140,68 @@ class CompetitionClient:
             'Accept': 'application/json; charset=utf-8',
             'Content-Type': 'application/json; charset=utf-8'
         }
+        # Transport tuning: connection pool size, (connect, read) timeouts in seconds, retries
+        pool_size = pool_size or int(os.getenv("API_POOL_SIZE", "10"))
+        max_retries = max_retries if max_retries is not None else int(os.getenv("API_MAX_RETRIES", "3"))
+        backoff_factor = backoff_factor if backoff_factor is not None else float(os.getenv("API_BACKOFF_FACTOR", "0.5"))
+        self.timeout = (
+            connect_timeout or float(os.getenv("API_CONNECT_TIMEOUT", "5")),
+            read_timeout or float(os.getenv("API_READ_TIMEOUT", "30")),
+        )
+        # One pooled session shared by all request threads; headers are passed per
+        # request so the session is only used for connection reuse and retries.
+        self.session = build_api_session(pool_size, max_retries, backoff_factor)
+        # Bytes read per chunk when streaming large responses (the job list)
+        self.stream_chunk_size = stream_chunk_size or int(os.getenv("API_STREAM_CHUNK_SIZE", str(64 * 1024)))
+
+    def _request(self, method: str, path: str, headers: dict | None = None, endpoint: str | None = None,
+                 **kwargs) -> requests.Response:
+        """Sends a request through the pooled session with the configured timeouts (and any extra headers).
+
+        The call is timed in the metrics under `endpoint`, which defaults to the
+        path; pass a template for paths that contain ids.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        metrics.upstream_started()
+        started, resp = time.perf_counter(), None
+        try:
+            resp = self.session.request(method, f"{self.api_server}{path}", headers={**self.headers, **(headers or {})}, **kwargs)
+            return resp
+        finally:
+            metrics.upstream_finished(method, endpoint or path, resp, time.perf_counter() - started)
+
+    def close(self):
+        """Closes pooled connections."""
+        self.session.close()
 
     def _is_key_placeholder(self):
         return self.api_key == "YOUR_API_KEY_HERE"
 
     def _check_response_error(self, resp: requests.Response):
-        """Raises an exception if the API response indicates an error."""
+        """Raises an exception if the API response indicates an error (RateLimitedError for 429s)."""
         if resp.ok:
             return
         try:
             error = resp.json()
             message = error.get('message', 'Unknown error')
             advice = error.get('advice', 'No advice provided')
-            raise Exception(f"API Error ({resp.status_code}): {message} - {advice} (Trace ID: {error.get('trace_id', 'N/A')})")
+            details = f"API Error ({resp.status_code}): {message} - {advice} (Trace ID: {error.get('trace_id', 'N/A')})"
+            metrics.record_trace_id(resp, error.get('trace_id'))
         except requests.exceptions.JSONDecodeError:
-            raise Exception(f"API Error ({resp.status_code}): {resp.text}")
+            details = f"API Error ({resp.status_code}): {resp.text}"
         except Exception as e:
-             raise Exception(f"API Error ({resp.status_code}): {resp.text} (Parsing error details failed: {e})")
+            details = f"API Error ({resp.status_code}): {resp.text} (Parsing error details failed: {e})"
+        if resp.status_code == 429:
+            retry_after = resp.headers.get('Retry-After', '')
+            raise RateLimitedError(details, retry_after=float(retry_after) if retry_after.isdigit() else None)
+        raise APIError(details, status_code=resp.status_code)
 
     def create_job(self, scenario: str, subject: str, body: str) -> Job:
         """Submits a new job. Raises error if API key is placeholder."""
         if self._is_key_placeholder():
             raise APIKeyNotConfiguredError("Cannot create job: API Key is not configured.")
         payload = {'scenario': scenario, 'subject': subject, 'body': body}
-        resp = requests.post(f"{self.api_server}/api/teams/mine/jobs", headers=self.headers, json=payload)
+        resp = self._request('POST', "/api/teams/mine/jobs", json=payload)
         self._check_response_error(resp)
         return Job(**resp.json())
 
@@ -73,26 +209,55 @@ class CompetitionClient:
         """Retrieves details for a specific job. Returns None if API key is placeholder."""
         if self._is_key_placeholder():
             return None # Indicate key is missing
-        resp = requests.get(f"{self.api_server}/api/teams/mine/jobs/{job_id}", headers=self.headers)
+        resp = self._request('GET', f"/api/teams/mine/jobs/{job_id}", endpoint="/api/teams/mine/jobs/{job_id}")
         # Allow 404s to be handled gracefully in the route
         if resp.status_code == 404:
             return None
         self._check_response_error(resp)
         return Job(**resp.json())
 
+    def open_job_list(self, etag: str | None = None, last_modified: str | None = None) -> requests.Response:
+        """Starts a streamed GET of the job list, conditional on the given validators.
+
+        Returns the open response (the caller closes it): 304 if the list is
+        unchanged since those validators, otherwise the checked 200 response.
+        """
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        resp = self._request('GET', "/api/teams/mine/jobs", headers=headers, stream=True)
+        if resp.status_code != 304:
+            try:
+                self._check_response_error(resp)
+            except Exception:
+                resp.close()
+                raise
+        return resp
+
+    def iter_jobs(self, chunk_size: int | None = None):
+        """Yields the team's jobs one at a time while the list downloads, in bounded memory.
+
+        The connection is held until the generator is exhausted or closed. Yields
+        nothing if the API key is placeholder.
+        """
+        if self._is_key_placeholder():
+            return
+        with self.open_job_list() as resp:
+            chunks = resp.iter_content(chunk_size or self.stream_chunk_size)
+            for job_data in iter_json_array(chunks, encoding=resp.encoding or 'utf-8'):
+                yield Job(**job_data)
+
     def list_jobs(self) -> list[Job]:
         """Lists jobs. Returns empty list if API key is placeholder."""
-        if self._is_key_placeholder():
-            return [] # Return empty list if key is missing
-        resp = requests.get(f"{self.api_server}/api/teams/mine/jobs", headers=self.headers)
-        self._check_response_error(resp)
-        return [Job(**job_data) for job_data in resp.json()]
+        return list(self.iter_jobs())
 
     def get_my_team(self) -> Team | None:
         """Gets team details. Returns None if API key is placeholder."""
         if self._is_key_placeholder():
             return None # Indicate key is missing
-        resp = requests.get(f"{self.api_server}/api/teams/mine", headers=self.headers)
+        resp = self._request('GET', "/api/teams/mine")
          # Allow 404s (e.g., key valid but no team registered) to be handled gracefully
         if resp.status_code == 404:
             return None
@@ -104,9 +269,126 @@ class CompetitionClient:
         if self._is_key_placeholder():
             raise APIKeyNotConfiguredError("Cannot update team: API Key is not configured.")
         payload = {'members': members}
-        resp = requests.patch(f"{self.api_server}/api/teams/mine", headers=self.headers, json=payload)
+        resp = self._request('PATCH', "/api/teams/mine", json=payload)
         self._check_response_error(resp)
         return Team(**resp.json())
 
-# Create a singleton instance
-client = CompetitionClient()
\ No newline at end of file
+class CachedCompetitionClient(CompetitionClient):
+    """CompetitionClient with a TTL/single-flight cache in front of get_my_team and list_jobs.
+
+    The team is served stale-while-revalidate, so pages render from memory in the
+    steady state. update_my_team writes through to the cache and create_job
+    invalidates the entries it changes. Completed jobs are immutable upstream, so
+    get_job keeps them in a byte-bounded LRU and only pending jobs hit the network.
+
+    `cache` defaults to a per-process TTLCache; the app's client uses the
+    SharedCache, so all worker processes share one copy of the team and job list.
+    """
+    def __init__(self, *args, team_ttl=None, jobs_ttl=None, team_stale_ttl=None, completed_job_cache_bytes=None,
+                 cache=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # TTLs in seconds; the team may be served up to team_stale_ttl past expiry while it refreshes
+        self.team_ttl = team_ttl or float(os.getenv("TEAM_CACHE_TTL", "60"))
+        self.jobs_ttl = jobs_ttl or float(os.getenv("JOBS_CACHE_TTL", "30"))
+        self.team_stale_ttl = team_stale_ttl or float(os.getenv("TEAM_CACHE_STALE_TTL", "300"))
+        self.cache = cache if cache is not None else TTLCache()
+        # Memory cap (bytes) for completed jobs cached by get_job
+        self.completed_jobs = ByteLRUCache(
+            completed_job_cache_bytes or int(os.getenv("COMPLETED_JOB_CACHE_BYTES", str(32 * 1024 * 1024))),
+            sizeof=self._job_size)
+
+    @staticmethod
+    def _job_size(job: Job) -> int:
+        """Approximate payload size of a job: its JSON encoding plus fixed per-entry overhead."""
+        return len(json.dumps(dataclasses.asdict(job)).encode()) + 256
+
+    def get_job(self, job_id: str) -> Job | None:
+        job = self.completed_jobs.get(job_id)
+        if job is not None:
+            return job
+        job = super().get_job(job_id)
+        if job is not None and job.is_completed:
+            self.completed_jobs.put(job_id, job)
+        return job
+
+    def get_my_team(self) -> Team | None:
+        return self.cache.get_or_load('team', self.team_ttl, super().get_my_team, stale_ttl=self.team_stale_ttl)
+
+    def list_jobs(self) -> list[Job]:
+        return list(self.cache.get_or_load('jobs', self.jobs_ttl, super().list_jobs))
+
+    def update_my_team(self, members: list[str]) -> Team:
+        team = super().update_my_team(members)
+        self.cache.set('team', team, self.team_ttl)
+        return team
+
+    def create_job(self, scenario: str, subject: str, body: str) -> Job:
+        job = super().create_job(scenario, subject, body)
+        self.cache.invalidate('jobs', 'team') # New job in the list; score may change
+        return job
+
+class AsyncCompetitionClient:
+    """asyncio interface to a CompetitionClient, for running several upstream calls at once.
+
+    Methods mirror CompetitionClient and return the same Job/Team objects. Calls
+    run on a private executor sized to the HTTP pool, which bounds the number
+    of in-flight requests; a cancelled call that has not started yet is dropped.
+    Sync code (Flask routes, the poller) uses run() to await several calls and
+    pays for the slowest one rather than the sum.
+    """
+    def __init__(self, sync_client: CompetitionClient, max_concurrency: int = None):
+        self.sync_client = sync_client
+        self.max_concurrency = max_concurrency or int(os.getenv("API_POOL_SIZE", "10"))
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='api-async')
+
+    async def _call(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(method, *args, **kwargs))
+
+    def _is_key_placeholder(self):
+        return self.sync_client._is_key_placeholder()
+
+    async def create_job(self, scenario: str, subject: str, body: str) -> Job:
+        return await self._call(self.sync_client.create_job, scenario=scenario, subject=subject, body=body)
+
+    async def get_job(self, job_id: str) -> Job | None:
+        return await self._call(self.sync_client.get_job, job_id=job_id)
+
+    async def list_jobs(self) -> list[Job]:
+        return await self._call(self.sync_client.list_jobs)
+
+    async def get_my_team(self) -> Team | None:
+        return await self._call(self.sync_client.get_my_team)
+
+    async def update_my_team(self, members: list[str]) -> Team:
+        return await self._call(self.sync_client.update_my_team, members)
+
+    async def get_jobs(self, job_ids, return_exceptions: bool = False) -> dict:
+        """Fetches several jobs concurrently. Returns {job_id: Job | None (or the exception)}."""
+        job_ids = list(job_ids)
+        results = await asyncio.gather(*(self.get_job(job_id) for job_id in job_ids), return_exceptions=return_exceptions)
+        return dict(zip(job_ids, results))
+
+    @staticmethod
+    async def _gather(awaitables, timeout, return_exceptions):
+        tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+        try:
+            return await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=return_exceptions), timeout)
+        finally:
+            for task in tasks:
+                task.cancel() # No-op for finished tasks; drops queued calls after a timeout or error
+
+    def run(self, *awaitables, timeout: float | None = None, return_exceptions: bool = False) -> list:
+        """Sync facade: awaits the given calls concurrently and returns their results in order.
+
+        Raises asyncio.TimeoutError (cancelling whatever has not started) if `timeout` expires.
+        Must not be called from inside a running event loop.
+        """
+        return asyncio.run(self._gather(awaitables, timeout, return_exceptions))
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+# Create singleton instances
+client = CachedCompetitionClient(cache=shared_cache)
+async_client = AsyncCompetitionClient(client)
\ No newline at end of file
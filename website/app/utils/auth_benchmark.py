@@ -0,0 +1,124 @@
+import click
+import collections
+import itertools
+import os
+import random
+import tempfile
+import threading
+import time
+import uuid
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from app import db
+from app.models import User, RegistrationToken
+from app.utils.shared_state import configure_sqlite_engine
+
+def benchmark_auth(registrations: int = 300, logins: int = 1200, threads: int = 8, seed: int = 0) -> dict:
+    """Measures concurrent registration and login throughput on scratch databases, before and after the SQLite tuning.
+
+    'before' uses SQLite's defaults (rollback journal, 5s lock wait) and the old
+    registration path: the token looked up by the form validator and again by
+    the route, COUNT(*) of users, and a read-modify-write of uses_left. 'after'
+    uses configure_sqlite_engine() and the single-transaction path of the
+    register route. Registrations and logins run mixed across `threads` workers, all
+    spending one shared token. Passwords use a trivial hash, so only database
+    work is measured.
+    """
+    users, tokens = User.__table__, RegistrationToken.__table__
+    password_hash = generate_password_hash('benchmark', method='pbkdf2:sha256:1')
+    seeded_users = 100
+
+    def register_before(conn, username, token):
+        token_row = conn.execute(db.select(tokens).where(tokens.c.token == token)).first() # Form validator
+        if not token_row or token_row.is_used or token_row.uses_left <= 0:
+            return False
+        conn.execute(db.select(users.c.id).where(users.c.username == username)).first()
+        token_row = conn.execute(db.select(tokens).where(tokens.c.token == token)).first() # Route
+        is_admin = conn.execute(db.select(db.func.count()).select_from(users)).scalar() == 0
+        uses_left = token_row.uses_left - 1
+        conn.execute(db.update(tokens).where(tokens.c.id == token_row.id).values(uses_left=uses_left, is_used=uses_left <= 0))
+        conn.execute(db.insert(users).values(username=username, password_hash=password_hash, is_admin=is_admin))
+        return True
+
+    def register_after(conn, username, token):
+        conn.execute(db.select(users.c.id).where(users.c.username == username)).first()
+        consumed = conn.execute(db.update(tokens).where(tokens.c.token == token, tokens.c.is_used.is_(False), tokens.c.uses_left > 0)
+                                .values(uses_left=tokens.c.uses_left - 1, is_used=tokens.c.uses_left <= 1)).rowcount == 1
+        if not consumed:
+            return False
+        is_admin = not conn.execute(db.select(db.exists().where(users.c.id.isnot(None)))).scalar()
+        conn.execute(db.insert(users).values(username=username, password_hash=password_hash, is_admin=is_admin))
+        return True
+
+    def login(conn, username, _token):
+        row = conn.execute(db.select(users).where(users.c.username == username)).first()
+        conn.execute(db.select(users).where(users.c.id == row.id)).first() # user_loader on the next request
+        return check_password_hash(row.password_hash, 'benchmark')
+
+    rng = random.Random(seed)
+    ops = ['register'] * registrations + ['login'] * logins
+    rng.shuffle(ops)
+    results = {}
+    for profile, register in (('before', register_before), ('after', register_after)):
+        with tempfile.TemporaryDirectory() as directory:
+            engine = db.create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}", pool_size=threads, max_overflow=0)
+            if profile == 'after':
+                configure_sqlite_engine(engine)
+            db.metadata.create_all(engine, tables=[users, tokens])
+            token = str(uuid.uuid4())
+            with engine.begin() as conn:
+                conn.execute(db.insert(tokens).values(token=token, is_used=False, uses_left=registrations))
+                conn.execute(db.insert(users), [{'username': f'seed{i}', 'password_hash': password_hash, 'is_admin': False}
+                                                for i in range(seeded_users)])
+            counter = itertools.count()
+            counts = collections.Counter()
+            counts_lock = threading.Lock()
+
+            def worker():
+                while (index := next(counter)) < len(ops):
+                    op = ops[index]
+                    username = f'user{index}' if op == 'register' else f'seed{index % seeded_users}'
+                    started = time.perf_counter()
+                    try:
+                        with engine.begin() as conn:
+                            ok = (register if op == 'register' else login)(conn, username, token)
+                    except db.exc.OperationalError:
+                        ok = False
+                    with counts_lock:
+                        counts[op, ok] += 1
+                        counts[op, 'seconds'] += time.perf_counter() - started
+
+            started = time.perf_counter()
+            workers = [threading.Thread(target=worker) for _ in range(threads)]
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            with engine.connect() as conn:
+                registered = conn.execute(db.select(db.func.count()).select_from(users)).scalar() - seeded_users
+                uses_left = conn.execute(db.select(tokens.c.uses_left)).scalar()
+            engine.dispose()
+        results[profile] = {
+            'elapsed': elapsed,
+            'register_per_s': counts['register', True] / elapsed,
+            'login_per_s': counts['login', True] / elapsed,
+            'failed': counts['register', False] + counts['login', False],
+            'registered': registered,
+            'token_uses_spent': registrations - uses_left, # Below `registered` means lost updates
+        }
+    return results
+
+@click.command('benchmark-auth')
+@click.option('--registrations', '-r', default=300, show_default=True, help='Registrations to run.')
+@click.option('--logins', '-l', default=1200, show_default=True, help='Logins to run, mixed with the registrations.')
+@click.option('--threads', '-t', default=8, show_default=True, help='Concurrent workers.')
+def benchmark_auth_command(registrations, logins, threads):
+    """Compare concurrent registration and login throughput before and after the SQLite tuning."""
+    results = benchmark_auth(registrations=registrations, logins=logins, threads=threads)
+    click.echo(f"{f'{threads} threads':<24}{'before':>12}{'after':>12}")
+    for key, label in (('register_per_s', 'registrations/s'), ('login_per_s', 'logins/s'), ('failed', 'failed (locked)'),
+                       ('registered', 'users registered'), ('token_uses_spent', 'token uses spent')):
+        before, after = results['before'][key], results['after'][key]
+        click.echo(f"{label:<24}{before:>12.1f}{after:>12.1f}" if isinstance(before, float) else f"{label:<24}{before:>12}{after:>12}")
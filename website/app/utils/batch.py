@@ -0,0 +1,132 @@
+import click
+import csv
+import io
+import json
+import os
+import time
+
+from flask.cli import with_appcontext
+
+from app import db
+from app.models import QueuedSubmission
+from app.utils.api_client import client
+from app.utils.job_poller import job_poller
+from app.utils.submission_queue import submission_dispatcher, ensure_submission_queue_schema
+
+BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", "10000"))
+BATCH_PROGRESS_INTERVAL = float(os.getenv("BATCH_PROGRESS_INTERVAL", "1")) # Seconds between checks of a batch's queued rows
+
+BATCH_FIELDS = ('scenario', 'subject', 'body')
+
+def parse_batch_rows(text: str, filename: str = '') -> list[dict]:
+    """Parses a JSONL or CSV batch (header row with scenario,subject,body) into row dicts.
+
+    The format is taken from the file extension, or sniffed from the first
+    character when there is none. Rows keep their 1-based line/record number in 'row'.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    is_jsonl = extension in ('.jsonl', '.ndjson', '.json') or (not extension and text.lstrip().startswith('{'))
+    rows = []
+    if is_jsonl:
+        for number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError as e:
+                rows.append({'row': number, 'error': f"Invalid JSON: {e}"})
+                continue
+            rows.append({'row': number, **{field: data.get(field) for field in BATCH_FIELDS}} if isinstance(data, dict)
+                        else {'row': number, 'error': 'Expected a JSON object.'})
+    else:
+        for number, data in enumerate(csv.DictReader(io.StringIO(text)), start=1):
+            rows.append({'row': number, **{field: data.get(field) for field in BATCH_FIELDS}})
+    if len(rows) > BATCH_MAX_ROWS:
+        raise ValueError(f"Batch has {len(rows)} rows; the limit is {BATCH_MAX_ROWS}.")
+    return rows
+
+def submit_batch(rows: list[dict], interval: float = None):
+    """Queues every valid row as a QueuedSubmission and yields a result dict each time a row's status changes.
+
+    Each row is yielded first as 'invalid' or 'queued' (with its ticket), then
+    again as it moves through the queue, until every row is 'dispatched' or
+    'failed'. The rows are sent by the leader's submission dispatcher exactly
+    like /create_job submissions, so every worker's batches share one rate
+    limiter and the same retry rules, and survive a restart; a consumer that
+    goes away leaves its rows queued.
+    """
+    valid = []
+    for row in rows:
+        result = {'row': row['row'], 'scenario': row.get('scenario'), 'subject': row.get('subject'),
+                  'ticket': None, 'status': None, 'job_id': None, 'error': None}
+        if row.get('error') or not all(row.get(field) for field in BATCH_FIELDS):
+            result.update(status='invalid', error=row.get('error') or 'Scenario, Subject, and Body are required.')
+            yield result
+        else:
+            valid.append((row, result))
+    pending = {}
+    for (row, result), submission in zip(valid, submission_dispatcher.enqueue_many([row for row, _ in valid])):
+        result.update(ticket=submission.ticket, status=submission.status)
+        pending[submission.id] = result
+        yield dict(result)
+    while pending:
+        time.sleep(interval or BATCH_PROGRESS_INTERVAL)
+        changes = db.session.query(QueuedSubmission.id, QueuedSubmission.status, QueuedSubmission.job_id,
+                                   QueuedSubmission.last_error).filter(QueuedSubmission.id.in_(list(pending))).all()
+        db.session.commit() # End the read so the next check sees the dispatcher's writes
+        for submission_id, status, job_id, error in changes:
+            result = pending[submission_id]
+            if status == result['status']:
+                continue
+            result.update(status=status, job_id=job_id, error=error)
+            yield dict(result)
+            if status in ('dispatched', 'failed'):
+                del pending[submission_id]
+
+def wait_for_jobs(job_ids, interval: float = None):
+    """Yields the status snapshot of each job as it completes, polling through job_poller."""
+    remaining = set(job_ids)
+    while remaining:
+        for job_id in list(remaining):
+            snapshot = job_poller.lookup(job_id)
+            if snapshot is None or snapshot['completed']:
+                remaining.discard(job_id)
+                yield snapshot or {'job_id': job_id, 'completed': False, 'error': 'Job not found.'}
+        if remaining:
+            time.sleep(interval or job_poller.interval)
+            job_poller.poll_once()
+
+@click.command('submit-batch')
+@with_appcontext
+@click.argument('batch_file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--output', '-o', type=click.File('w'), default='-', help='Where to write JSONL results (default: stdout).')
+@click.option('--wait/--no-wait', default=False, help='Also wait for every job to complete and write its outcome.')
+def submit_batch_command(batch_file, output, wait):
+    """Queue every (scenario, subject, body) row of a JSONL or CSV file and report each row's progress.
+
+    The rows are sent by the running app's dispatcher, or by this process when no app is running.
+    """
+    if client._is_key_placeholder():
+        raise click.ClickException('API Key is not configured.')
+    try:
+        rows = parse_batch_rows(batch_file.read(), batch_file.name)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    db.create_all()
+    ensure_submission_queue_schema() # An existing queue table may predate the retry columns
+    submission_dispatcher.start() # Only dispatches if this process becomes the leader
+    job_ids, done = [], 0
+    for result in submit_batch(rows):
+        output.write(json.dumps(result) + '\n')
+        output.flush()
+        if result['status'] in ('invalid', 'dispatched', 'failed'):
+            done += 1
+        click.echo(f"[{done}/{len(rows)}] row {result['row']}: {result['status']} "
+                   f"{result['job_id'] or result['error'] or result['ticket']}", err=True)
+        if result['status'] == 'dispatched':
+            job_ids.append(result['job_id'])
+    if wait:
+        for done, snapshot in enumerate(wait_for_jobs(job_ids), start=1):
+            output.write(json.dumps({'outcome': snapshot}) + '\n')
+            output.flush()
+            click.echo(f"[{done}/{len(job_ids)}] job {snapshot['job_id']} finished", err=True)
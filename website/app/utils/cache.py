@@ -0,0 +1,135 @@
+import collections
+import threading
+import time
+
+class _Flight:
+    """A single in-progress load that concurrent callers for the same key wait on."""
+    def __init__(self, generation: int):
+        self.generation = generation
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class TTLCache:
+    """Thread-safe TTL cache with single-flight loading.
+
+    get_or_load() returns a fresh cached value if there is one. Otherwise exactly
+    one caller runs the loader and concurrent callers for the same key wait for
+    its result instead of issuing their own upstream request. With stale_ttl, a
+    value that expired less than stale_ttl seconds ago is returned immediately
+    while one background thread refreshes it. Errors are never cached.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {} # key -> (value, expires_at)
+        self._inflight = {} # key -> _Flight
+        self._generation = 0 # Bumped by invalidate() so in-flight loads don't store outdated data
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    def get_or_load(self, key, ttl: float, loader, stale_ttl: float = 0):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self.hits += 1
+                return entry[0]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight(self._generation)
+            serve_stale = entry is not None and now - entry[1] < stale_ttl
+            if serve_stale:
+                self.stale_hits += 1
+            elif leader:
+                self.misses += 1
+        if serve_stale:
+            if leader:
+                threading.Thread(target=self._load, args=(key, ttl, loader, flight), daemon=True).start()
+            return entry[0]
+        if leader:
+            self._load(key, ttl, loader, flight)
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _load(self, key, ttl: float, loader, flight: _Flight):
+        try:
+            flight.value = loader()
+            with self._lock:
+                if flight.generation == self._generation:
+                    self._entries[key] = (flight.value, time.monotonic() + ttl)
+        except Exception as e:
+            flight.error = e
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def set(self, key, value, ttl: float):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.stale_hits + self.misses
+        return (self.hits + self.stale_hits) / total if total else 0.0
+
+class ByteLRUCache:
+    """Thread-safe LRU cache bounded by the total size of its values in bytes.
+
+    Entries never expire; the least recently used ones are evicted once the
+    summed sizes (as reported by `sizeof`) exceed max_bytes. Values larger than
+    the whole budget are not cached.
+    """
+    def __init__(self, max_bytes: int, sizeof):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict() # key -> (value, size), least recently used first
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,150 @@
+import dataclasses
+import hashlib
+import os
+import tempfile
+import threading
+
+from app import db
+from app.models import JobRecord
+from app.utils.api_client import client, iter_json_array, CompetitionClient, Job
+from app.utils.job_store import store_job
+
+@dataclasses.dataclass
+class JobListDelta:
+    """One batch of changes found by JobListSync: jobs seen for the first time and jobs that have completed since."""
+    new: list[Job] = dataclasses.field(default_factory=list)
+    completed: list[Job] = dataclasses.field(default_factory=list)
+
+    def __len__(self):
+        return len(self.new) + len(self.completed)
+
+class JobListSync:
+    """Finds what changed in the team's job list and publishes per-job deltas to subscribers.
+
+    A run first asks for the list conditionally (If-None-Match / If-Modified-Since)
+    once the API has sent an ETag or Last-Modified; a 304 ends it. Otherwise the
+    body is hashed while it downloads (spooled to disk past `spool_bytes`) and is
+    only parsed if the hash differs from the last run's. Parsed jobs are compared
+    with the state known from the previous run: only new jobs and newly completed
+    ones are published, in batches of `batch_size`, so subscribers (the job store,
+    and through it the search/similarity indexes and statistics; the poller; the
+    client cache) do work proportional to the changes rather than to the history.
+    Validators are only remembered after every subscriber has accepted the run.
+    """
+    def __init__(self, api_client: CompetitionClient, batch_size: int | None = None, spool_bytes: int | None = None):
+        self.client = api_client
+        # Job changes published per batch, and the body size (bytes) past which it is spooled to a temporary file
+        self.batch_size = batch_size or int(os.getenv("JOB_SYNC_BATCH_SIZE", "500"))
+        self.spool_bytes = spool_bytes or int(os.getenv("JOB_SYNC_SPOOL_BYTES", str(8 * 1024 * 1024)))
+        self.chunk_size = api_client.stream_chunk_size
+        self.etag = None
+        self.last_modified = None
+        self.content_hash = None
+        self.runs = 0
+        self.not_modified = 0 # Runs ended by a 304
+        self.unchanged = 0 # Runs whose body hash matched the previous one
+        self.published = 0 # Job deltas published in total
+        self._known = None # job_id -> completed?, loaded from the job store on first use
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """Registers callback(delta: JobListDelta), called once per batch of changes in publish order."""
+        self._subscribers.append(callback)
+        return callback
+
+    def reset(self):
+        """Forgets validators and known job states, so the next run re-reads everything from the job store and API."""
+        self.etag = self.last_modified = self.content_hash = None
+        self._known = None
+
+    def _load_known(self) -> dict[str, bool]:
+        return {job_id: completed for job_id, completed in
+                db.session.query(JobRecord.job_id, JobRecord.completed_time.isnot(None))}
+
+    def _publish(self, delta: JobListDelta):
+        for callback in self._subscribers:
+            callback(delta)
+        for job in delta.new + delta.completed:
+            self._known[job.job_id] = job.is_completed
+        self.published += len(delta)
+
+    def run(self, force: bool = False) -> dict:
+        """Runs one sync (force ignores validators and reloads known states). Returns counts of what happened."""
+        with self._lock:
+            if force:
+                self.reset()
+            if self._known is None:
+                self._known = self._load_known()
+            self.runs += 1
+            with self.client.open_job_list(self.etag, self.last_modified) as resp:
+                if resp.status_code == 304:
+                    self.not_modified += 1
+                    return {'status': 'not-modified', 'new': 0, 'completed': 0}
+                etag, last_modified = resp.headers.get('ETag'), resp.headers.get('Last-Modified')
+                encoding = resp.encoding or 'utf-8'
+                with tempfile.SpooledTemporaryFile(max_size=self.spool_bytes) as body:
+                    digest = hashlib.sha256()
+                    for chunk in resp.iter_content(self.chunk_size):
+                        digest.update(chunk)
+                        body.write(chunk)
+                    content_hash = digest.hexdigest()
+                    if content_hash == self.content_hash:
+                        self.unchanged += 1
+                        self.etag, self.last_modified = etag, last_modified
+                        return {'status': 'unchanged', 'new': 0, 'completed': 0}
+                    body.seek(0)
+                    counts = self._diff(iter_json_array(iter(lambda: body.read(self.chunk_size), b''), encoding=encoding))
+            self.etag, self.last_modified, self.content_hash = etag, last_modified, content_hash
+            return {'status': 'changed', **counts}
+
+    def _diff(self, items) -> dict:
+        known = self._known
+        delta = JobListDelta()
+        counts = {'new': 0, 'completed': 0}
+        for job_data in items:
+            job = Job(**job_data)
+            was_completed = known.get(job.job_id)
+            if was_completed is None:
+                delta.new.append(job)
+                counts['new'] += 1
+            elif job.is_completed and not was_completed:
+                delta.completed.append(job)
+                counts['completed'] += 1
+            else:
+                continue
+            if len(delta) >= self.batch_size:
+                self._publish(delta)
+                delta = JobListDelta()
+        if delta:
+            self._publish(delta)
+        return counts
+
+job_list_sync = JobListSync(client)
+
+@job_list_sync.subscribe
+def _store_job_delta(delta: JobListDelta):
+    """Writes changed jobs to the job store; store_job() keeps the indexes and statistics in step."""
+    try:
+        for job in delta.new + delta.completed:
+            store_job(job)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+@job_list_sync.subscribe
+def _track_job_delta(delta: JobListDelta):
+    """Hands pending jobs to the poller and completions to its event subscribers."""
+    from app.utils.job_poller import job_poller
+
+    for job in delta.new + delta.completed:
+        job_poller.track(job)
+
+@job_list_sync.subscribe
+def _cache_job_delta(delta: JobListDelta):
+    """Warms the completed-job cache and drops the cached job list, which is now out of date."""
+    for job in delta.new + delta.completed:
+        if job.is_completed:
+            client.completed_jobs.put(job.job_id, job)
+    client.cache.invalidate('jobs')
@@ -1,17 +1,36 @@
 import os
 from app import db
-from app.models import User, RegistrationToken
+from app.models import User, RegistrationToken, JobRecord, JobStats
 from flask import current_app
 
 def initialize_database():
     """Initialize the database with initial data if needed."""
     print("Initializing database...")
     
-    # Create all tables
+    # Create all tables (rebuilding the job mirror if its schema is out of date)
+    from app.utils.job_store import ensure_job_store_schema
+    ensure_job_store_schema()
     db.create_all()
+    from app.utils.submission_queue import ensure_submission_queue_schema
+    ensure_submission_queue_schema()
+    from app.utils.shared_state import ensure_indexes
+    ensure_indexes()
+
+    # Index jobs stored before the similarity index existed
+    from app.utils.similarity import similarity_index
+    indexed = similarity_index.backfill()
+    if indexed:
+        print(f"Added {indexed} stored jobs to the similarity index.")
+    from app.utils.search import search_index
+    searchable = search_index.backfill()
+    if searchable:
+        print(f"Added {searchable} stored jobs to the search index.")
+    from app.utils.job_stats import rebuild_job_stats
+    if JobStats.query.first() is None and JobRecord.query.filter(JobRecord.completed_time.isnot(None)).first():
+        print(f"Counted {rebuild_job_stats()} completed jobs into the job statistics.")
     
     # Create first admin user if no users exist
-    if User.query.count() == 0:
+    if not User.any_exist():
         print("No users found. Creating default admin user.")
         print("IMPORTANT: Please change the default admin password immediately after login.")
         admin_user = User(username='admin', is_admin=True)
@@ -0,0 +1,81 @@
+import dataclasses
+import gc
+import json
+import random
+import time
+import timeit
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+import click
+
+from app.utils.api_client import Job
+
+def _format_time(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def _benchmark_payloads(count: int, seed: int) -> str:
+    """JSON text of `count` synthetic API jobs, so both representations pay for decoding like a real list_jobs()."""
+    rng = random.Random(seed)
+    scenarios = [f'level{level}{variant}' for level in range(1, 5) for variant in 'abcdefghij']
+    objectives = ('email.retrieved', 'defense.undetected', 'exfil.sent', 'exfil.destination', 'exfil.content')
+    start = int(time.time()) - 90 * 86400
+    payloads = []
+    for i in range(count):
+        scheduled = start + rng.randrange(90 * 86400)
+        completed = rng.random() < 0.95
+        payloads.append({
+            'job_id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'team_id': 'benchmark-team',
+            'scenario': rng.choice(scenarios),
+            'subject': f'Benchmark subject {i}',
+            'body': f'Benchmark body {i} ' + 'x' * rng.randrange(400),
+            'scheduled_time': _format_time(scheduled),
+            'started_time': _format_time(scheduled + 5),
+            'completed_time': _format_time(scheduled + 60) if completed else None,
+            'output': f'Benchmark output {i}' if completed else None,
+            'objectives': {name: rng.random() < 0.4 for name in objectives} if completed else None,
+        })
+    return json.dumps(payloads)
+
+def benchmark_job_storage(count: int = 50000, repeat: int = 5, seed: int = 0) -> dict:
+    """Compares retained memory and build time of plain and slotted Job dataclasses on synthetic jobs."""
+    raw = _benchmark_payloads(count, seed)
+    plain_job = dataclasses.make_dataclass('PlainJob', [ # Job as it would be without slots=True
+        (field.name, field.type) if field.default is dataclasses.MISSING else (field.name, field.type, field.default)
+        for field in dataclasses.fields(Job)])
+    builders = {
+        'dataclasses': lambda data: [plain_job(**payload) for payload in data],
+        'slots': lambda data: [Job(**payload) for payload in data],
+    }
+    results = {}
+    for name, build in builders.items():
+        # Memory retained once the decoded JSON is gone (tracemalloc slows allocation, so build time is measured apart)
+        gc.collect()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        jobs = build(json.loads(raw))
+        gc.collect()
+        results[name] = {'memory_bytes': tracemalloc.get_traced_memory()[0] - baseline}
+        tracemalloc.stop()
+        del jobs
+        data = json.loads(raw)
+        results[name]['build'] = min(timeit.repeat(lambda data=data: build(data), number=1, repeat=repeat))
+        del data
+    return results
+
+@click.command('benchmark-job-storage')
+@click.option('--jobs', '-n', 'count', default=50000, show_default=True, help='Synthetic jobs to generate.')
+@click.option('--repeat', '-r', default=5, show_default=True, help='Timing runs per workload (best is reported).')
+@click.option('--seed', default=0, show_default=True)
+def benchmark_job_storage_command(count, repeat, seed):
+    """Compare Job dataclasses with and without slots for memory and build time."""
+    results = benchmark_job_storage(count=count, repeat=repeat, seed=seed)
+    metrics = [key for key in results['dataclasses'] if key != 'memory_bytes']
+    click.echo(f"{f'{count} jobs':<24}{'dataclasses':>14}{'slots':>14}{'ratio':>8}")
+    base, slotted = results['dataclasses']['memory_bytes'], results['slots']['memory_bytes']
+    click.echo(f"{'memory (MiB)':<24}{base / 2**20:>14.1f}{slotted / 2**20:>14.1f}{base / slotted:>7.1f}x")
+    for metric in metrics:
+        base, slotted = results['dataclasses'][metric], results['slots'][metric]
+        click.echo(f"{metric + ' (ms)':<24}{base * 1000:>14.1f}{slotted * 1000:>14.1f}{base / slotted:>7.1f}x")
@@ -0,0 +1,176 @@
+import collections
+import itertools
+import os
+import queue
+import threading
+import time
+
+from app import db
+from app.models import JobRecord
+from app.utils.api_client import async_client, Job
+from app.utils.job_store import store_job, get_stored_job
+from app.utils.metrics import metrics
+from app.utils.shared_state import leader_lock
+
+# Job writes commit shortly after synced_at is stamped; re-reading this far back (seconds) catches late commits
+FOLLOW_OVERLAP = 5.0
+
+class JobPoller:
+    """Refreshes pending jobs from the API on one shared background schedule.
+
+    /job_status answers from the poller's in-memory snapshots and only registers
+    job ids here, so upstream calls scale with the number of pending jobs rather
+    than with open browser tabs. Every `interval` seconds the poller fetches at
+    most `max_per_cycle` jobs, least recently polled first, concurrently through
+    async_client so a cycle takes about one round trip. Successful fetches are
+    stored even if others in the cycle fail; the first error is then raised.
+
+    Completions are also pushed to subscribers (see /events/jobs), so browsers
+    can hold one streaming connection instead of polling.
+
+    With several worker processes only the holder of leader_lock polls the API;
+    every process, leader included, follows the job store every
+    `follow_interval` seconds and tracks the rows other processes changed, so
+    snapshots and completion events stay current in all of them. A follower
+    takes over polling if the leader exits.
+    """
+    def __init__(self, app=None, interval: float = None, max_per_cycle: int = None,
+                 completed_capacity: int = 1000, follow_interval: float = None):
+        self.app = app
+        # Seconds between cycles (the API asks for >= 30s) and max upstream calls per cycle
+        self.interval = interval or float(os.getenv("JOB_POLL_INTERVAL", "30"))
+        self.max_per_cycle = max_per_cycle or int(os.getenv("JOB_POLL_MAX_PER_CYCLE", "20"))
+        # Seconds between reads of job changes written by other worker processes
+        self.follow_interval = follow_interval or float(os.getenv("JOB_FOLLOW_INTERVAL", "2"))
+        self.completed_capacity = completed_capacity
+        self.cycles = 0
+        self.upstream_calls = 0
+        self._lock = threading.Lock()
+        self._pending = collections.OrderedDict() # job_id -> status snapshot, least recently polled first
+        self._completed = collections.OrderedDict() # Recently completed snapshots, bounded LRU
+        self._subscribers = set() # Queues of open event streams
+        self._thread = None
+        self._followed_at = 0.0 # synced_at of the newest job store row seen by follow_once()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.before_request(self.start) # Start lazily inside the serving process (not the reloader parent)
+
+    def start(self):
+        """Seeds the pending set from the job store and starts the polling thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='job-poller', daemon=True)
+        self._followed_at = time.time()
+        with self.app.app_context():
+            for record in JobRecord.query.filter(JobRecord.completed_time.is_(None)).order_by(JobRecord.synced_at):
+                self.track(record.to_job())
+        self._thread.start()
+
+    @staticmethod
+    def _snapshot(job: Job) -> dict:
+        return {'job_id': job.job_id, 'completed': job.is_completed, 'output': job.output, 'objectives': job.objectives}
+
+    def subscribe(self, maxsize: int = 100) -> queue.Queue:
+        """Returns a queue that receives the snapshot of every job that completes from now on."""
+        subscription = queue.Queue(maxsize=maxsize)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: queue.Queue):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def track(self, job: Job) -> dict:
+        """Records the latest known state of a job and keeps polling it while it is pending."""
+        snapshot = self._snapshot(job)
+        with self._lock:
+            if job.is_completed:
+                if self._pending.pop(job.job_id, None) is not None:
+                    for subscription in self._subscribers:
+                        try:
+                            subscription.put_nowait(snapshot)
+                        except queue.Full:
+                            pass # Slow consumer; it can still fall back to /job_status
+                self._completed[job.job_id] = snapshot
+                self._completed.move_to_end(job.job_id)
+                while len(self._completed) > self.completed_capacity:
+                    self._completed.popitem(last=False)
+            elif job.job_id in self._pending:
+                self._pending[job.job_id] = snapshot
+            else:
+                self._pending[job.job_id] = snapshot
+                self._pending.move_to_end(job.job_id, last=False) # New jobs are polled first
+        return snapshot
+
+    def status(self, job_id: str) -> dict | None:
+        with self._lock:
+            return self._pending.get(job_id) or self._completed.get(job_id)
+
+    def lookup(self, job_id: str) -> dict | None:
+        """Returns a job's status from memory, falling back to get_stored_job (the store, and in the leader once the API)."""
+        snapshot = self.status(job_id)
+        if snapshot is not None:
+            return snapshot
+        job = get_stored_job(job_id)
+        return self.track(job) if job is not None else None
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def _run(self):
+        last_poll = time.monotonic()
+        while True:
+            time.sleep(min(self.follow_interval, self.interval))
+            try:
+                self.follow_once()
+                if time.monotonic() - last_poll >= self.interval and leader_lock.acquire(blocking=False):
+                    last_poll = time.monotonic()
+                    self.poll_once()
+            except Exception as e:
+                self.app.logger.error(f"Job poller cycle failed: {e}")
+
+    def follow_once(self) -> int:
+        """Tracks job store rows written since the last call, by any process. Returns how many were read."""
+        with self.app.app_context():
+            records = (JobRecord.query.filter(JobRecord.synced_at > self._followed_at - FOLLOW_OVERLAP)
+                       .order_by(JobRecord.synced_at).all())
+            jobs = [record.to_job() for record in records]
+            if records:
+                self._followed_at = max(self._followed_at, records[-1].synced_at)
+        for job in jobs:
+            self.track(job)
+        return len(jobs)
+
+    def poll_once(self) -> int:
+        """Runs one polling cycle. Returns the number of jobs fetched."""
+        with self._lock:
+            batch = list(itertools.islice(self._pending, self.max_per_cycle))
+            for job_id in batch:
+                self._pending.move_to_end(job_id)
+        self.upstream_calls += len(batch)
+        metrics.record_poll(len(batch))
+        results = async_client.run(*(async_client.get_job(job_id) for job_id in batch), return_exceptions=True)
+        errors = [job for job in results if isinstance(job, Exception)]
+        fetched = [job for job in results if isinstance(job, Job)]
+        with self._lock:
+            for job_id, job in zip(batch, results):
+                if job is None:
+                    self._pending.pop(job_id, None) # Gone upstream; stop polling it
+        with self.app.app_context():
+            for job in fetched:
+                store_job(job)
+            db.session.commit()
+        for job in fetched:
+            self.track(job) # After the commit, so subscribers find the stored result
+        self.cycles += 1
+        if errors:
+            raise errors[0]
+        return len(batch)
+
+job_poller = JobPoller()
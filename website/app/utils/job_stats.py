@@ -0,0 +1,92 @@
+import collections
+import os
+import re
+import time
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app import db
+from app.models import JobRecord, JobStats
+
+# Job statistics dashboard: days of per-day success rates shown
+STATS_DAYS = int(os.getenv("STATS_DAYS", "14"))
+STATS_OBJECTIVES = ('email.retrieved', 'defense.undetected', 'exfil.sent', 'exfil.destination', 'exfil.content')
+STATS_DAY_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+def _job_stats_rows(record: JobRecord) -> list[dict]:
+    """JobStats increments for one completed job: whole-job and per-objective rows, all-time and for its day."""
+    day = (record.scheduled_time or '')[:10]
+    rows = []
+    for bucket in ('', day) if STATS_DAY_PATTERN.match(day) else ('',):
+        rows.append(dict(scenario=record.scenario, objective='', day=bucket, attempts=1,
+                         successes=int(record.status == 'success'), partials=int(record.status == 'partial')))
+        for objective, met in (record.objectives or {}).items():
+            rows.append(dict(scenario=record.scenario, objective=objective, day=bucket, attempts=1,
+                             successes=int(bool(met)), partials=0))
+    return rows
+
+def record_job_outcome(record: JobRecord):
+    """Adds a newly completed job to the JobStats counters (caller commits).
+
+    One upsert of a handful of rows, so the cost does not depend on how many
+    jobs have been stored. store_job() calls this exactly once per job, when
+    its conditional UPDATE moves the stored row from pending to completed.
+    """
+    stmt = sqlite_insert(JobStats).values(_job_stats_rows(record))
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[JobStats.scenario, JobStats.objective, JobStats.day],
+        set_={column: getattr(JobStats, column) + getattr(stmt.excluded, column) for column in ('attempts', 'successes', 'partials')},
+    ))
+
+def rebuild_job_stats(batch_size: int = 1000) -> int:
+    """Recomputes JobStats from the job store in one pass (after a schema rebuild, or to repair drift). Returns jobs counted."""
+    totals = collections.Counter()
+    counted = 0
+    for record in JobRecord.query.filter(JobRecord.completed_time.isnot(None)).yield_per(batch_size):
+        counted += 1
+        for row in _job_stats_rows(record):
+            key = (row['scenario'], row['objective'], row['day'])
+            totals[key + ('attempts',)] += row['attempts']
+            totals[key + ('successes',)] += row['successes']
+            totals[key + ('partials',)] += row['partials']
+    JobStats.query.delete()
+    keys = {key[:3] for key in totals}
+    db.session.add_all(JobStats(scenario=scenario, objective=objective, day=day,
+                                attempts=totals[(scenario, objective, day, 'attempts')],
+                                successes=totals[(scenario, objective, day, 'successes')],
+                                partials=totals[(scenario, objective, day, 'partials')])
+                       for scenario, objective, day in keys)
+    db.session.commit()
+    return counted
+
+def _rate(successes: int, attempts: int) -> float | None:
+    return successes / attempts if attempts else None
+
+def job_stats_summary(days: int = STATS_DAYS) -> dict:
+    """Success statistics per scenario (with per-objective and per-day breakdowns) read from JobStats only."""
+    since = time.strftime('%Y-%m-%d', time.gmtime(time.time() - (days - 1) * 86400))
+    rows = JobStats.query.filter(db.or_(JobStats.day == '', JobStats.day >= since)).all()
+    scenarios = {}
+    for row in rows:
+        entry = scenarios.setdefault(row.scenario, {'attempts': 0, 'successes': 0, 'partials': 0, 'success_rate': None,
+                                                    'objectives': {}, 'daily': {}})
+        counts = {'attempts': row.attempts, 'successes': row.successes, 'success_rate': _rate(row.successes, row.attempts)}
+        if row.day and not row.objective:
+            entry['daily'][row.day] = counts
+        elif not row.day and row.objective:
+            entry['objectives'][row.objective] = counts
+        elif not row.day:
+            entry.update(counts, partials=row.partials)
+    totals = {field: sum(entry[field] for entry in scenarios.values()) for field in ('attempts', 'successes', 'partials')}
+    totals['success_rate'] = _rate(totals['successes'], totals['attempts'])
+    day_list = [time.strftime('%Y-%m-%d', time.gmtime(time.time() - offset * 86400)) for offset in range(days - 1, -1, -1)]
+    return {'totals': totals, 'days': day_list, 'scenarios': dict(sorted(scenarios.items()))}
+
+@click.command('rebuild-job-stats')
+@with_appcontext
+def rebuild_job_stats_command():
+    """Recount the job statistics from the local job store."""
+    db.create_all()
+    click.echo(f"Counted {rebuild_job_stats()} completed jobs.")
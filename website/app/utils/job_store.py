@@ -0,0 +1,226 @@
+import base64
+import click
+import dataclasses
+import json
+import os
+import re
+import threading
+import time
+
+from app import db
+from app.models import JobRecord, JobStats
+from app.utils.api_client import client, async_client, Job
+from app.utils.shared_state import shared_cache, leader_lock
+
+# Jobs are mirrored into the JobRecord table. Completed jobs never change upstream,
+# so they are written once and then served locally; pending jobs are kept fresh by
+# the JobPoller (app.utils.job_poller). The full team list is re-downloaded at most
+# every JOB_SYNC_INTERVAL seconds to pick up jobs submitted outside this app.
+JOB_SYNC_INTERVAL = float(os.getenv("JOB_SYNC_INTERVAL", "300"))
+JOB_PENDING_REFRESH_INTERVAL = float(os.getenv("JOB_PENDING_REFRESH_INTERVAL", "30"))
+# Job list paging: default and maximum jobs per page
+JOBS_PAGE_SIZE = int(os.getenv("JOBS_PAGE_SIZE", "50"))
+JOBS_MAX_PAGE_SIZE = int(os.getenv("JOBS_MAX_PAGE_SIZE", "200"))
+
+_job_sync_lock = threading.Lock()
+
+def store_job(job: Job) -> JobRecord:
+    """Inserts or refreshes a job in the local store (caller commits). Completed rows are left untouched."""
+    from app.utils.similarity import similarity_index
+    from app.utils.search import search_index
+    from app.utils.job_stats import record_job_outcome
+
+    record = db.session.get(JobRecord, job.job_id)
+    if record is None:
+        record = JobRecord(job_id=job.job_id)
+        record.update_from_job(job)
+        db.session.add(record)
+        similarity_index.add(job) # Subject and body never change, so new jobs are indexed once
+        search_index.add(record)
+        if record.is_completed:
+            record_job_outcome(record)
+        return record
+    if not record.is_completed:
+        # Claim the completion with a conditional UPDATE: if another writer (the poller, a sync,
+        # another worker) has already stored it, the row no longer matches and it is not counted again
+        completed = job.is_completed and db.session.execute(
+            db.update(JobRecord).where(JobRecord.job_id == job.job_id, JobRecord.completed_time.is_(None))
+            .values(completed_time=job.completed_time)).rowcount == 1
+        record.update_from_job(job)
+        if completed:
+            search_index.add(record) # Now with its output
+            record_job_outcome(record)
+    return record
+
+def sync_jobs(force: bool = False) -> bool:
+    """Syncs the job list when the store is empty, when forced, or every JOB_SYNC_INTERVAL seconds.
+
+    Only changes are written (see app.utils.delta_sync); a forced sync re-reads the whole list.
+    The interval is kept across worker processes by a lease in the shared cache.
+    Returns True if this call ran a sync.
+    """
+    from app.utils.delta_sync import job_list_sync
+
+    if not _job_sync_lock.acquire(blocking=False):
+        return False # Another request is already syncing; serve what we have
+    try:
+        # A successful sync leaves the lease to expire, so no worker syncs again for JOB_SYNC_INTERVAL
+        if not shared_cache.acquire_lease('job-list-sync', JOB_SYNC_INTERVAL, steal=force):
+            return False
+        try:
+            job_list_sync.run(force=force)
+            return True
+        except Exception:
+            shared_cache.release_lease('job-list-sync')
+            db.session.rollback()
+            raise
+    finally:
+        _job_sync_lock.release()
+
+def ensure_job_store_schema():
+    """Drops the JobRecord table if its columns or indexes predate the model, so create_all() rebuilds it.
+
+    The table is only a mirror of the API; it is refilled by the next sync.
+    """
+    inspector = db.inspect(db.engine)
+    table = JobRecord.__table__
+    if not inspector.has_table(table.name):
+        return
+    columns = {column['name'] for column in inspector.get_columns(table.name)}
+    indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+    if columns != {column.name for column in table.columns} or not {index.name for index in table.indexes} <= indexes:
+        print(f"Job store schema is out of date; rebuilding table '{table.name}' from the API.")
+        table.drop(db.engine)
+        JobStats.__table__.drop(db.engine, checkfirst=True) # Recounted as the jobs are synced again
+
+# Keyset orderings for the job list; each ends in a unique column so the cursor is unambiguous
+JOB_SORTS = {
+    'date-desc': ((JobRecord.scheduled_time, True), (JobRecord.job_id, True)),
+    'date-asc': ((JobRecord.scheduled_time, False), (JobRecord.job_id, False)),
+    'scenario': ((JobRecord.scenario, False), (JobRecord.scheduled_time, True), (JobRecord.job_id, True)),
+    'success-rate': ((JobRecord.success_rate, True), (JobRecord.scheduled_time, True), (JobRecord.job_id, True)),
+}
+JOB_STATUSES = ('success', 'partial', 'failed', 'processing')
+OBJECTIVE_NAME_PATTERN = re.compile(r'^[\w.\-]+$')
+
+def _encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+def _decode_cursor(cursor: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid page cursor: {e}")
+    if not isinstance(values, list):
+        raise ValueError("Invalid page cursor.")
+    return values
+
+def filter_jobs_query(scenario: str | None = None, status: str | None = None, objective: str | None = None,
+                      objective_status: str = 'any', subject: str | None = None):
+    """Returns a JobRecord query restricted to the job list filters (None means no restriction)."""
+    query = JobRecord.query
+    if scenario:
+        query = query.filter(JobRecord.scenario == scenario)
+    if status in JOB_STATUSES:
+        query = query.filter(JobRecord.status == status)
+    if objective and OBJECTIVE_NAME_PATTERN.match(objective):
+        result = db.func.json_extract(JobRecord.objectives, f'$."{objective}"') # 1/0 for true/false, NULL if absent
+        if objective_status == 'success':
+            query = query.filter(result == 1)
+        elif objective_status == 'failed':
+            query = query.filter(result == 0)
+        else:
+            query = query.filter(result.isnot(None))
+    if subject:
+        pattern = subject.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        query = query.filter(JobRecord.subject.ilike(f'%{pattern}%', escape='\\'))
+    return query
+
+def query_jobs(sort: str = 'date-desc', cursor: str | None = None, limit: int = None,
+               **filters) -> tuple[list[JobRecord], str | None]:
+    """Returns one page of stored jobs matching the filters and the cursor for the next page (or None).
+
+    Pages are keyset-paginated on the sort columns, so every page costs the same
+    regardless of how deep it is. Raises ValueError for a malformed cursor.
+    """
+    limit = limit or JOBS_PAGE_SIZE
+    query = filter_jobs_query(**filters)
+    order = JOB_SORTS.get(sort, JOB_SORTS['date-desc'])
+    if cursor:
+        values = _decode_cursor(cursor)
+        if len(values) != len(order):
+            raise ValueError("Invalid page cursor.")
+        # Rows strictly after the cursor: (a, b, c) > (x, y, z) expanded per column direction
+        query = query.filter(db.or_(*(
+            db.and_(*(column == values[j] for j, (column, _) in enumerate(order[:i])),
+                    column < values[i] if descending else column > values[i])
+            for i, (column, descending) in enumerate(order)
+        )))
+    query = query.order_by(*(column.desc() if descending else column.asc() for column, descending in order))
+
+    records = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        next_cursor = _encode_cursor([getattr(records[-1], column.key) for column, _ in order])
+    return records, next_cursor
+
+def _is_fresh(record: JobRecord | None, now: float) -> bool:
+    """Whether a stored row can be served without asking the API.
+
+    Only the leader process (see app.utils.shared_state) fetches single jobs. In
+    the other workers every stored row is served as is, since the leader's
+    poller keeps pending rows up to date, and a job that is not stored yet is
+    unknown until the leader or the job list sync stores it.
+    """
+    if record is None:
+        return not leader_lock.held
+    return record.is_completed or not leader_lock.held or now - record.synced_at < JOB_PENDING_REFRESH_INTERVAL
+
+def get_stored_job(job_id: str) -> Job | None:
+    """Returns a job from the local store; the leader also asks the API if it is unknown or its pending copy is stale."""
+    record = db.session.get(JobRecord, job_id)
+    if _is_fresh(record, time.time()):
+        return record.to_job() if record is not None else None
+    job = client.get_job(job_id=job_id)
+    if job is None:
+        return record.to_job() if record is not None else None
+    store_job(job)
+    db.session.commit()
+    return job
+
+def get_stored_jobs(job_ids: list[str]) -> dict[str, Job | None]:
+    """Bulk get_stored_job: one query for stored rows, then (in the leader) concurrent API fetches for unknown or stale ones."""
+    records = {record.job_id: record for record in JobRecord.query.filter(JobRecord.job_id.in_(job_ids))}
+    now = time.time()
+    jobs, stale = {}, []
+    for job_id in job_ids:
+        record = records.get(job_id)
+        if _is_fresh(record, now):
+            jobs[job_id] = record.to_job() if record is not None else None
+        else:
+            stale.append(job_id)
+    if stale:
+        for job_id, job in zip(stale, async_client.run(*(async_client.get_job(job_id) for job_id in stale))):
+            if job is None:
+                jobs[job_id] = records[job_id].to_job() if job_id in records else None
+            else:
+                store_job(job)
+                jobs[job_id] = job
+        db.session.commit()
+    return {job_id: jobs[job_id] for job_id in job_ids}
+
+@click.command('export-jobs')
+@click.option('--output', '-o', type=click.File('w'), default='-', help='Where to write JSONL (default: stdout).')
+@click.option('--completed-only', is_flag=True, help='Skip jobs that are still processing.')
+def export_jobs_command(output, completed_only):
+    """Stream every job of the team from the API as JSON lines."""
+    if client._is_key_placeholder():
+        raise click.ClickException('API Key is not configured.')
+    exported = 0
+    for job in client.iter_jobs():
+        if completed_only and not job.is_completed:
+            continue
+        output.write(json.dumps(dataclasses.asdict(job)) + '\n')
+        exported += 1
+    click.echo(f"Exported {exported} jobs.", err=True)
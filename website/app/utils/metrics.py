@@ -0,0 +1,301 @@
+import bisect
+import collections
+import itertools
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+from flask import g, request, current_app
+
+# Latency histogram bucket bounds (seconds), window for per-minute rates (seconds),
+# and the most recent upstream error trace ids kept
+METRICS_LATENCY_BUCKETS = tuple(sorted(float(bound) for bound in os.getenv(
+    "METRICS_LATENCY_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30").split(',')))
+METRICS_RATE_WINDOW = float(os.getenv("METRICS_RATE_WINDOW", "300"))
+METRICS_TRACE_IDS = int(os.getenv("METRICS_TRACE_IDS", "100"))
+
+class Histogram:
+    """Fixed-bucket histogram of durations in seconds, with Prometheus 'le' semantics.
+
+    Not locked on its own; Metrics updates it under its lock.
+    """
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1) # Per bucket, not cumulative; the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile by interpolating inside its bucket, as Prometheus' histogram_quantile() does."""
+        rank, seen = q * self.count, 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.bounds[i - 1] if i else 0.0
+                if i == len(self.bounds):
+                    return lower # In the +Inf bucket: only the largest bound is known
+                return lower + (self.bounds[i] - lower) * (rank - seen) / count
+            seen += count
+        return 0.0
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """(le, count) pairs, ending with '+Inf'."""
+        return list(zip([*(f'{bound:g}' for bound in self.bounds), '+Inf'], itertools.accumulate(self.counts)))
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0,
+            **{f'p{round(q * 100)}': self.quantile(q) for q in (0.5, 0.95, 0.99)},
+            'buckets': dict(self.cumulative()),
+        }
+
+class EventRate:
+    """Counts events over a sliding window to report a recent per-minute rate."""
+    def __init__(self, window: float):
+        self.window = window
+        self._events = collections.deque() # (monotonic time, count)
+        self._total = 0
+
+    def add(self, count: int = 1):
+        now = time.monotonic()
+        self._events.append((now, count))
+        self._total += count
+        self._trim(now)
+
+    def _trim(self, now: float):
+        while self._events and now - self._events[0][0] > self.window:
+            self._total -= self._events.popleft()[1]
+
+    def per_minute(self) -> float:
+        self._trim(time.monotonic())
+        return self._total * 60 / self.window
+
+class Metrics:
+    """In-process registry of route, upstream and background-service metrics.
+
+    Routes are labelled by Flask endpoint and upstream calls by path template
+    (never by raw job id), so the number of series stays bounded. Latencies run
+    until the response headers, so streamed bodies (the job list download,
+    /events/jobs) are not included. Other components expose their own counters
+    (cache hits, poller cycles, limiter state) through add_gauge(). Everything
+    is per process and starts from zero when it restarts; under gunicorn each
+    worker reports its own numbers.
+    """
+    def __init__(self, buckets=METRICS_LATENCY_BUCKETS, rate_window: float = METRICS_RATE_WINDOW,
+                 max_trace_ids: int = METRICS_TRACE_IDS):
+        self.buckets = tuple(buckets)
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self.route_latency = {} # (endpoint, method) -> Histogram
+        self.route_responses = collections.Counter() # (endpoint, method, status)
+        self.upstream_latency = {} # (method, endpoint) -> Histogram
+        self.upstream_responses = collections.Counter() # (method, endpoint, status); status 'error' if there was no response
+        self.upstream_retries = collections.Counter() # (method, endpoint, status) of attempts the transport retried
+        self.upstream_in_flight = 0
+        self.upstream_rate = EventRate(rate_window)
+        self.poll_rate = EventRate(rate_window) # Jobs fetched by the background poller
+        self.trace_ids = collections.deque(maxlen=max_trace_ids) # Recent upstream errors, newest last
+        self.trace_ids_total = 0
+        self._gauges = {} # name -> (help, label, fn, kind)
+
+    def init_app(self, app):
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        _add_service_gauges(self)
+
+    def _start_request(self):
+        g.metrics_started = time.perf_counter()
+
+    def _finish_request(self, response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            self.observe_route(request.endpoint or 'unmatched', request.method, response.status_code,
+                               time.perf_counter() - started)
+        return response
+
+    def _histogram(self, series: dict, key) -> Histogram:
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(self.buckets)
+        return histogram
+
+    def observe_route(self, endpoint: str, method: str, status: int, seconds: float):
+        with self._lock:
+            self._histogram(self.route_latency, (endpoint, method)).observe(seconds)
+            self.route_responses[endpoint, method, str(status)] += 1
+
+    def upstream_started(self):
+        with self._lock:
+            self.upstream_in_flight += 1
+
+    def upstream_finished(self, method: str, endpoint: str, response: requests.Response | None, seconds: float):
+        """Records a finished upstream call, including any attempts the transport retried before `response`."""
+        retries = getattr(getattr(response, 'raw', None), 'retries', None)
+        with self._lock:
+            self.upstream_in_flight -= 1
+            self.upstream_rate.add()
+            self._histogram(self.upstream_latency, (method, endpoint)).observe(seconds)
+            self.upstream_responses[method, endpoint, str(response.status_code) if response is not None else 'error'] += 1
+            for attempt in getattr(retries, 'history', None) or ():
+                self.upstream_retries[method, endpoint, str(attempt.status) if attempt.status else 'error'] += 1
+
+    def record_trace_id(self, response: requests.Response, trace_id: str | None):
+        """Keeps the trace id the API returned with an error response, for quoting in support requests."""
+        if not trace_id:
+            return
+        with self._lock:
+            self.trace_ids_total += 1
+            self.trace_ids.append({'time': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'), 'method': response.request.method,
+                                   'path': response.request.path_url, 'status': response.status_code, 'trace_id': trace_id})
+
+    def record_poll(self, jobs: int):
+        with self._lock:
+            self.poll_rate.add(jobs)
+
+    def add_gauge(self, name: str, help: str, fn, label: str | None = None, kind: str = 'gauge'):
+        """Exports fn() as `name`: a number, or with `label` a {label value: number} dict. kind is 'gauge' or 'counter'."""
+        self._gauges[name] = (help, label, fn, kind)
+
+    def _gauge_values(self) -> dict:
+        values = {}
+        for name, (_, label, fn, _) in self._gauges.items():
+            try:
+                values[name] = fn()
+            except Exception as e:
+                current_app.logger.warning(f"Metric {name} could not be read: {e}")
+        return values
+
+    def snapshot(self) -> dict:
+        """All metrics as plain data, for the JSON endpoint."""
+        gauges = self._gauge_values()
+        with self._lock:
+            upstream_statuses = collections.Counter()
+            for (_, _, status), count in self.upstream_responses.items():
+                upstream_statuses[status] += count
+            retried_statuses = collections.Counter()
+            for (_, _, status), count in self.upstream_retries.items():
+                retried_statuses[status] += count
+            return {
+                'uptime_s': time.time() - self.started,
+                'routes': [
+                    {'endpoint': endpoint, 'method': method, **histogram.to_dict(),
+                     'statuses': {status: count for (e, m, status), count in self.route_responses.items()
+                                  if (e, m) == (endpoint, method)}}
+                    for (endpoint, method), histogram in sorted(self.route_latency.items())
+                ],
+                'upstream': {
+                    'in_flight': self.upstream_in_flight,
+                    'requests_per_minute': self.upstream_rate.per_minute(),
+                    'statuses': dict(upstream_statuses),
+                    'retried_statuses': dict(retried_statuses),
+                    'rate_limited': upstream_statuses['429'] + retried_statuses['429'],
+                    'endpoints': [
+                        {'method': method, 'endpoint': endpoint, **histogram.to_dict(),
+                         'statuses': {status: count for (m, e, status), count in self.upstream_responses.items()
+                                      if (m, e) == (method, endpoint)},
+                         'retried_statuses': {status: count for (m, e, status), count in self.upstream_retries.items()
+                                              if (m, e) == (method, endpoint)}}
+                        for (method, endpoint), histogram in sorted(self.upstream_latency.items())
+                    ],
+                    'trace_ids_total': self.trace_ids_total,
+                    'recent_trace_ids': list(reversed(self.trace_ids)),
+                },
+                'poller': {'jobs_per_minute': self.poll_rate.per_minute()},
+                'gauges': gauges,
+            }
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+
+        def header(name, help, kind):
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        def escape_label(value) -> str:
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        def sample(name, labels: dict, value):
+            text = ','.join(f'{key}="{escape_label(label_value)}"' for key, label_value in labels.items())
+            value = str(value) if isinstance(value, int) else repr(float(value)) # Counts stay exact
+            lines.append(f'{name}{{{text}}} {value}' if text else f'{name} {value}')
+
+        def histograms(name, help, series, label_names):
+            header(name, help, 'histogram')
+            for key, histogram in sorted(series.items()):
+                labels = dict(zip(label_names, key))
+                for le, count in histogram.cumulative():
+                    sample(f'{name}_bucket', {**labels, 'le': le}, count)
+                sample(f'{name}_sum', labels, histogram.sum)
+                sample(f'{name}_count', labels, histogram.count)
+
+        def counters(name, help, counter, label_names):
+            header(name, help, 'counter')
+            for key, count in sorted(counter.items()):
+                sample(name, dict(zip(label_names, key)), count)
+
+        gauges = self._gauge_values()
+        with self._lock:
+            header('process_uptime_seconds', 'Seconds since this process started collecting metrics.', 'gauge')
+            sample('process_uptime_seconds', {}, time.time() - self.started)
+            histograms('http_request_duration_seconds', 'Time to response headers per Flask endpoint.',
+                       self.route_latency, ('endpoint', 'method'))
+            counters('http_responses_total', 'Responses per Flask endpoint and status code.',
+                     self.route_responses, ('endpoint', 'method', 'status'))
+            histograms('upstream_request_duration_seconds', 'Competition API call time to response headers, including transport retries.',
+                       self.upstream_latency, ('method', 'endpoint'))
+            counters('upstream_responses_total', "Final competition API responses per status code ('error' if none).",
+                     self.upstream_responses, ('method', 'endpoint', 'status'))
+            counters('upstream_retried_responses_total', 'Competition API attempts retried by the transport, per status code.',
+                     self.upstream_retries, ('method', 'endpoint', 'status'))
+            header('upstream_in_flight_requests', 'Competition API calls currently waiting for a response.', 'gauge')
+            sample('upstream_in_flight_requests', {}, self.upstream_in_flight)
+            header('upstream_requests_per_minute', f'Competition API calls per minute over the last {self.upstream_rate.window:g}s.', 'gauge')
+            sample('upstream_requests_per_minute', {}, self.upstream_rate.per_minute())
+            header('upstream_trace_ids_total', 'Trace ids captured from competition API error responses.', 'counter')
+            sample('upstream_trace_ids_total', {}, self.trace_ids_total)
+            header('job_poller_jobs_per_minute', f'Jobs fetched by the background poller per minute over the last {self.poll_rate.window:g}s.', 'gauge')
+            sample('job_poller_jobs_per_minute', {}, self.poll_rate.per_minute())
+        for name, value in gauges.items():
+            help, label, _, kind = self._gauges[name]
+            header(name, help, kind)
+            for label_value, number in (value.items() if label else [(None, value)]):
+                sample(name, {label: label_value} if label else {}, number)
+        return '\n'.join(lines) + '\n'
+
+def _add_service_gauges(metrics: Metrics):
+    """Exports the counters kept by the caches, the job poller and the submission dispatcher."""
+    from app.utils.api_client import client
+    from app.utils.job_poller import job_poller
+    from app.utils.shared_state import shared_cache
+    from app.utils.submission_queue import submission_dispatcher
+    from app.utils.user_cache import user_cache
+
+    def cache_counts(attribute: str) -> dict:
+        caches = {'upstream': shared_cache, 'completed_jobs': client.completed_jobs, 'users': user_cache}
+        if attribute == 'hits':
+            return {name: cache.hits + getattr(cache, 'stale_hits', 0) for name, cache in caches.items()}
+        return {name: getattr(cache, attribute) for name, cache in caches.items()}
+
+    metrics.add_gauge('cache_hit_ratio', 'Share of lookups served from cache (stale hits included).',
+                      lambda: cache_counts('hit_ratio'), label='cache')
+    metrics.add_gauge('cache_hits_total', 'Cache lookups served from cache.', lambda: cache_counts('hits'), label='cache', kind='counter')
+    metrics.add_gauge('cache_misses_total', 'Cache lookups that had to load the value.', lambda: cache_counts('misses'), label='cache', kind='counter')
+    metrics.add_gauge('job_poller_pending_jobs', 'Jobs the background poller is waiting on.', lambda: job_poller.pending_count)
+    metrics.add_gauge('job_poller_cycles_total', 'Background polling cycles run.', lambda: job_poller.cycles, kind='counter')
+    metrics.add_gauge('job_poller_upstream_calls_total', 'Job fetches made by the background poller.', lambda: job_poller.upstream_calls, kind='counter')
+    metrics.add_gauge('submit_rate_per_minute', 'Current job submission rate allowed by the adaptive limiter.',
+                      lambda: submission_dispatcher.limiter_state()['rate'] * 60)
+    metrics.add_gauge('submit_rate_limited_total', '429 responses that made the submission limiter back off.',
+                      lambda: submission_dispatcher.limiter_state()['rate_limited_count'], kind='counter')
+    metrics.add_gauge('submit_dispatched_total', 'Queued submissions sent to the API.', lambda: submission_dispatcher.dispatched, kind='counter')
+
+metrics = Metrics()
@@ -0,0 +1,96 @@
+import concurrent.futures
+import os
+import threading
+import time
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+class PasswordHasherBusyError(Exception):
+    """Raised when the password hashing queue is full; the caller should ask the user to retry."""
+
+class PasswordHasher:
+    """A concurrency limit for password KDF calls, which run on a small bounded pool.
+
+    The calling request thread still blocks until its own hash is done; what
+    the pool bounds is the CPU spent on hashing. At most `max_workers` hashes
+    run at once and at most `max_queued` more callers wait for a slot. Beyond
+    that hash()/verify() raise PasswordHasherBusyError at once and the route
+    answers with a busy error, so a login stampede gets quick refusals instead
+    of every request thread competing for the cores.
+
+    `method` is a werkzeug method string that sets the KDF and its cost (e.g.
+    'scrypt:32768:8:1' or 'pbkdf2:sha256:1000000'); hashes made with anything
+    else report needs_rehash() and are upgraded on the next login.
+    """
+    def __init__(self, method: str = None, max_workers: int = None, max_queued: int = None):
+        # werkzeug method with KDF cost, hashes computed in parallel, and further requests allowed to wait
+        self.method = method or os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+        self.max_workers = max(1, max_workers or int(os.getenv("PASSWORD_HASH_WORKERS", "2")))
+        self.max_queued = max(0, max_queued if max_queued is not None else int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "16")))
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queued)
+        self._lock = threading.Lock()
+        self._method_prefix = None
+        self.active = 0
+        self.queued = 0
+        self.max_queued_seen = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0 # Total time calls spent queued
+
+    @property
+    def method_prefix(self) -> str:
+        """The method as werkzeug writes it into hashes, with every default cost parameter filled in."""
+        if self._method_prefix is None:
+            self._method_prefix = generate_password_hash('', method=self.method).split('$', 1)[0]
+        return self._method_prefix
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHasherBusyError("Too many password checks in progress; try again shortly.")
+        queued_at = time.monotonic()
+        with self._lock:
+            self.queued += 1
+            self.max_queued_seen = max(self.max_queued_seen, self.queued)
+
+        def task():
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+                self.wait_seconds += time.monotonic() - queued_at
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+                self._slots.release()
+
+        return self._executor.submit(task).result() # Blocks this thread; only the number of concurrent hashes is bounded
+
+    def hash(self, password: str) -> str:
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        return password_hash.split('$', 1)[0] != self.method_prefix
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'method': self.method,
+                'workers': self.max_workers,
+                'max_queued': self.max_queued,
+                'active': self.active,
+                'queued': self.queued,
+                'max_queued_seen': self.max_queued_seen,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'mean_wait_ms': self.wait_seconds / self.completed * 1000 if self.completed else 0.0,
+            }
+
+password_hasher = PasswordHasher()
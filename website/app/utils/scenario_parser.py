@@ -1,23 +1,158 @@
+import dataclasses
+import hashlib
+import json
+import os
 import re
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
 
-def get_scenarios_from_html(html_content: str) -> list[dict]:
-    """Extracts scenario IDs and display names from the provided HTML snippet."""
+# Scenario list page saved from the competition site, its parsed cache (default <file>.cache.json), and seconds between change checks
+SCENARIOS_FILE = os.getenv("SCENARIOS_FILE", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "jobs.html"))
+SCENARIO_CACHE_FILE = os.getenv("SCENARIO_CACHE_FILE") or None
+SCENARIO_RELOAD_INTERVAL = float(os.getenv("SCENARIO_RELOAD_INTERVAL", "2"))
+
+# One select-item per scenario: "<display> <span class="tag ...">N solves</span>"; attribute order and extra attributes may vary
+SCENARIO_ITEM_PATTERN = re.compile(r'<div\b[^>]*\bclass="select-item"[^>]*>(.*?)<span\b[^>]*\bclass="tag\b[^"]*"[^>]*>(.*?)</span>', re.S)
+SCENARIO_DISPLAY_PATTERN = re.compile(r'^(?P<label>[^:]+):\s*(?P<model>.*?)(?:\s+with\s+(?P<defense>.+))?$')
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Scenario:
+    id: str # e.g. 'level1k', the value submitted to the API
+    display: str # e.g. 'Level 1K: Phi3 with promptshield'
+    model: str = ''
+    defense: str = ''
+    solves: int | None = None
+
+def get_scenarios_from_html(html_content: str) -> list[Scenario]:
+    """Extracts scenarios (ID, display name, model, defense, solve count) from the provided HTML snippet."""
     scenarios = []
-    # Regex to find the text content inside the specific div elements
-    pattern = r'<div data-v-e2c99c4a="" class="select-item">(.*?)<span class="tag'
-    matches = re.findall(pattern, html_content)
-
-    for display_name_full in matches:
-        display_name = display_name_full.strip()
-        # Derive the ID: Find first colon, take text before it,
-        # convert to lowercase, remove spaces.
-        match_id_part = re.match(r"^(.*?):", display_name)
-        if match_id_part:
-            scenario_id = match_id_part.group(1).lower().replace(" ", "")
-            scenarios.append({'id': scenario_id, 'display': display_name})
-        else:
+    for display_part, tag in SCENARIO_ITEM_PATTERN.findall(html_content):
+        display_name = display_part.strip()
+        # Derive the ID: text before the first colon, lowercased with spaces removed
+        match = SCENARIO_DISPLAY_PATTERN.match(display_name)
+        if not match:
             print(f"Warning: Could not derive ID from scenario display name: {display_name}")
-            # Optionally append with a dummy/display name as ID, or skip
-            # scenarios.append({'id': display_name, 'display': display_name})
+            continue
+        solves = re.search(r'\d+', tag)
+        scenarios.append(Scenario(id=match['label'].lower().replace(" ", ""), display=display_name, model=match['model'],
+                                  defense=match['defense'] or '', solves=int(solves.group()) if solves else None))
+    return scenarios
+
+class ScenarioRegistry:
+    """The scenario list from jobs.html, indexed by ID and reloaded when the file changes.
+
+    Each distinct file content is parsed once: the result is cached as JSON
+    keyed by the file's sha256, so restarts and other processes load it without
+    parsing. Lookups stat the file at most every `check_interval` seconds and
+    swap in a new index when its mtime or size changed; until a file has been
+    loaded the registry is empty, and a file that disappears keeps the last list.
+    """
+    CACHE_FORMAT = 1
+
+    def __init__(self, path: str, cache_path: str | None = None, check_interval: float = 2.0):
+        self.path = path
+        self.cache_path = cache_path or f'{path}.cache.json'
+        self.check_interval = check_interval
+        self.sha256 = None # Of the file content the index was built from
+        self.loaded_at = None
+        self._state = ((), {}) # (scenarios in file order, id -> Scenario), replaced as a whole on reload
+        self._stat = None
+        self._checked = float('-inf')
+        self._lock = threading.Lock()
+
+    def reload(self, force: bool = False):
+        """Checks the file now instead of waiting for the next interval; `force` also re-parses it."""
+        with self._lock:
+            if force:
+                self._stat = self.sha256 = None
+            self._checked = float('-inf')
+        self._refresh()
+
+    def _refresh(self):
+        if time.monotonic() - self._checked < self.check_interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked < self.check_interval:
+                return
+            self._checked = now
+            try:
+                stat = os.stat(self.path)
+                stat = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                stat = None
+            if stat != self._stat:
+                self._load(stat)
+
+    def _load(self, stat):
+        if stat is None:
+            print(f"Warning: {self.path} not found. Scenario list will {'be empty' if self.sha256 is None else 'not be updated'}.")
+            self._stat = None
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                content = f.read()
+            digest = hashlib.sha256(content).hexdigest()
+            self._stat = stat
+            if digest == self.sha256:
+                return # Touched but unchanged
+            scenarios = self._read_cache(digest)
+            if scenarios is None:
+                scenarios = get_scenarios_from_html(content.decode('utf-8'))
+                self._write_cache(digest, scenarios)
+        except Exception as e:
+            print(f"Warning: Failed to parse {self.path}: {e}")
+            return
+        index = {}
+        for scenario in scenarios:
+            index.setdefault(scenario.id, scenario)
+        self._state = (tuple(scenarios), index)
+        self.sha256 = digest
+        self.loaded_at = datetime.now(timezone.utc)
+
+    def _read_cache(self, digest: str) -> list[Scenario] | None:
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('format') != self.CACHE_FORMAT or data.get('sha256') != digest:
+                return None
+            return [Scenario(**item) for item in data['scenarios']]
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            return None
+
+    def _write_cache(self, digest: str, scenarios: list[Scenario]):
+        data = {'format': self.CACHE_FORMAT, 'sha256': digest, 'scenarios': [dataclasses.asdict(s) for s in scenarios]}
+        directory = os.path.dirname(os.path.abspath(self.cache_path))
+        try:
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory, suffix='.tmp', delete=False) as f:
+                json.dump(data, f)
+            os.replace(f.name, self.cache_path) # Readers never see a partial file
+        except OSError as e:
+            print(f"Warning: Could not write scenario cache {self.cache_path}: {e}")
+
+    def all(self) -> tuple[Scenario, ...]:
+        self._refresh()
+        return self._state[0]
+
+    def get(self, scenario_id: str | None) -> Scenario | None:
+        self._refresh()
+        return self._state[1].get(scenario_id)
+
+    def display_name(self, scenario_id: str) -> str:
+        """The scenario's display name, or the ID itself when it is not in the list."""
+        scenario = self.get(scenario_id)
+        return scenario.display if scenario else scenario_id
+
+    def __contains__(self, scenario_id) -> bool:
+        return self.get(scenario_id) is not None
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def __len__(self) -> int:
+        return len(self.all())
 
-    return scenarios
\ No newline at end of file
+# The create-job form, submission checks and templates all read this one index; create_app loads it at startup
+scenario_registry = ScenarioRegistry(SCENARIOS_FILE, cache_path=SCENARIO_CACHE_FILE, check_interval=SCENARIO_RELOAD_INTERVAL)
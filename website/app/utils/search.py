@@ -0,0 +1,125 @@
+import hashlib
+import os
+import re
+
+import click
+from flask.cli import with_appcontext
+from markupsafe import Markup, escape
+
+from app import db
+from app.models import JobRecord
+from app.utils.job_store import filter_jobs_query
+
+# Full-text job search: results per page and tokens of context in each snippet
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "20"))
+SEARCH_SNIPPET_TOKENS = int(os.getenv("SEARCH_SNIPPET_TOKENS", "16"))
+
+class JobSearchIndex:
+    """SQLite FTS5 index over job subjects, bodies and model output, used by /jobs/search.
+
+    The index is the `job_search` virtual table in the app database, created by
+    db.create_all() (see the after_create hook below). Rows are keyed by a hash
+    of the job id so a job can be re-indexed in place once its output arrives;
+    store_job() does that, so the index follows the job store without rescans.
+    """
+    TABLE = 'job_search'
+    COLUMNS = ('subject', 'body', 'output')
+    WEIGHTS = (0.0, 2.0, 1.0, 1.0) # bm25 weights for job_id (unindexed), subject, body, output
+    TERM_PATTERN = re.compile(r'(?:(subject|body|output):)?("[^"]*"?|\S+)')
+    OPERATORS = ('AND', 'OR', 'NOT')
+    HIGHLIGHT_START, HIGHLIGHT_END = '\x02', '\x03'
+
+    def __init__(self, page_size: int = SEARCH_PAGE_SIZE, snippet_tokens: int = SEARCH_SNIPPET_TOKENS):
+        self.page_size = page_size
+        self.snippet_tokens = snippet_tokens
+        self.table = db.table(self.TABLE, db.column('rowid'), db.column('job_id'), *(db.column(name) for name in self.COLUMNS))
+
+    def create_table_ddl(self):
+        return db.DDL(f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.TABLE} USING fts5("
+                      f"job_id UNINDEXED, {', '.join(self.COLUMNS)}, tokenize='porter unicode61')")
+
+    @staticmethod
+    def _rowid(job_id: str) -> int:
+        return int.from_bytes(hashlib.blake2b(job_id.encode(), digest_size=8).digest(), 'little', signed=True)
+
+    def add(self, record: JobRecord):
+        """Indexes or re-indexes a stored job (caller commits)."""
+        db.session.execute(db.text(
+            f"INSERT OR REPLACE INTO {self.TABLE} (rowid, job_id, subject, body, output) "
+            "VALUES (:rowid, :job_id, :subject, :body, :output)"
+        ), {'rowid': self._rowid(record.job_id), 'job_id': record.job_id, 'subject': record.subject or '',
+            'body': record.body or '', 'output': record.output or ''})
+
+    def backfill(self, batch_size: int = 500) -> int:
+        """Indexes stored jobs that are missing from the index, or whose output arrived without being indexed."""
+        indexed = dict(db.session.execute(db.text(f"SELECT job_id, output != '' FROM {self.TABLE}")).all())
+        added = 0
+        for record in JobRecord.query.yield_per(batch_size):
+            if record.job_id not in indexed or (record.output and not indexed[record.job_id]):
+                self.add(record)
+                added += 1
+        db.session.commit()
+        return added
+
+    def match_expression(self, text: str) -> str:
+        """Turns a search box query into an FTS5 MATCH expression.
+
+        Words and "quoted phrases" are matched literally (all must appear), word*
+        matches a prefix, subject:/body:/output: restrict a term to one column and
+        AND/OR/NOT combine terms. Raises ValueError if nothing searchable is left.
+        """
+        terms = []
+        for column, value in self.TERM_PATTERN.findall(text):
+            if not column and value in self.OPERATORS:
+                if terms and terms[-1] not in self.OPERATORS:
+                    terms.append(value)
+                continue
+            prefix = value.endswith('*') and not value.startswith('"')
+            phrase = value.strip('"').rstrip('*') if not value.startswith('"') else value.strip('"')
+            if not re.search(r'\w', phrase):
+                continue
+            term = '"' + phrase.replace('"', '""') + '"' + ('*' if prefix else '')
+            terms.append(f'{column} : {term}' if column else term)
+        while terms and terms[-1] in self.OPERATORS:
+            terms.pop()
+        if not terms:
+            raise ValueError("Enter a word or \"phrase\" to search for.")
+        return ' '.join(terms)
+
+    def search(self, text: str, page: int = 1, **filters) -> tuple[list[tuple[JobRecord, str]], bool]:
+        """Returns one page of (record, snippet) pairs, best match first, and whether there are more.
+
+        `filters` are the job list filters (see filter_jobs_query). Snippets mark
+        matched terms with HIGHLIGHT_START/HIGHLIGHT_END; see highlight().
+        """
+        match = self.match_expression(text)
+        fts = db.literal_column(self.TABLE)
+        rank = db.func.bm25(fts, *self.WEIGHTS)
+        snippet = db.func.snippet(fts, -1, self.HIGHLIGHT_START, self.HIGHLIGHT_END, '…', self.snippet_tokens)
+        rows = (filter_jobs_query(**filters)
+                .join(self.table, self.table.c.job_id == JobRecord.job_id)
+                .filter(fts.op('MATCH')(match))
+                .add_columns(snippet)
+                .order_by(rank, JobRecord.scheduled_time.desc())
+                .offset((max(page, 1) - 1) * self.page_size)
+                .limit(self.page_size + 1)
+                .all())
+        return [(record, text) for record, text in rows[:self.page_size]], len(rows) > self.page_size
+
+    def highlight(self, snippet: str) -> Markup:
+        """HTML for a search snippet, with matched terms in <mark>."""
+        return Markup(str(escape(snippet)).replace(self.HIGHLIGHT_START, '<mark>').replace(self.HIGHLIGHT_END, '</mark>'))
+
+search_index = JobSearchIndex()
+db.event.listen(db.metadata, 'after_create', search_index.create_table_ddl())
+
+@click.command('build-search-index')
+@click.option('--rebuild', is_flag=True, help='Empty the full-text index and index every stored job again.')
+@with_appcontext
+def build_search_index_command(rebuild):
+    """Index stored jobs for /jobs/search."""
+    db.create_all()
+    if rebuild:
+        db.session.execute(db.text(f"DELETE FROM {search_index.TABLE}"))
+        db.session.commit()
+    click.echo(f"Indexed {search_index.backfill()} jobs.")
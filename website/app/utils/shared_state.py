@@ -0,0 +1,249 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError: # Windows: no flock, so every process acts as the only one
+    fcntl = None
+
+from app import db
+
+# SQLite lock wait (seconds) for the app database and the shared cache, shared by all worker processes
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))
+# App database page cache (KiB) and memory-mapped I/O (bytes), per connection
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(64 * 1024 * 1024)))
+
+def configure_sqlite_engine(engine, busy_timeout: float = None):
+    """Puts every new connection of a SQLite engine into WAL mode with a busy timeout and a larger cache.
+
+    WAL lets the worker processes read while one of them writes, and the busy
+    timeout makes concurrent writers queue instead of failing with "database is locked".
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+    busy_timeout = busy_timeout or SQLITE_BUSY_TIMEOUT
+
+    @db.event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL') # Durable across crashes of the app in WAL mode
+        cursor.execute(f'PRAGMA busy_timeout={int(busy_timeout * 1000)}')
+        cursor.execute(f'PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}')
+        cursor.execute(f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+        cursor.close()
+
+def ensure_indexes():
+    """Creates declared indexes missing from existing tables (create_all() only indexes the tables it creates)."""
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+class ProcessLock:
+    """An exclusive lock shared by every process on this host, held through flock() on a lock file.
+
+    The kernel releases it when the holder exits, however it exits, so a crashed
+    holder never blocks the others. acquire(blocking=False) is how one worker
+    becomes the leader: once taken it is kept for the life of the process and
+    later calls return True at once. Locks are not inherited across fork(), so
+    the app must be created in each worker (gunicorn's preload_app=False).
+    """
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self._file = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None and self._pid == os.getpid()
+
+    def acquire(self, blocking: bool = True) -> bool:
+        with self._lock:
+            if self.held:
+                return True
+            if fcntl is None:
+                self._file, self._pid = True, os.getpid()
+                return True
+            if self.path is None:
+                raise RuntimeError("ProcessLock has no path; call init_shared_state(app) first.")
+            lock_file = open(self.path, 'a+')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                lock_file.close()
+                return False
+            self._file, self._pid = lock_file, os.getpid()
+            return True
+
+    def release(self):
+        with self._lock:
+            if self.held and fcntl is not None:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+                self._file.close()
+            self._file = self._pid = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+class SharedCache:
+    """TTL cache with single-flight loading, shared by all worker processes through a SQLite file.
+
+    A drop-in for TTLCache (app.utils.cache): get_or_load() returns a fresh
+    value if any worker has stored one. Otherwise the caller that wins a
+    short lease for the key runs the loader, and every other caller, in this
+    process or another, waits for the value it stores instead of issuing its
+    own upstream request. With stale_ttl, a value that expired less than
+    stale_ttl seconds ago is returned at once while the lease holder refreshes
+    it in the background. Errors are never cached. invalidate() bumps a
+    generation number, so loads that started before it do not store their result.
+
+    Values are pickled into a file only this app writes. Leases are also
+    usable on their own (acquire_lease/release_lease) to throttle work across
+    workers, such as the periodic job list sync.
+    """
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS cache_entry (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS cache_lease (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS cache_generation (id INTEGER PRIMARY KEY CHECK (id = 0), generation INTEGER NOT NULL)',
+        'INSERT OR IGNORE INTO cache_generation VALUES (0, 0)',
+    )
+
+    def __init__(self, path: str | None = None, load_timeout: float = None, wait_interval: float = 0.05):
+        self.path = path
+        # Seconds a loader may hold a key's lease before waiters give up on it and load themselves
+        self.load_timeout = load_timeout or float(os.getenv("SHARED_CACHE_LOAD_TIMEOUT", "60"))
+        self.wait_interval = wait_interval
+        self._local = threading.local() # One connection per thread (and per process after a fork)
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+        if self.path is None:
+            raise RuntimeError("SharedCache has no path; call init_shared_state(app) first.")
+        connection = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        for statement in self.SCHEMA:
+            connection.execute(statement)
+        self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def _read(self, key):
+        """Returns (value, expires_at), or None if the key is not cached."""
+        row = self._connection().execute('SELECT value, expires_at FROM cache_entry WHERE key = ?', (key,)).fetchone()
+        return (pickle.loads(row[0]), row[1]) if row is not None else None
+
+    def _generation(self) -> int:
+        return self._connection().execute('SELECT generation FROM cache_generation').fetchone()[0]
+
+    def acquire_lease(self, key: str, ttl: float, steal: bool = False) -> bool:
+        """Takes the lease on `key` for `ttl` seconds unless another caller holds an unexpired one (or `steal`)."""
+        now = time.time()
+        cursor = self._connection().execute(
+            'INSERT INTO cache_lease (key, expires_at) VALUES (?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET expires_at = excluded.expires_at WHERE cache_lease.expires_at <= ? OR ?',
+            (key, now + ttl, now, steal))
+        return cursor.rowcount == 1
+
+    def release_lease(self, key: str):
+        self._connection().execute('DELETE FROM cache_lease WHERE key = ?', (key,))
+
+    def _lease_held(self, key: str) -> bool:
+        row = self._connection().execute('SELECT expires_at FROM cache_lease WHERE key = ?', (key,)).fetchone()
+        return row is not None and row[0] > time.time()
+
+    def get_or_load(self, key, ttl: float, loader, stale_ttl: float = 0):
+        lease = f'load:{key}'
+        while True:
+            entry = self._read(key)
+            now = time.time()
+            if entry is not None and entry[1] > now:
+                self.hits += 1
+                return entry[0]
+            leader = self.acquire_lease(lease, self.load_timeout)
+            if entry is not None and now - entry[1] < stale_ttl:
+                self.stale_hits += 1
+                if leader:
+                    threading.Thread(target=self._refresh, args=(key, ttl, loader, lease), daemon=True).start()
+                return entry[0]
+            if leader:
+                self.misses += 1
+                return self._load(key, ttl, loader, lease)
+            while self._lease_held(lease): # Another caller is loading it; wait for its result
+                time.sleep(self.wait_interval)
+                entry = self._read(key)
+                if entry is not None and entry[1] > time.time():
+                    self.hits += 1
+                    return entry[0]
+            # The loader failed or timed out without storing anything: try again, possibly as the loader
+
+    def _load(self, key, ttl: float, loader, lease: str):
+        try:
+            generation = self._generation()
+            value = loader()
+            self._connection().execute(
+                'INSERT OR REPLACE INTO cache_entry (key, value, expires_at) '
+                'SELECT ?, ?, ? WHERE (SELECT generation FROM cache_generation) = ?',
+                (key, pickle.dumps(value), time.time() + ttl, generation))
+            return value
+        finally:
+            self.release_lease(lease)
+
+    def _refresh(self, key, ttl: float, loader, lease: str):
+        try:
+            self._load(key, ttl, loader, lease)
+        except Exception:
+            pass # Not cached; the next caller past the stale window loads it again and sees the error
+
+    def get(self, key, default=None):
+        """Returns the cached value if it has not expired, without loading it."""
+        entry = self._read(key)
+        return entry[0] if entry is not None and entry[1] > time.time() else default
+
+    def set(self, key, value, ttl: float):
+        self._connection().execute('INSERT OR REPLACE INTO cache_entry (key, value, expires_at) VALUES (?, ?, ?)',
+                                   (key, pickle.dumps(value), time.time() + ttl))
+
+    def invalidate(self, *keys):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute('UPDATE cache_generation SET generation = generation + 1')
+            connection.executemany('DELETE FROM cache_entry WHERE key = ?', [(key,) for key in keys])
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.stale_hits + self.misses
+        return (self.hits + self.stale_hits) / total if total else 0.0
+
+# Paths are filled in from the app's instance folder by init_shared_state()
+shared_cache = SharedCache(os.getenv("SHARED_CACHE_FILE"))
+leader_lock = ProcessLock(os.getenv("BACKGROUND_LEADER_LOCK_FILE")) # Held by the one process that runs the background services
+startup_lock = ProcessLock() # Serializes schema creation while workers start together
+
+def init_shared_state(app):
+    """Points the shared cache and process locks at the instance folder and enables WAL on the app database."""
+    os.makedirs(app.instance_path, exist_ok=True)
+    shared_cache.path = shared_cache.path or app.config.get('SHARED_CACHE_FILE') or os.path.join(app.instance_path, 'shared_cache.db')
+    leader_lock.path = leader_lock.path or os.path.join(app.instance_path, 'background.lock')
+    startup_lock.path = startup_lock.path or os.path.join(app.instance_path, 'startup.lock')
+    with app.app_context():
+        configure_sqlite_engine(db.engine)
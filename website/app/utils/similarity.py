@@ -0,0 +1,156 @@
+import array
+import click
+import hashlib
+import os
+import re
+
+from flask.cli import with_appcontext
+
+from app import db
+from app.models import JobRecord, JobSignature, JobLSHBucket
+from app.utils.job_store import filter_jobs_query, JOBS_PAGE_SIZE
+
+# Prompt similarity index: MinHash bins (a power of two), LSH bands, and max candidates ranked per lookup
+SIMILARITY_NUM_BINS = int(os.getenv("SIMILARITY_NUM_BINS", "128"))
+SIMILARITY_BANDS = int(os.getenv("SIMILARITY_BANDS", "32"))
+SIMILARITY_MAX_CANDIDATES = int(os.getenv("SIMILARITY_MAX_CANDIDATES", "2000"))
+
+class SimilarityIndex:
+    """MinHash/LSH index over job subjects and bodies for finding near-duplicate prompts.
+
+    Each job is reduced to word 3-gram shingles and a MinHash signature built
+    with one-permutation hashing: every shingle is hashed once and lands in one
+    of `num_bins` bins keyed by its low bits, and each bin keeps its minimum.
+    Empty bins borrow from the next non-empty bin (rotation densification) so
+    short prompts still give comparable signatures.
+
+    Signatures are split into `bands` bands whose hashes are stored in the
+    JobLSHBucket table; two jobs are candidates when any band matches, which for
+    the defaults (128 bins, 32 bands of 4) starts to happen around 40% Jaccard
+    similarity. A lookup is one indexed probe per band plus an exact signature
+    comparison for at most `max_candidates` jobs, independent of the job count.
+    """
+    WORD_PATTERN = re.compile(r'\w+')
+
+    def __init__(self, num_bins: int = SIMILARITY_NUM_BINS, bands: int = SIMILARITY_BANDS,
+                 max_candidates: int = SIMILARITY_MAX_CANDIDATES):
+        if num_bins & (num_bins - 1) or num_bins % bands:
+            raise ValueError("num_bins must be a power of two and a multiple of bands.")
+        self.num_bins = num_bins
+        self.bands = bands
+        self.rows = num_bins // bands
+        self.max_candidates = max_candidates
+        self._bin_bits = num_bins.bit_length() - 1
+        self._value_bits = 64 - self._bin_bits
+
+    def _shingles(self, subject: str, body: str) -> set[str]:
+        words = self.WORD_PATTERN.findall(f'{subject}\n{body}'.lower())
+        if len(words) < 3:
+            return {' '.join(words)} if words else set()
+        return {' '.join(words[i:i + 3]) for i in range(len(words) - 2)}
+
+    def signature(self, subject: str, body: str) -> array.array | None:
+        """Returns the job's MinHash signature, or None if it has no words at all."""
+        shingles = self._shingles(subject or '', body or '')
+        if not shingles:
+            return None
+        empty = 1 << 64
+        mins = [empty] * self.num_bins
+        mask = self.num_bins - 1
+        for shingle in shingles:
+            h = int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'little')
+            slot, value = h & mask, h >> self._bin_bits
+            if value < mins[slot]:
+                mins[slot] = value
+        signature = array.array('Q', bytes(8 * self.num_bins))
+        for slot in range(self.num_bins):
+            distance = 0
+            while mins[(slot + distance) & mask] == empty:
+                distance += 1
+            # Borrowed minima are offset by their distance so they only match bins borrowed the same way
+            signature[slot] = mins[(slot + distance) & mask] | (distance << self._value_bits)
+        return signature
+
+    def _band_buckets(self, signature: array.array) -> list[tuple[int, int]]:
+        buckets = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            buckets.append((band, int.from_bytes(hashlib.blake2b(rows, digest_size=8).digest(), 'little', signed=True)))
+        return buckets
+
+    def add(self, job) -> bool:
+        """Indexes a job (JobRecord or Job) unless it already is (caller commits). Returns True if added."""
+        if db.session.get(JobSignature, job.job_id) is not None:
+            return False
+        signature = self.signature(job.subject, job.body)
+        if signature is None:
+            return False
+        db.session.add(JobSignature(job_id=job.job_id, signature=signature.tobytes()))
+        db.session.add_all(JobLSHBucket(band=band, bucket=bucket, job_id=job.job_id)
+                           for band, bucket in self._band_buckets(signature))
+        return True
+
+    def backfill(self, batch_size: int = 500) -> int:
+        """Indexes stored jobs that have no signature yet (e.g. synced before the index existed)."""
+        added = 0
+        while True:
+            records = (JobRecord.query.outerjoin(JobSignature, JobSignature.job_id == JobRecord.job_id)
+                       .filter(JobSignature.job_id.is_(None), JobRecord.body != '').limit(batch_size).all())
+            batch_added = sum(self.add(record) for record in records)
+            db.session.commit()
+            added += batch_added
+            if len(records) < batch_size or not batch_added:
+                return added
+
+    def most_similar(self, job_id: str, k: int = 10) -> list[tuple[str, float]]:
+        """Returns up to k (job_id, estimated Jaccard similarity) pairs, most similar first, excluding the job itself."""
+        row = db.session.get(JobSignature, job_id)
+        if row is None:
+            record = db.session.get(JobRecord, job_id)
+            if record is None or not self.add(record):
+                return []
+            db.session.commit()
+            row = db.session.get(JobSignature, job_id)
+        signature = array.array('Q')
+        signature.frombytes(row.signature)
+
+        shared_bands = db.func.count(JobLSHBucket.band)
+        candidates = [candidate_id for candidate_id, _ in
+                      db.session.query(JobLSHBucket.job_id, shared_bands)
+                      .filter(db.tuple_(JobLSHBucket.band, JobLSHBucket.bucket).in_(self._band_buckets(signature)),
+                              JobLSHBucket.job_id != job_id)
+                      .group_by(JobLSHBucket.job_id)
+                      .order_by(shared_bands.desc())
+                      .limit(self.max_candidates)]
+        scored = []
+        for candidate in JobSignature.query.filter(JobSignature.job_id.in_(candidates)):
+            other = array.array('Q')
+            other.frombytes(candidate.signature)
+            scored.append((candidate.job_id, sum(a == b for a, b in zip(signature, other)) / self.num_bins))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:k]
+
+similarity_index = SimilarityIndex()
+
+def query_similar_jobs(reference: str, limit: int = JOBS_PAGE_SIZE, **filters) -> list[tuple[JobRecord, float]]:
+    """Returns up to `limit` (record, similarity) pairs for the stored jobs most similar to `reference` that match the filters."""
+    # Over-fetch when filtering so that enough neighbours survive it
+    restricted = any(value not in (None, 'any') for value in filters.values())
+    scores = dict(similarity_index.most_similar(reference, k=limit * 4 if restricted else limit))
+    if not scores:
+        return []
+    records = filter_jobs_query(**filters).filter(JobRecord.job_id.in_(scores)).all()
+    records.sort(key=lambda record: scores[record.job_id], reverse=True)
+    return [(record, scores[record.job_id]) for record in records[:limit]]
+
+@click.command('build-similarity-index')
+@click.option('--rebuild', is_flag=True, help='Discard existing signatures and index every stored job again.')
+@with_appcontext
+def build_similarity_index_command(rebuild):
+    """Index stored jobs for the 'most similar' sort."""
+    db.create_all()
+    if rebuild:
+        JobLSHBucket.query.delete()
+        JobSignature.query.delete()
+        db.session.commit()
+    click.echo(f"Indexed {similarity_index.backfill()} jobs.")
@@ -0,0 +1,346 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+from urllib3.exceptions import ConnectTimeoutError
+
+from app import db
+from app.models import QueuedSubmission, JobRecord
+from app.utils.api_client import client, Job, APIError, APIKeyNotConfiguredError, RateLimitedError
+from app.utils.job_store import store_job, sync_jobs
+from app.utils.shared_state import leader_lock, shared_cache
+
+# Outgoing job submissions are queued in SQLite and drained under an adaptive rate limit
+SUBMIT_RATE_PER_MINUTE = float(os.getenv("SUBMIT_RATE_PER_MINUTE", "6")) # Starting rate; adjusted from 429 responses
+SUBMIT_BURST = int(os.getenv("SUBMIT_BURST", "3"))
+SUBMIT_MAX_ATTEMPTS = int(os.getenv("SUBMIT_MAX_ATTEMPTS", "5")) # Non-429 failures before a submission is marked failed
+SUBMIT_RETRY_BACKOFF = float(os.getenv("SUBMIT_RETRY_BACKOFF", "10")) # Wait before a failed row's first retry, doubled per attempt
+SUBMIT_RETRY_BACKOFF_MAX = float(os.getenv("SUBMIT_RETRY_BACKOFF_MAX", "600"))
+SUBMIT_RECONCILE_DELAY = float(os.getenv("SUBMIT_RECONCILE_DELAY", "60")) # Wait before looking for an ambiguous submission in the job list
+SUBMIT_RATE_LIMIT_COOLDOWN = float(os.getenv("SUBMIT_RATE_LIMIT_COOLDOWN", "60")) # Pause after a 429 without Retry-After
+SUBMIT_QUEUE_POLL_INTERVAL = float(os.getenv("SUBMIT_QUEUE_POLL_INTERVAL", "2")) # Checks for rows queued by other worker processes
+LIMITER_STATE_KEY = 'submission-limiter'
+LIMITER_STATE_TTL = 24 * 3600
+
+class TokenBucket:
+    """Token-bucket rate limiter whose rate adapts to the API's 429 responses.
+
+    Each success nudges the rate up by `rate_step` tokens/second; a 429 halves it,
+    empties the bucket and pauses all acquisitions for Retry-After (or `cooldown`)
+    seconds, so throughput settles just under the team limit.
+    """
+    def __init__(self, rate: float, capacity: int, min_rate: float | None = None, max_rate: float | None = None,
+                 rate_step: float | None = None, cooldown: float = None):
+        self.rate = rate # Tokens per second
+        self.capacity = max(1, capacity)
+        self.min_rate = min_rate if min_rate is not None else rate / 8
+        self.max_rate = max_rate if max_rate is not None else rate * 4
+        self.rate_step = rate_step if rate_step is not None else rate / 10
+        self.cooldown = cooldown if cooldown is not None else SUBMIT_RATE_LIMIT_COOLDOWN
+        self.rate_limited_count = 0
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """Takes a token if one is available. Returns 0 on success, otherwise the seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout: float | None = None) -> bool:
+        """Blocks until a token is available (or `timeout` expires). Returns True if a token was taken."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire()
+            if wait == 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.rate_step)
+
+    def on_rate_limited(self, retry_after: float | None = None):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = 0.0
+            self._paused_until = max(self._paused_until, now + (retry_after if retry_after is not None else self.cooldown))
+            self.rate_limited_count += 1
+
+    def state(self) -> dict:
+        """The adaptive part of the bucket, with the pause as wall-clock time so another process can restore it."""
+        with self._lock:
+            return {'rate': self.rate, 'rate_limited_count': self.rate_limited_count,
+                    'paused_until': time.time() + max(0.0, self._paused_until - time.monotonic())}
+
+    def restore(self, state: dict):
+        with self._lock:
+            self.rate = min(self.max_rate, max(self.min_rate, state['rate']))
+            self.rate_limited_count = state['rate_limited_count']
+            self._paused_until = time.monotonic() + max(0.0, state['paused_until'] - time.time())
+
+
+def submission_not_created(error: Exception) -> bool:
+    """Whether a failed create_job certainly created nothing upstream, so sending it again cannot duplicate it.
+
+    That is the case when the connection could not be opened (nothing was sent)
+    or the API answered with a 4xx. A read timeout, a connection lost after
+    sending or a 5xx leaves the outcome unknown.
+    """
+    if isinstance(error, APIError):
+        return error.status_code is not None and 400 <= error.status_code < 500
+    if isinstance(error, requests.exceptions.ConnectionError) and error.args:
+        return isinstance(getattr(error.args[0], 'reason', error.args[0]), ConnectTimeoutError) # Includes refused/DNS failures
+    return False
+
+def ensure_submission_queue_schema():
+    """Adds columns the QueuedSubmission model has gained to an existing table (its rows must be kept)."""
+    inspector = db.inspect(db.engine)
+    table = QueuedSubmission.__table__
+    if not inspector.has_table(table.name):
+        return
+    existing = {column['name'] for column in inspector.get_columns(table.name)}
+    with db.engine.begin() as conn:
+        for column in table.columns:
+            if column.name not in existing:
+                conn.execute(db.text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(db.engine.dialect)}'))
+
+class SubmissionDispatcher:
+    """Drains the QueuedSubmission table into the API under the shared TokenBucket.
+
+    /create_job only enqueues and returns a ticket, so a burst never turns into
+    a wall of 429s and nothing is lost if the app restarts: rows stay 'queued'
+    in SQLite until a submission succeeds. A 429 leaves the row queued and backs
+    the limiter off.
+
+    A job is never sent twice. A row is claimed ('sending', committed) before
+    its request goes out and its job id is committed before anything else is
+    done with the job, so a crash or a second dispatcher cannot send it again.
+    Only failures that certainly created nothing (see submission_not_created)
+    are retried, after a per-row exponential backoff, up to SUBMIT_MAX_ATTEMPTS.
+    A row whose outcome is unknown moves to 'unknown' until reconcile_unknown()
+    finds its job in the team's job list or confirms that it is not there.
+
+    With several worker processes only the holder of leader_lock drains the
+    queue, so there is one limiter and one upstream submission rate in total.
+    It checks the table every SUBMIT_QUEUE_POLL_INTERVAL seconds for rows
+    enqueued by the other workers, whose wake-ups it cannot see, and publishes
+    the limiter's state to the shared cache: a new leader resumes at the old
+    one's rate, and every worker reports the same limiter in its metrics.
+    """
+    def __init__(self, app=None, limiter: TokenBucket | None = None, max_attempts: int = None):
+        self.app = app
+        self.limiter = limiter or TokenBucket(rate=SUBMIT_RATE_PER_MINUTE / 60, capacity=SUBMIT_BURST)
+        self.max_attempts = max_attempts or SUBMIT_MAX_ATTEMPTS
+        self.dispatched = 0
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.before_request(self.start)
+
+    def start(self):
+        """Starts the dispatcher thread (idempotent). Rows left queued by a previous run are picked up."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='submission-dispatcher', daemon=True)
+        self._thread.start()
+
+    def enqueue(self, scenario: str, subject: str, body: str) -> QueuedSubmission:
+        """Stores a submission durably and wakes the dispatcher. Commits the session."""
+        submission = QueuedSubmission(scenario=scenario, subject=subject, body=body)
+        db.session.add(submission)
+        db.session.commit()
+        self._wake.set()
+        return submission
+
+    def enqueue_many(self, rows: list[dict]) -> list[QueuedSubmission]:
+        """Stores one submission per (scenario, subject, body) row in a single transaction and wakes the dispatcher."""
+        submissions = [QueuedSubmission(scenario=row['scenario'], subject=row['subject'], body=row['body']) for row in rows]
+        db.session.add_all(submissions)
+        db.session.commit()
+        self._wake.set()
+        return submissions
+
+    def queue_position(self, submission: QueuedSubmission) -> int | None:
+        """1-based position among queued submissions, or None once it has left the queue."""
+        if submission.status != 'queued':
+            return None
+        return QueuedSubmission.query.filter(QueuedSubmission.status == 'queued',
+                                             QueuedSubmission.id < submission.id).count() + 1
+
+    @property
+    def queued_count(self) -> int:
+        return QueuedSubmission.query.filter_by(status='queued').count()
+
+    def limiter_state(self) -> dict:
+        """The state of the leader's limiter, which paces every submission, as last published to the shared cache."""
+        if leader_lock.held:
+            return self.limiter.state()
+        return shared_cache.get(LIMITER_STATE_KEY) or self.limiter.state()
+
+    def _publish_limiter(self):
+        shared_cache.set(LIMITER_STATE_KEY, self.limiter.state(), LIMITER_STATE_TTL)
+
+    def _run(self):
+        while True:
+            self._wake.wait(timeout=SUBMIT_QUEUE_POLL_INTERVAL)
+            self._wake.clear()
+            if not leader_lock.held:
+                if not leader_lock.acquire(blocking=False):
+                    continue
+                state = shared_cache.get(LIMITER_STATE_KEY)
+                if state is not None:
+                    self.limiter.restore(state) # Carry on at the previous leader's rate, and honour its pause
+            try:
+                with self.app.app_context():
+                    self.reconcile_unknown()
+                    self.dispatch_pending()
+            except Exception as e:
+                self.app.logger.error(f"Submission dispatcher cycle failed: {e}")
+
+    @staticmethod
+    def retry_delay(attempts: int) -> float:
+        """Backoff before retrying a row that has failed `attempts` times."""
+        return min(SUBMIT_RETRY_BACKOFF_MAX, SUBMIT_RETRY_BACKOFF * 2 ** (attempts - 1))
+
+    def dispatch_pending(self, limit: int | None = None) -> int:
+        """Submits due queued rows oldest first until none are left, `limit` is reached, or the API rate-limits us."""
+        sent = 0
+        while limit is None or sent < limit:
+            submission = QueuedSubmission.query.filter(
+                QueuedSubmission.status == 'queued',
+                db.or_(QueuedSubmission.next_attempt_at.is_(None), QueuedSubmission.next_attempt_at <= time.time()),
+            ).order_by(QueuedSubmission.id).first()
+            if submission is None:
+                break
+            self.limiter.acquire()
+            if not self.claim(submission):
+                continue # Taken by another dispatcher since the query
+            if not self.dispatch_one(submission):
+                break
+            sent += 1
+        return sent
+
+    def claim(self, submission: QueuedSubmission) -> bool:
+        """Moves a queued row to 'sending' and commits, before it is sent. Returns False if it was no longer queued."""
+        result = db.session.execute(db.update(QueuedSubmission).where(
+            QueuedSubmission.id == submission.id,
+            QueuedSubmission.status == 'queued',
+        ).values(status='sending', attempted_at=time.time(), attempts=QueuedSubmission.attempts + 1))
+        db.session.commit() # Also expires `submission`, which reloads with the claim
+        return result.rowcount == 1
+
+    def dispatch_one(self, submission: QueuedSubmission) -> bool:
+        """Sends one claimed submission. Returns False if the API rate-limited it (the row goes back in the queue)."""
+        try:
+            job = client.create_job(scenario=submission.scenario, subject=submission.subject, body=submission.body)
+        except RateLimitedError as e:
+            self.limiter.on_rate_limited(e.retry_after)
+            self._publish_limiter()
+            submission.status = 'queued'
+            submission.attempts -= 1 # Rate limits are expected and do not count against the row
+            submission.last_error = str(e)
+            db.session.commit()
+            self._wake.set() # Resume once the limiter's pause is over
+            return False
+        except Exception as e:
+            submission.last_error = str(e)
+            if isinstance(e, APIKeyNotConfiguredError) or (isinstance(e, APIError) and e.status_code in (400, 422)):
+                submission.status = 'failed' # Sending the same request again cannot succeed
+            elif not submission_not_created(e):
+                submission.status = 'unknown' # It may exist upstream; reconcile_unknown() decides
+            elif submission.attempts >= self.max_attempts:
+                submission.status = 'failed'
+            else:
+                submission.status = 'queued'
+                submission.next_attempt_at = time.time() + self.retry_delay(submission.attempts)
+            db.session.commit()
+            self.app.logger.error(f"Submission {submission.ticket} failed (attempt {submission.attempts}, now {submission.status}): {e}")
+            return True
+        self._mark_dispatched(submission, job)
+        db.session.commit() # Before store_job, which may fail: the row must never be sent again
+        from app.utils.job_poller import job_poller
+        job_poller.track(job)
+        self.limiter.on_success()
+        self._publish_limiter()
+        store_job(job)
+        db.session.commit()
+        return True
+
+    def _mark_dispatched(self, submission: QueuedSubmission, job: Job):
+        submission.status = 'dispatched'
+        submission.job_id = job.job_id
+        submission.dispatched_at = time.time()
+        submission.next_attempt_at = None
+        submission.last_error = None
+        self.dispatched += 1
+
+    def reconcile_unknown(self) -> int:
+        """Settles 'unknown' submissions against the team's job list. Returns how many were settled.
+
+        Rows left 'sending' by a process that stopped mid-request are settled the
+        same way. Rows are checked SUBMIT_RECONCILE_DELAY after their last attempt,
+        so a job that was created has had time to appear, against a freshly synced
+        list. A job with the same scenario, subject and body, scheduled after that
+        attempt and not claimed by another row, is taken as this submission's.
+        Otherwise nothing was created and the row goes back in the queue (or
+        fails once out of attempts).
+        """
+        from app.utils.job_poller import job_poller
+
+        rows = QueuedSubmission.query.filter(
+            QueuedSubmission.status.in_(('unknown', 'sending')),
+            QueuedSubmission.attempted_at <= time.time() - SUBMIT_RECONCILE_DELAY,
+        ).order_by(QueuedSubmission.id).all()
+        if not rows or not sync_jobs(force=True):
+            return 0 # Nothing to do, or another sync is running: try again next cycle
+        claimed = db.select(QueuedSubmission.job_id).where(QueuedSubmission.job_id.isnot(None))
+        for submission in rows:
+            since = datetime.fromtimestamp(submission.attempted_at - 300, timezone.utc) # Allows for clock skew
+            record = JobRecord.query.filter(
+                JobRecord.scenario == submission.scenario,
+                JobRecord.subject == submission.subject,
+                JobRecord.body == submission.body,
+                JobRecord.scheduled_time >= since.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                JobRecord.job_id.not_in(claimed),
+            ).order_by(JobRecord.scheduled_time).first()
+            if record is not None:
+                self._mark_dispatched(submission, record.to_job())
+                job_poller.track(record.to_job())
+            elif submission.attempts >= self.max_attempts:
+                submission.status = 'failed'
+                submission.last_error = f"{submission.last_error or 'Sending was interrupted'} (not found in the job list)"
+            else:
+                submission.status = 'queued'
+                submission.next_attempt_at = None
+            db.session.commit() # Row by row, so the next one sees this claim
+        return len(rows)
+
+submission_dispatcher = SubmissionDispatcher()
@@ -0,0 +1,26 @@
+import os
+
+from app import db
+from app.models import User
+from app.utils.cache import TTLCache
+
+# Seconds a logged-in user is served from the per-process cache before being re-read from the database
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+
+# Every authenticated request (including each /job_status poll) loads its user; this cache answers
+# those from memory. Code that changes a User calls invalidate_user(); other worker processes pick
+# the change up within USER_CACHE_TTL.
+user_cache = TTLCache()
+
+def _detached_user_copy(user: User | None) -> User | None:
+    """A copy of the row's columns outside any session, safe to share between requests and threads."""
+    if user is None:
+        return None
+    return User(id=user.id, username=user.username, password_hash=user.password_hash, is_admin=user.is_admin)
+
+def load_cached_user(user_id: int) -> User | None:
+    return user_cache.get_or_load(user_id, USER_CACHE_TTL, lambda: _detached_user_copy(db.session.get(User, user_id)))
+
+def invalidate_user(user_id: int):
+    """Drops a user from the cache after it was changed, so the next request reloads it."""
+    user_cache.invalidate(user_id)
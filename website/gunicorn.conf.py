@@ -0,0 +1,18 @@
+"""gunicorn settings for wsgi:app; each can be overridden from the environment."""
+import os
+
+wsgi_app = 'wsgi:app'
+# Lets the app package import both from website/ and from the repository root (website.wsgi:app)
+pythonpath = os.path.dirname(os.path.abspath(__file__))
+bind = os.getenv("BIND", "0.0.0.0:8000")
+# One worker per core by default; background pollers run in only one of them
+workers = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+# Threads per worker: /events/jobs streams hold a thread each for as long as they are open
+worker_class = 'gthread'
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+# The app must be created inside each worker: its locks, SQLite connections and threads do not survive fork()
+preload_app = False
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-")
@@ -0,0 +1,21 @@
+"""Production entry point: the create_app() factory served by several gunicorn worker processes.
+
+    cd website
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+or, from the repository root, gunicorn -c website/gunicorn.conf.py website.wsgi:app
+
+Workers share state through the instance folder rather than each calling the
+API on its own: the SQLite database (in WAL mode) holds jobs and queued
+submissions, shared_cache.db holds the cached team and job list, and the
+worker holding background.lock is the only one that polls pending jobs and
+submits queued jobs (see app.utils.shared_state). The others read job state
+from the database, and one of them takes over if the leader exits.
+"""
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app import create_app
+
+app = create_app()